@@ -1,18 +1,54 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Importaciones de rutas
-from .routes import auth, pets, reports, sightings, users # Añade aquí los demás a medida que los crees
+from .routes import auth, pets, reports, sightings, users, notifications, maps # Añade aquí los demás a medida que los crees
 
 # --- Inicialización de Firebase ---
-from .services import firebase_service
+# Los clientes se crean de forma perezosa; al arrancar solo se lanza la
+# inicialización en segundo plano para no retrasar el inicio del worker.
+from .services import deletion_service, firebase_service, flyer_service, metrics_service, rate_limit_service
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_firebase():
+    try:
+        await firebase_service.warm_up()
+        # Retoma los borrados en segundo plano que quedaron pendientes
+        await deletion_service.deletion_queue.resume()
+    except Exception:
+        # /readyz seguirá respondiendo 503 hasta que Firebase esté disponible
+        logger.exception("No se pudo inicializar Firebase al arrancar")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up = asyncio.create_task(_warm_up_firebase())
+    try:
+        yield
+    finally:
+        warm_up.cancel()
+        flyer_service.shutdown()
+        firebase_service.shutdown()
+
 
 app = FastAPI(
     title="Lomito Buscador API",
     description="La API para la aplicación de búsqueda de mascotas.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# --- Límite de peticiones y de tamaño del cuerpo en subidas y comentarios ---
+# Se añade antes que CORS para que las respuestas 413/429 también lleven sus cabeceras
+app.add_middleware(rate_limit_service.RequestGuardMiddleware)
+
 # --- Configuración de CORS ---
 
 origins = ["*"] # Permite cualquier origen
@@ -25,14 +61,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Métricas por petición (lecturas/escrituras, Storage y cabecera Server-Timing) ---
+app.add_middleware(metrics_service.MetricsMiddleware)
+
 # --- Inclusión de las Rutas ---#
 app.include_router(auth.router)
 app.include_router(pets.router)
 app.include_router(reports.router)
 app.include_router(sightings.router)
+app.include_router(notifications.router)
+app.include_router(maps.router)
 
 
 # --- Ruta de Prueba ---
 @app.get("/", tags=["Root"])
 async def read_root():
-    return {"message": "¡Bienvenido a la API de Lomito Buscador!"}
\ No newline at end of file
+    return {"message": "¡Bienvenido a la API de Lomito Buscador!"}
+
+
+# --- Sondas de salud ---
+@app.get("/healthz", tags=["Root"])
+async def healthz():
+    """El proceso está vivo (no toca Firebase)."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", tags=["Root"])
+async def readyz():
+    """Listo para recibir tráfico: los clientes existen y Firestore responde."""
+    try:
+        await firebase_service.check_ready()
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e)})
+    return {"status": "ready", "backend": firebase_service.FIREBASE_BACKEND}
+
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def metrics():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return PlainTextResponse(metrics_service.registry.render(), media_type="text/plain; version=0.0.4")
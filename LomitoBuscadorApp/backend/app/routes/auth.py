@@ -1,42 +1,28 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
-from firebase_admin import auth as firebase_auth
-from app.services.firebase_service import db  
-from firebase_admin import firestore
+from app.services.auth_service import AuthUser, ensure_user_document, verify_token
+from app.services.firebase_service import db, run_blocking
+from app.routes.dependencies import current_user, resolve_user_id
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/google-signin")
 async def google_signin(token: str):
     try:
-        #Verify Google token
-        decoded_token = firebase_auth.verify_id_token(token)
+        #Verify Google token (los ya verificados salen de la caché)
+        decoded_token = await verify_token(token)
         uid = decoded_token['uid']
-        email = decoded_token.get('email', 'No email provided')
-        name = decoded_token.get('name', 'No name provided')
-
-        #create or update user in Firestore
-
-        user_ref = db.collection('users').document(uid)
-        user_doc = user_ref.get()
 
-        if not user_doc.exists:
-            user_data = {
-                'user_id': uid,
-                'email': email,
-                'displayName': name,
-                'createdAt': firestore.SERVER_TIMESTAMP,
-                'preferences': {
-                    'notificationRadius': 24,
-                    'enablePushNotifications': True
-                }
-            }
-            user_ref.set(user_data)
+        #create user in Firestore the first time (sin leer el documento antes)
+        await ensure_user_document(decoded_token)
         return {"message": "User signed in successfully", "user_id": uid}
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
 @router.post("/update-fcm-token")
-async def update_fcm_token(user_id: str, fcm_token: str):
+async def update_fcm_token(fcm_token: str, user_id: Optional[str] = None, user: AuthUser = Depends(current_user)):
+    user_id = resolve_user_id(user, user_id)
     user_ref = db.collection('users').document(user_id)
-    user_ref.update({'fcmToken': fcm_token})
-    return {"sucess": True}    
+    await run_blocking(user_ref.update, {'fcmToken': fcm_token})
+    return {"sucess": True}
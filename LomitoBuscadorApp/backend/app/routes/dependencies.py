@@ -0,0 +1,73 @@
+# RUTA: backend/app/routes/dependencies.py
+#
+# Dependencias compartidas por las rutas. `current_user` verifica el ID token
+# de 'Authorization: Bearer <token>'; FastAPI resuelve cada dependencia una
+# sola vez por petición, así que el token se verifica (o se lee de la caché)
+# una vez aunque varias dependencias lo usen. Todas las rutas que escriben
+# lo exigen: el usuario sale siempre del token, nunca del cliente.
+
+import os
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException
+
+from ..services.auth_service import AuthUser, InvalidToken, verify_token
+
+# Valor que enviaba la app antes de tener sesión; se acepta como "el usuario actual".
+# Las mascotas guardadas con este ownerId se asignan a su dueño con
+# `python -m scripts.reassign_legacy_owners`.
+LEGACY_USER_ID = "CURRENT_USER_ID"
+# UIDs con permisos de administración, además de los que tengan el claim 'admin'
+ADMIN_UIDS = {uid.strip() for uid in os.getenv('ADMIN_UIDS', '').split(',') if uid.strip()}
+
+_CHALLENGE = {'WWW-Authenticate': 'Bearer'}
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Token de un encabezado 'Authorization: Bearer <token>' (o None)."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+async def current_user(authorization: Optional[str] = Header(None)) -> AuthUser:
+    """Usuario autenticado de la petición; 401 si no envió un token válido."""
+    token = bearer_token(authorization)
+    if token is None:
+        raise HTTPException(status_code=401, detail="Se requiere iniciar sesión.", headers=_CHALLENGE)
+    try:
+        claims = await verify_token(token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=f"Token inválido: {e}", headers=_CHALLENGE)
+    return AuthUser(claims)
+
+
+def is_admin(user: AuthUser) -> bool:
+    """True si el usuario tiene el claim 'admin' o está en ADMIN_UIDS."""
+    return user.claims.get('admin') is True or user.uid in ADMIN_UIDS
+
+
+async def admin_user(user: AuthUser = Depends(current_user)) -> AuthUser:
+    """Como `current_user`, pero solo administradores (claim 'admin' o ADMIN_UIDS); 403 si no."""
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Se requieren permisos de administrador.")
+    return user
+
+
+def resolve_user_id(user: AuthUser, supplied: Optional[str] = None) -> str:
+    """
+    ID del usuario que hace la petición: siempre el del token. Los clientes
+    antiguos aún envían su ID (o LEGACY_USER_ID); si envían otro, 403.
+    """
+    if supplied and supplied not in (user.uid, LEGACY_USER_ID):
+        raise HTTPException(status_code=403, detail="No puedes actuar en nombre de otro usuario.")
+    return user.uid
+
+
+def require_owner(user: AuthUser, owner_id: Optional[str], detail: str) -> None:
+    """403 si el documento no pertenece al usuario de la petición."""
+    if owner_id != user.uid:
+        raise HTTPException(status_code=403, detail=detail)
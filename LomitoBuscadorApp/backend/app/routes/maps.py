@@ -0,0 +1,176 @@
+from fastapi import APIRouter, Path, Query, HTTPException, Response
+from typing import Dict, Any, List, Tuple
+from ..services.firebase_service import db, stream_query
+from ..services.cache_service import TTLCache
+from ..services.feed_service import load_board_prefix
+from ..services.geo_service import GEOHASH_ALPHABET, cells_in_bbox, geohash_bounds, precision_for_bbox
+from ..services.image_service import thumbnail_url
+from ..services.serialization_service import FastJSONResponse
+import asyncio
+import math
+
+router = APIRouter(prefix="/map", tags=["Map"])
+
+# Número máximo de teselas por petición; si el bbox necesita más, se usan teselas más grandes
+MAX_TILES = 16
+# Puntos máximos que se leen por tesela y capa; si hay más, la tesela se marca 'truncated'
+MAX_POINTS_PER_TILE = 2000
+LAYERS = ('reports', 'sightings')
+
+# Las teselas se recalculan como mucho cada 30 s
+tile_cache = TTLCache(maxsize=4096, ttl=30)
+
+
+def _cluster_precision(zoom: int) -> int:
+    """Precisión geohash con la que se agrupan los puntos para cada nivel de zoom."""
+    if zoom <= 3: return 2
+    if zoom <= 5: return 3
+    if zoom <= 8: return 4
+    if zoom <= 11: return 5
+    if zoom <= 13: return 6
+    return 7
+
+
+def _tile_precision(zoom: int) -> int:
+    """
+    Precisión mínima de las teselas para cada zoom: limita cuánto del mapa
+    (y del tablero) se lee por tesela. Solo con el mundo entero a la vista
+    (zoom <= 3) se aceptan teselas de precisión 1.
+    """
+    return max(1, _cluster_precision(zoom) - 2)
+
+
+def _parse_bbox(bbox: str):
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox debe ser 'minLon,minLat,maxLon,maxLat'")
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)) or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox inválido")
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    # Si min_lon > max_lon el rectángulo cruza el antimeridiano; el ancho se recorta a 360°
+    span = max_lon - min_lon if min_lon <= max_lon else max_lon - min_lon + 360.0
+    if span >= 360.0:
+        return min_lat, -180.0, max_lat, 180.0
+    # Longitudes fuera de ±180 (mapas desplazados) se normalizan; max_lon puede pasar de 180
+    min_lon = ((min_lon + 180.0) % 360.0) - 180.0
+    return min_lat, min_lon, max_lat, min_lon + span
+
+
+async def _layer_points(layer: str, tile: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Puntos {id, geohash, latitude, longitude, thumbnailUrl} de una capa dentro
+    de una tesela, como mucho MAX_POINTS_PER_TILE, y si quedaron puntos sin leer.
+    """
+    points = []
+    if layer == 'reports':
+        entries = await load_board_prefix(tile, MAX_POINTS_PER_TILE + 1)
+        truncated = len(entries) > MAX_POINTS_PER_TILE
+        for report_id, entry in entries[:MAX_POINTS_PER_TILE]:
+            location = entry.get('lastKnownLocation') or {}
+            if location.get('latitude') is None:
+                continue
+            points.append({'id': report_id, 'geohash': entry['geohash'],
+                           'latitude': location['latitude'], 'longitude': location['longitude'],
+                           'thumbnailUrl': entry.get('thumbnailUrl')})
+    else:
+        query = db.collection('publicSightings')\
+            .where('status', '==', 'active')\
+            .where('geohash', '>=', tile)\
+            .where('geohash', '<=', tile + '~')\
+            .limit(MAX_POINTS_PER_TILE + 1)
+        docs = await stream_query(query)
+        truncated = len(docs) > MAX_POINTS_PER_TILE
+        for doc in docs[:MAX_POINTS_PER_TILE]:
+            data = doc.to_dict()
+            location = data.get('location') or {}
+            if location.get('latitude') is None:
+                continue
+            points.append({'id': doc.id, 'geohash': data['geohash'],
+                           'latitude': location.get('latitude'), 'longitude': location.get('longitude'),
+                           'thumbnailUrl': thumbnail_url(data.get('photos'), data.get('photoVariants'))})
+    return points, truncated
+
+
+async def build_tile(layer: str, zoom: int, tile: str) -> Dict[str, Any]:
+    """
+    Agrupa los puntos de una tesela por celda geohash del nivel de zoom:
+    cantidad, centroide y una miniatura representativa por grupo. Si la capa
+    tiene más de MAX_POINTS_PER_TILE puntos en la tesela, los conteos son
+    parciales y la tesela lleva 'truncated': el cliente debe acercarse.
+    """
+    key = f"{layer}:{zoom}:{tile}"
+    cached = tile_cache.get(key)
+    if cached is not None:
+        return cached
+
+    precision = _cluster_precision(zoom)
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    points, truncated = await _layer_points(layer, tile)
+    for point in points:
+        groups.setdefault(point['geohash'][:precision], []).append(point)
+
+    clusters = []
+    for cell, points in groups.items():
+        count = len(points)
+        cluster = {
+            'cell': cell,
+            'count': count,
+            'latitude': sum(p['latitude'] for p in points) / count,
+            'longitude': sum(p['longitude'] for p in points) / count,
+            'thumbnailUrl': next((p['thumbnailUrl'] for p in points if p['thumbnailUrl']), None),
+        }
+        if count == 1:
+            cluster['id'] = points[0]['id']
+        clusters.append(cluster)
+
+    tile_data = {'key': key, 'layer': layer, 'bounds': geohash_bounds(tile), 'clusters': clusters,
+                 'truncated': truncated}
+    tile_cache.set(key, tile_data)
+    return tile_data
+
+
+@router.get("/clusters")
+async def get_map_clusters(
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat"),
+    zoom: int = Query(..., ge=0, le=22, description="Nivel de zoom del mapa"),
+    layers: str = Query(','.join(LAYERS), description="Capas: reports, sightings")
+):
+    """
+    Devuelve los grupos de reportes y avistamientos visibles en el mapa.
+    El resultado se divide en teselas geohash con clave estable
+    ('capa:zoom:celda') que el cliente puede pedir y cachear por separado
+    en /map/tiles/{capa}/{zoom}/{celda}. 'truncated' indica que alguna tesela
+    tiene más puntos de los que se leen y sus conteos son parciales.
+    """
+    min_lat, min_lon, max_lat, max_lon = _parse_bbox(bbox)
+    requested = [layer for layer in layers.split(',') if layer in LAYERS]
+
+    # La precisión se elige contando las celdas (sin enumerarlas) según el tamaño del bbox
+    min_precision = _tile_precision(zoom)
+    tile_precision = precision_for_bbox(min_lat, min_lon, max_lat, max_lon, min_precision, MAX_TILES)
+    if tile_precision < min_precision:
+        raise HTTPException(status_code=400, detail="El bbox es demasiado grande para este nivel de zoom.")
+    tiles = cells_in_bbox(min_lat, min_lon, max_lat, max_lon, tile_precision)
+
+    result = await asyncio.gather(*(build_tile(layer, zoom, tile) for layer in requested for tile in tiles))
+    return FastJSONResponse({'zoom': zoom, 'tiles': list(result),
+                             'truncated': any(tile['truncated'] for tile in result)})
+
+
+@router.get("/tiles/{layer}/{zoom}/{tile}")
+async def get_map_tile(layer: str, tile: str, response: Response, zoom: int = Path(..., ge=0, le=22)):
+    """
+    Una sola tesela de grupos; pensada para cachearse en el cliente o en un CDN.
+    La tesela debe tener al menos la precisión que corresponde al zoom.
+    """
+    if layer not in LAYERS:
+        raise HTTPException(status_code=404, detail="Capa no encontrada")
+    if not 1 <= len(tile) <= 9 or any(char not in GEOHASH_ALPHABET for char in tile):
+        raise HTTPException(status_code=400, detail="Tesela inválida")
+    if len(tile) < _tile_precision(zoom):
+        raise HTTPException(status_code=400, detail=f"Con zoom {zoom} la tesela debe tener al menos "
+                                                    f"{_tile_precision(zoom)} caracteres.")
+    tile_data = await build_tile(layer, zoom, tile)
+    response.headers['Cache-Control'] = f"public, max-age={int(tile_cache.ttl)}"
+    return tile_data
@@ -0,0 +1,36 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Body
+from pydantic import BaseModel
+from ..services.firebase_service import db, run_blocking
+from ..services.geo_service import location_geohash
+from ..services.auth_service import AuthUser
+from .dependencies import current_user, resolve_user_id
+
+router = APIRouter(prefix="/notifications", tags=["Notifications"])
+
+
+class UserLocationPayload(BaseModel):
+    # Con sesión se usa el usuario del token
+    userId: Optional[str] = None
+    latitude: float
+    longitude: float
+
+
+@router.put("/location")
+async def update_user_location(payload: UserLocationPayload = Body(...), user: AuthUser = Depends(current_user)):
+    """
+    Guarda la última ubicación conocida del usuario (y su geohash) para que
+    reciba las alertas de mascotas perdidas cercanas.
+    """
+    user_id = resolve_user_id(user, payload.userId)
+    location = {'latitude': payload.latitude, 'longitude': payload.longitude}
+    try:
+        user_ref = db.collection('users').document(user_id)
+        await run_blocking(user_ref.set, {
+            'lastKnownLocation': location,
+            'geohash': location_geohash(location)
+        }, merge=True)
+        return {"success": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,50 @@
-from fastapi import APIRouter, UploadFile, Form, HTTPException, Body
+from fastapi import APIRouter, Depends, UploadFile, Form, HTTPException, Body, Query, Request
+from pydantic import BaseModel
+from starlette.requests import ClientDisconnect
 from typing import List, Optional, Dict, Any # <-- 1. IMPORTACIONES AÑADIDAS
-import uuid
 from firebase_admin import firestore
+import logging
 
 # Use relative path for imports
-from ..services.firebase_service import db, bucket
+from ..services.firebase_service import db, get_document, run_blocking
+from ..services import matching_service
+from ..services.bulk_service import NDJSON_MEDIA_TYPE, ImportResponse, import_rows, to_ndjson
+from ..services.deletion_service import deletion_queue, pet_storage_prefix, stage_pet_deletion
+from ..services.cache_service import detail_cache, serve_cached
+from ..services.pagination_service import MAX_PAGE_SIZE, decode_cursor, fetch_page
+from ..services.serialization_service import FastJSONResponse, parse_fields, project
+from ..services.upload_service import (check_photo_urls, check_upload_limits, photo_url_error, stored_photo_urls,
+                                       upload_photos, variant_urls)
+from ..services.auth_service import AuthUser
+from .dependencies import current_user, require_owner, resolve_user_id
+from .schemas import PetDetail, PetPage
 
 router = APIRouter(prefix="/pets", tags=["Pets"])
+logger = logging.getLogger(__name__)
+
+
+class BulkPetRow(BaseModel):
+    """Una línea de /pets/bulk-import: los mismos campos que el registro, con las fotos como URLs."""
+    name: str
+    photos: List[str] = []
+    species: str
+    breed: str
+    size: str
+    age: int
+    sex: str
+    colors: List[str]
+    hasSpots: bool = False
+    isVaccinated: bool
+    hasIllness: bool
+    illnessDetails: Optional[str] = None
+    temperament: str
+    specialFeatures: Optional[str] = None
+    ownerName: str
+    ownerPhone: str
+    ownerEmail: str
+    altOwnerName: Optional[str] = None
+    altOwnerPhone: Optional[str] = None
+    address: Optional[str] = None
 
 # =========================================================
 # ENDPOINT DE REGISTRO (POST)
@@ -32,46 +70,107 @@ async def register_pet(
     ownerEmail: str = Form(...),
     altOwnerName: Optional[str] = Form(None),
     altOwnerPhone: Optional[str] = Form(None),
-    address: Optional[str] = Form(None)
+    address: Optional[str] = Form(None),
+    user: AuthUser = Depends(current_user)
 ):
+    check_upload_limits(photos)
+    owner_id = resolve_user_id(user)
     try:
-        owner_id = "CURRENT_USER_ID" 
-        photo_urls = []
-        for photo in photos:
-            file_extension = photo.filename.split('.')[-1] if '.' in photo.filename else 'jpg'
-            file_name = f"pets/{owner_id}/{uuid.uuid4()}.{file_extension}"
-            blob = bucket.blob(file_name)
-            blob.upload_from_file(photo.file, content_type=photo.content_type)
-            blob.make_public()
-            photo_urls.append(blob.public_url)
+        doc_ref = db.collection('pets').document()
+        # Las fotos de cada mascota van en su propia carpeta para poder borrarlas por prefijo
+        photo_variants = await upload_photos(photos, pet_storage_prefix(owner_id, doc_ref.id).rstrip('/'))
+        photo_urls = variant_urls(photo_variants)
         pet_data = {
             'ownerId': owner_id,
-            'basicInfo': { 'name': name, 'photos': photo_urls },
+            'basicInfo': { 'name': name, 'photos': photo_urls, 'photoVariants': photo_variants },
             'specificInfo': { 'species': species, 'breed': breed, 'size': size, 'age': int(age), 'sex': sex, 'isVaccinated': isVaccinated, 'hasIllness': hasIllness, 'illnessDetails': illnessDetails, 'temperament': temperament, 'specialFeatures': specialFeatures, 'colors': colors,
                 'hasSpots': hasSpots },
             'ownerInfo': { 'ownerName': ownerName, 'ownerPhone': ownerPhone, 'ownerEmail': ownerEmail, 'altOwnerName': altOwnerName, 'altOwnerPhone': altOwnerPhone, 'address': address },
             'status': 'safe', 'createdAt': firestore.SERVER_TIMESTAMP   
         }
-        doc_ref = db.collection('pets').document()
-        doc_ref.set(pet_data)
+        await run_blocking(doc_ref.set, pet_data)
         return {"success": True, "petId": doc_ref.id, "message": "¡Mascota registrada exitosamente!"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
 
+# =========================================================
+# ENDPOINT DE IMPORTACIÓN MASIVA (POST, NDJSON)
+# =========================================================
+@router.post("/bulk-import")
+async def bulk_import_pets(request: Request, user: AuthUser = Depends(current_user)):
+    """
+    Registra muchas mascotas a la vez (p. ej. las de un refugio). El cuerpo es
+    NDJSON: una mascota por línea con los campos de BulkPetRow. Cada línea se
+    valida al llegar y se guardan en batches de Firestore; la respuesta es
+    NDJSON con el resultado de cada línea ({"line", "id"} o {"line", "error"}),
+    enviado en cuanto se conoce, y una última línea con el resumen.
+    """
+    owner_id = resolve_user_id(user)
+
+    def build(row: Dict[str, Any], pet_id: str) -> Dict[str, Any]:
+        pet = BulkPetRow.model_validate(row)
+        for url in pet.photos:
+            error = photo_url_error(url, pet_storage_prefix(owner_id, pet_id))
+            if error:
+                raise ValueError(error)
+        return {
+            'ownerId': owner_id,
+            'basicInfo': {'name': pet.name, 'photos': pet.photos},
+            'specificInfo': {'species': pet.species, 'breed': pet.breed, 'size': pet.size, 'age': pet.age, 'sex': pet.sex,
+                'isVaccinated': pet.isVaccinated, 'hasIllness': pet.hasIllness, 'illnessDetails': pet.illnessDetails,
+                'temperament': pet.temperament, 'specialFeatures': pet.specialFeatures, 'colors': pet.colors,
+                'hasSpots': pet.hasSpots},
+            'ownerInfo': {'ownerName': pet.ownerName, 'ownerPhone': pet.ownerPhone, 'ownerEmail': pet.ownerEmail,
+                'altOwnerName': pet.altOwnerName, 'altOwnerPhone': pet.altOwnerPhone, 'address': pet.address},
+            'status': 'safe', 'createdAt': firestore.SERVER_TIMESTAMP,
+        }
+
+    async def lines():
+        try:
+            async for result in import_rows(request.stream(), 'pets', build):
+                yield to_ndjson(result)
+        except ClientDisconnect:
+            # Lo ya guardado se queda; el cliente no verá el resto
+            pass
+        except Exception as e:
+            # La respuesta ya empezó (200): el error va como última línea
+            logger.exception("Error en la importación masiva")
+            yield to_ndjson({'error': f"Ocurrió un error en el servidor: {e}"})
+
+    # El cuerpo se lee mientras se responde; ImportResponse no compite por él
+    return ImportResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
 # =========================================================
 # 2. ENDPOINT DE OBTENER MIS MASCOTAS (GET)
 # =========================================================
-@router.get("/my-pets/{owner_id}")
-async def get_my_pets(owner_id: str):
+@router.get("/my-pets/{owner_id}", response_model=PetPage)
+async def get_my_pets(
+    owner_id: str,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas (p. ej. basicInfo,status)"),
+    user: AuthUser = Depends(current_user)
+):
     """
-    Obtiene todas las mascotas registradas por un usuario específico.
+    Obtiene las mascotas registradas por un usuario específico, de la más
+    reciente a la más antigua, paginadas por cursor. Solo se pueden pedir
+    las propias ('CURRENT_USER_ID' equivale al usuario de la sesión).
     """
+    owner_id = resolve_user_id(user, owner_id)
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    projection = parse_fields(fields)
+
     try:
         pets_ref = db.collection('pets').where('ownerId', '==', owner_id)
-        pets_query = pets_ref.stream()
+        pets_docs, next_cursor = await fetch_page(pets_ref, 'createdAt', limit, after)
         
         pets_list = []
-        for doc in pets_query:
+        for doc in pets_docs:
             pet_data = doc.to_dict()
             pet_data['basicInfo'] = pet_data.get('basicInfo', {})
             pet_data['specificInfo'] = pet_data.get('specificInfo', {})
@@ -80,7 +179,7 @@ async def get_my_pets(owner_id: str):
                  pet_data['basicInfo']['photos'] = []
             pets_list.append(pet_data)
         
-        return {"pets": pets_list}
+        return FastJSONResponse({"pets": project(pets_list, projection, ['petId']), "nextCursor": next_cursor})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
@@ -88,14 +187,19 @@ async def get_my_pets(owner_id: str):
 # =========================================================
 # 3. ENDPOINT PARA OBTENER UNA SOLA MASCOTA (GET) 
 # =========================================================
-@router.get("/{pet_id}")
-async def get_pet_by_id(pet_id: str):
+@router.get("/{pet_id}", response_model=PetDetail)
+async def get_pet_by_id(
+    pet_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas")
+):
     """
     Obtiene los detalles de una mascota específica por su ID de documento.
+    La respuesta se cachea y lleva ETag; si no cambió se responde 304.
     """
-    try:
+    async def build():
         pet_ref = db.collection('pets').document(pet_id)
-        pet_doc = pet_ref.get()
+        pet_doc = await get_document(pet_ref)
 
         if not pet_doc.exists:
             raise HTTPException(status_code=404, detail="Mascota no encontrada")
@@ -103,8 +207,12 @@ async def get_pet_by_id(pet_id: str):
         pet_data = pet_doc.to_dict()
         pet_data['petId'] = pet_doc.id # Añadimos el ID para consistencia
 
-        return {"pet": pet_data}
-    
+        return {"pet": pet_data}, pet_doc.update_time, ()
+
+    try:
+        return await serve_cached(request, f"pet:{pet_id}", build, parse_fields(fields))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -112,13 +220,21 @@ async def get_pet_by_id(pet_id: str):
 # 4. ENDPOINT PARA ACTUALIZAR MASCOTA (PUT)
 # =========================================================
 @router.put("/{pet_id}")
-async def update_pet_details(pet_id: str, pet_data: Dict[str, Any] = Body(...)):
+async def update_pet_details(pet_id: str, pet_data: Dict[str, Any] = Body(...), user: AuthUser = Depends(current_user)):
     """
     Actualiza los detalles de una mascota existente en Firestore.
-    Recibe un cuerpo JSON con los campos a actualizar.
+    Recibe un cuerpo JSON con los campos a actualizar. Solo el dueño puede editarla.
     """
     try:
         pet_ref = db.collection('pets').document(pet_id)
+        pet_doc = await get_document(pet_ref)
+        if not pet_doc.exists:
+            raise HTTPException(status_code=404, detail="Mascota no encontrada")
+        require_owner(user, pet_doc.get('ownerId'), "Solo el dueño puede editar a su mascota.")
+        # Las fotos nuevas de nuestro bucket deben ser de la carpeta de esta mascota
+        # (ver deletion_service); las que ya tenía se aceptan aunque sean antiguas
+        check_photo_urls(pet_data.get('photos') or [], pet_storage_prefix(user.uid, pet_id),
+                         stored_photo_urls(pet_doc.to_dict().get('basicInfo') or {}))
         
         # Reestructuramos los datos para asegurar la consistencia en Firestore
         update_data = {
@@ -141,10 +257,14 @@ async def update_pet_details(pet_id: str, pet_data: Dict[str, Any] = Body(...)):
         }
         
         # 'merge=True' actualiza solo los campos que existen en 'update_data'
-        pet_ref.set(update_data, merge=True)
+        await run_blocking(pet_ref.set, update_data, merge=True)
+        detail_cache.invalidate(f"pet:{pet_id}")
+        matching_service.update_pet(pet_id, update_data['basicInfo'], update_data['specificInfo'])
 
         return {"success": True, "message": "Perfil de la mascota actualizado."}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"No se pudieron guardar los cambios: {e}")
     
@@ -153,36 +273,34 @@ async def update_pet_details(pet_id: str, pet_data: Dict[str, Any] = Body(...)):
 # ENDPOINT PARA ELIMINAR MASCOTA (DELETE) 
 # =========================================================
 @router.delete("/{pet_id}")
-async def delete_pet(pet_id: str):
+async def delete_pet(pet_id: str, user: AuthUser = Depends(current_user)):
     """
-    Elimina una mascota de Firestore por su ID de documento.
+    Elimina una mascota. El documento se borra de inmediato; sus fotos, sus
+    reportes y las fotos de los avistamientos se borran en segundo plano
+    (ver deletion_service).
     """
     try:
         pet_ref = db.collection('pets').document(pet_id)
         
         # 1. Verificar que la mascota exista antes de intentar borrarla.
-        pet_doc = pet_ref.get()
+        pet_doc = await get_document(pet_ref)
         if not pet_doc.exists:
             raise HTTPException(status_code=404, detail="Mascota no encontrada")
+        require_owner(user, pet_doc.get('ownerId'), "Solo el dueño puede eliminar a su mascota.")
         
-        pet_data = pet_doc.to_dict()
-        photo_urls = pet_data.get('basicInfo', {}).get('photos', [])
-        for url in photo_urls:
-            try:
-    # Extraer el nombre del archivo (blob) desde la URL pública
-                if f"{bucket.name}/" in url:
-                     blob_name = url.split(f"{bucket.name}/")[-1].split("?")[0]
-                     blob = bucket.blob(blob_name)
-                     blob.delete()
-            except Exception as e:
-                # Si un archivo no se puede eliminar, registramos el error pero continuamos
-                print(f"No se pudo eliminar el archivo {url} de Storage: {e}")
-        # 2. Eliminar el documento de Firestore.
-        pet_ref.delete()
+        # 2. Borrar el documento y registrar el trabajo de limpieza en un solo batch.
+        batch = db.batch()
+        job_ref = stage_pet_deletion(batch, pet_ref, pet_doc.to_dict())
+        await run_blocking(batch.commit)
+        detail_cache.invalidate(f"pet:{pet_id}")
+        matching_service.unindex_pet(pet_id)
+        deletion_queue.enqueue(job_ref.id)
 
         # 3. Devolver una respuesta exitosa.
         return {"success": True, "message": "Mascota eliminada exitosamente"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Manejar otros posibles errores del servidor.
-        raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")   
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
@@ -1,9 +1,24 @@
-from fastapi import APIRouter, HTTPException, Body, Form, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Body, Form, File, UploadFile, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List
-from ..services.firebase_service import db, bucket
+from typing import Dict, Any, List, Optional
+from ..services.firebase_service import db, get_document, stream_query, run_blocking
+from ..services import feed_service, flyer_service, matching_service
+from ..services.bulk_service import NDJSON_MEDIA_TYPE, export_query
+from ..services.cache_service import detail_cache, serve_cached
+from ..services.geo_service import location_geohash
+from ..services.notification_service import (
+    MAX_NOTIFICATION_RADIUS_KM, MIN_NOTIFICATION_RADIUS_KM, NotificationJob, dispatcher,
+)
+from ..services.pagination_service import MAX_PAGE_SIZE, decode_cursor, encode_cursor, fetch_page
+from ..services.unit_of_work import run_transaction
+from ..services.serialization_service import FastJSONResponse, parse_fields
+from ..services.upload_service import check_upload_limits, upload_photos, variant_urls
+from ..services.auth_service import AuthUser
+from .dependencies import current_user, is_admin, require_owner, resolve_user_id
+from .schemas import ReportDetail
 from firebase_admin import firestore
-import uuid
+import asyncio
 import datetime
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
@@ -11,77 +26,240 @@ router = APIRouter(prefix="/reports", tags=["Reports"])
 
 class CreateReportPayload(BaseModel):
     petId: str
-    ownerId: str
+    # Con sesión se usa el usuario del token; el campo queda por compatibilidad
+    ownerId: Optional[str] = None
     lastSeenLocation: Dict[str, Any] = Field(..., example={"latitude": 19.4326, "longitude": -99.1332, "address": "Zócalo, CDMX"})
-    notificationRadius: int = 24
+    notificationRadius: int = Field(24, ge=MIN_NOTIFICATION_RADIUS_KM, le=MAX_NOTIFICATION_RADIUS_KM)
     notes: str = ""
 
+
+class CloseReportPayload(BaseModel):
+    reason: str = ""
+
 @router.post("/create")
-async def create_lost_report(payload: CreateReportPayload = Body(...)):
-    # ... (Sin cambios aquí)
-    try:
-        pet_ref = db.collection('pets').document(payload.petId)
-        pet_doc = pet_ref.get()
+async def create_lost_report(payload: CreateReportPayload = Body(...), user: AuthUser = Depends(current_user)):
+    """
+    Crea el reporte, marca la mascota como perdida y la publica en el tablero
+    en una sola transacción: se aplican los tres cambios o ninguno.
+    """
+    owner_id = resolve_user_id(user, payload.ownerId)
+    pet_ref = db.collection('pets').document(payload.petId)
+    report_doc_ref = db.collection('lostReports').document()
+
+    def create(uow):
+        pet_doc, = uow.get(pet_ref)
         if not pet_doc.exists:
             raise HTTPException(status_code=404, detail="La mascota a reportar no existe.")
+        pet_data = pet_doc.to_dict()
+        require_owner(user, pet_data.get('ownerId'), "Solo el dueño puede reportar a su mascota.")
+        if pet_data.get('status') == 'lost' and pet_data.get('reportId'):
+            raise HTTPException(status_code=409, detail="La mascota ya tiene un reporte activo.")
         report_data = {
-            'petId': payload.petId, 'ownerId': payload.ownerId,
+            'petId': payload.petId, 'ownerId': owner_id,
             'lastSeenLocation': payload.lastSeenLocation, 'notificationRadius': payload.notificationRadius,
             'notes': payload.notes, 'reportedAt': firestore.SERVER_TIMESTAMP,
+            'geohash': location_geohash(payload.lastSeenLocation),
+            'lastKnownLocation': payload.lastSeenLocation, 'lastSightingAt': None, 'sightingsCount': 0,
             'status': 'active', 'helpersCount': 0, 'viewsCount': 0,
-            'searchRoute': [], 'foundAt': None, 'shareableImageUrl': None, 'shareablePdfUrl': None,
+            'foundAt': None, 'shareableImageUrl': None, 'shareablePdfUrl': None,
         }
-        report_doc_ref = db.collection('lostReports').document()
-        report_doc_ref.set(report_data)
-        pet_ref.update({'status': 'lost', 'reportId': report_doc_ref.id})
-        return {"success": True, "reportId": report_doc_ref.id, "message": "Reporte creado exitosamente."}
+        uow.set(report_doc_ref, report_data)
+        uow.update(pet_ref, {'status': 'lost', 'reportId': report_doc_ref.id})
+        feed_service.stage_upsert(uow, report_doc_ref.id, feed_service.build_entry(report_data, pet_data))
+        return report_data, pet_data
+
+    try:
+        report_data, pet_data = await run_transaction(create)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
+    detail_cache.invalidate(f"pet:{payload.petId}")
+    matching_service.index_report(report_doc_ref.id, report_data, pet_data)
 
-@router.get("/{report_id}")
-async def get_report_by_id(report_id: str):
-    
+    location = payload.lastSeenLocation
+    if location.get('latitude') is not None and location.get('longitude') is not None:
+        pet_name = pet_data.get('basicInfo', {}).get('name', 'Una mascota')
+        dispatcher.enqueue(NotificationJob(
+            latitude=location['latitude'], longitude=location['longitude'],
+            radius_km=payload.notificationRadius,
+            title="¡Mascota perdida cerca de ti!",
+            body=f"{pet_name} se perdió cerca de {location.get('address', 'tu zona')}. ¿La has visto?",
+            data={'type': 'lost_report', 'reportId': report_doc_ref.id},
+            exclude_user_ids=[owner_id]
+        ))
+    # El cartel se dibuja en segundo plano para que esté listo cuando el dueño lo comparta
+    flyer_service.schedule(report_doc_ref.id)
+    return {"success": True, "reportId": report_doc_ref.id, "message": "Reporte creado exitosamente."}
+
+
+async def _finish_report(report_id: str, user: AuthUser, status: str, changes: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cierra un reporte activo (encontrado o cancelado) en una transacción:
+    actualiza el reporte, devuelve la mascota a 'safe' y la quita del tablero.
+    Solo el dueño del reporte puede cerrarlo.
+    """
+    report_ref = db.collection('lostReports').document(report_id)
+
+    def finish(uow):
+        report_doc, = uow.get(report_ref)
+        if not report_doc.exists:
+            raise HTTPException(status_code=404, detail="Reporte no encontrado")
+        report_data = report_doc.to_dict()
+        require_owner(user, report_data.get('ownerId'), "Solo el dueño puede cerrar su reporte.")
+        if report_data.get('status') != 'active':
+            raise HTTPException(status_code=409, detail="El reporte ya no está activo.")
+        pet_ref = db.collection('pets').document(report_data['petId'])
+        pet_doc, = uow.get(pet_ref)
+
+        uow.update(report_ref, {'status': status, **changes})
+        # Solo se libera la mascota si este sigue siendo su reporte vigente
+        if pet_doc.exists and pet_doc.get('reportId') == report_id:
+            uow.update(pet_ref, {'status': 'safe', 'reportId': firestore.DELETE_FIELD})
+        feed_service.stage_remove(uow, report_id)
+        return report_data
+
+    report_data = await run_transaction(finish)
+    matching_service.unindex_report(report_id)
+    detail_cache.invalidate(f"report:{report_id}")
+    detail_cache.invalidate(f"pet:{report_data['petId']}")
+    return report_data
+
+
+@router.post("/{report_id}/found")
+async def mark_pet_found(report_id: str, user: AuthUser = Depends(current_user)):
+    """Marca la mascota del reporte como encontrada."""
     try:
+        await _finish_report(report_id, user, 'found', {'foundAt': firestore.SERVER_TIMESTAMP})
+        return {"success": True, "message": "¡Qué alegría! La mascota fue marcada como encontrada."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
+
+
+@router.post("/{report_id}/close")
+async def close_report(
+    report_id: str,
+    payload: CloseReportPayload = Body(CloseReportPayload()),
+    user: AuthUser = Depends(current_user)
+):
+    """Cierra el reporte sin que la mascota haya aparecido (p. ej. publicado por error)."""
+    try:
+        await _finish_report(report_id, user, 'closed', {'closedAt': firestore.SERVER_TIMESTAMP, 'closeReason': payload.reason})
+        return {"success": True, "message": "Reporte cerrado."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
+
+@router.get("/export")
+async def export_reports(
+    status: Optional[str] = Query(None, description="Filtra por estado: active, found o closed"),
+    owner_id: Optional[str] = Query(None, description="Filtra por dueño (solo administradores)"),
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas"),
+    user: AuthUser = Depends(current_user)
+):
+    """
+    Exporta los reportes como NDJSON (uno por línea), del más reciente al más
+    antiguo. Se leen y se envían página a página; nunca está la lista completa en memoria.
+    Llevan los datos de contacto del dueño: cada usuario exporta solo los suyos
+    y únicamente los administradores pueden exportar los de otros o todos.
+    """
+    if not is_admin(user):
+        owner_id = resolve_user_id(user, owner_id)
+    projection = parse_fields(fields)
+    query = db.collection('lostReports')
+    if status:
+        query = query.where('status', '==', status)
+    if owner_id:
+        query = query.where('ownerId', '==', owner_id)
+    return StreamingResponse(export_query(query, 'reportedAt', 'reportId', projection), media_type=NDJSON_MEDIA_TYPE)
+
+@router.get("/{report_id}", response_model=ReportDetail)
+async def get_report_by_id(
+    report_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos a incluir; p. ej. sin searchRoute para las vistas de lista")
+):
+    """
+    Detalle del reporte con la mascota y la ruta de búsqueda.
+    La respuesta se cachea y lleva ETag; si no cambió se responde 304.
+    """
+    async def build():
         report_ref = db.collection('lostReports').document(report_id)
-        report_doc = report_ref.get()
+        report_doc = await get_document(report_ref)
         if not report_doc.exists:
             raise HTTPException(status_code=404, detail="Reporte no encontrado")
         report_data = report_doc.to_dict()
-        pet_ref = db.collection('pets').document(report_data['petId'])
-        pet_doc = pet_ref.get()
+        # La mascota y la ruta de búsqueda son independientes: se leen a la vez
+        route_query = report_ref.collection('searchRoute').order_by('timestamp')
+        pet_doc, route_docs = await asyncio.gather(
+            get_document(db.collection('pets').document(report_data['petId'])),
+            stream_query(route_query)
+        )
         if not pet_doc.exists:
             raise HTTPException(status_code=404, detail="La mascota asociada a este reporte ya no existe.")
         pet_data = pet_doc.to_dict()
+        # Los reportes antiguos guardaban la ruta como arreglo dentro del documento
+        report_data['searchRoute'] = report_data.get('searchRoute', []) + [
+            {**doc.to_dict(), 'sightingId': doc.id} for doc in route_docs
+        ]
         full_report_details = { **report_data, 'reportId': report_doc.id, 'petInfo': pet_data }
-        return {"report": full_report_details}
+        # El cuerpo incluye la mascota: su versión también forma parte del ETag
+        version = (report_doc.update_time, pet_doc.update_time)
+        return {"report": full_report_details}, version, [f"pet:{report_data['petId']}"]
+
+    try:
+        return await serve_cached(request, f"report:{report_id}", build, parse_fields(fields))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))    
 
+@router.get("/{report_id}/flyer")
+async def get_report_flyer(report_id: str, user: AuthUser = Depends(current_user)):
+    """
+    URLs del cartel "SE BUSCA" del reporte (JPG y PDF). Si los datos de la
+    mascota o del reporte no cambiaron se devuelve el ya generado. Dibujar y
+    subir un cartel es caro: se exige sesión y la regla 'flyer' de
+    rate_limit_service limita las peticiones por usuario.
+    """
+    try:
+        flyer = await flyer_service.refresh_flyer(report_id)
+        if flyer is None:
+            raise HTTPException(status_code=404, detail="Reporte no encontrado")
+        if not flyer['cached']:
+            detail_cache.invalidate(f"report:{report_id}")
+        return {"success": True, "imageUrl": flyer['imageUrl'], "pdfUrl": flyer['pdfUrl']}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/{report_id}/sighting")
 async def add_sighting_to_report(
     report_id: str,
-    reportedBy: str = Form(...),
+    reportedBy: Optional[str] = Form(None),
     latitude: float = Form(...),
     longitude: float = Form(...),
     address: str = Form(...),
     notes: str = Form(...),
-    photos: List[UploadFile] = File([])
+    photos: List[UploadFile] = File([]),
+    user: AuthUser = Depends(current_user)
 ):
+    check_upload_limits(photos)
+    reportedBy = resolve_user_id(user, reportedBy)
     try:
         report_ref = db.collection('lostReports').document(report_id)
-        report_doc = report_ref.get()
+        report_doc = await get_document(report_ref)
 
         if not report_doc.exists:
             raise HTTPException(status_code=404, detail="El reporte al que intentas añadir un avistamiento no existe.")
 
-        photo_urls = []
-        for photo in photos:
-            file_extension = photo.filename.split('.')[-1]
-            file_name = f"sightings/{report_id}/{uuid.uuid4()}.{file_extension}"
-            blob = bucket.blob(file_name)
-            blob.upload_from_file(photo.file, content_type=photo.content_type)
-            blob.make_public()
-            photo_urls.append(blob.public_url)
+        photo_variants = await upload_photos(photos, f"sightings/{report_id}")
+        photo_urls = variant_urls(photo_variants)
         
     
         # Generar la fecha.
@@ -92,20 +270,85 @@ async def add_sighting_to_report(
                 'longitude': longitude,
                 'address': address
             },
+            'geohash': location_geohash({'latitude': latitude, 'longitude': longitude}),
             'notes': notes,
             'photos': photo_urls,
+            'photoVariants': photo_variants,
             'timestamp': datetime.datetime.now(datetime.timezone.utc) 
         }
 
-        report_ref.update({
-            'searchRoute': firestore.ArrayUnion([sighting_data])
+        # El avistamiento va a la subcolección y el reporte guarda solo el
+        # último punto conocido (y su geohash) y el contador, en un mismo batch.
+        batch = db.batch()
+        batch.set(report_ref.collection('searchRoute').document(), sighting_data)
+        batch.update(report_ref, {
+            'lastKnownLocation': sighting_data['location'],
+            'lastSightingAt': sighting_data['timestamp'],
+            'sightingsCount': firestore.Increment(1),
+            'geohash': sighting_data['geohash']
         })
+        await run_blocking(batch.commit)
+        detail_cache.invalidate(f"report:{report_id}")
+
+        report_data = report_doc.to_dict()
+        if report_data.get('status') == 'active':
+            await feed_service.record_sighting(
+                report_id, sighting_data['location'], sighting_data['geohash'], sighting_data['timestamp']
+            )
+            matching_service.move_report(report_id, sighting_data['location'])
+
+        # Se avisa al dueño y a los vecinos del nuevo punto
+        dispatcher.enqueue(NotificationJob(
+            latitude=latitude, longitude=longitude,
+            radius_km=report_data.get('notificationRadius', 24),
+            title="Nuevo avistamiento",
+            body=f"Alguien vio a una mascota perdida cerca de {address}.",
+            data={'type': 'sighting', 'reportId': report_id},
+            exclude_user_ids=[reportedBy],
+            extra_user_ids=[report_data.get('ownerId')]
+        ))
 
         return {"success": True, "message": "Avistamiento añadido exitosamente."}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("--- ERROR DETALLADO AL PROCESAR AVISTAMIENTO ---")
         import traceback
         traceback.print_exc()
         print("---------------------------------")
-        raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error en el servidor: {e}")
+
+
+@router.get("/{report_id}/route")
+async def get_report_route(
+    report_id: str,
+    cursor: Optional[str] = Query(None, description="Cursor de la respuesta anterior"),
+    since: Optional[datetime.datetime] = Query(None, description="(Antiguo) Solo los puntos posteriores a esta fecha (ISO 8601)"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Límite de puntos")
+):
+    """
+    Devuelve los avistamientos de la ruta de búsqueda en orden cronológico,
+    paginados por (timestamp, id). El cliente envía en `cursor` el
+    `nextCursor` de la respuesta anterior: si `hasMore` es falso, el mismo
+    cursor sirve más tarde para recibir únicamente los puntos nuevos.
+    """
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        route_query = db.collection('lostReports').document(report_id).collection('searchRoute')
+        if since is not None and after is None:
+            route_query = route_query.where('timestamp', '>', since)
+        route_docs, more = await fetch_page(route_query, 'timestamp', limit, after, firestore.Query.ASCENDING)
+
+        route = [{**doc.to_dict(), 'sightingId': doc.id} for doc in route_docs]
+        if route_docs:
+            last = route_docs[-1]
+            cursor = encode_cursor(last.get('timestamp'), last.id)
+        next_since = route[-1]['timestamp'] if route else since
+        return FastJSONResponse({"route": route, "nextCursor": cursor, "hasMore": more is not None,
+                                 "nextSince": next_since})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,173 @@
+# RUTA: backend/app/routes/schemas.py
+#
+# Modelos de las respuestas de la API (documentación OpenAPI y contrato con la
+# app). Todos los campos son opcionales porque `?fields=` puede omitirlos, y
+# se admiten campos extra para no romper documentos antiguos de Firestore.
+# Los listados no validan con estos modelos en cada petición: devuelven
+# FastJSONResponse directamente y los modelos solo describen la forma.
+# tests/test_schemas.py comprueba que la salida real de cada ruta valida y no
+# trae campos sin declarar: un campo nuevo en una respuesta se declara aquí.
+
+import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+
+class Schema(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
+
+class Location(Schema):
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    address: Optional[str] = None
+
+
+class UserProfile(Schema):
+    name: Optional[str] = None
+    photo: Optional[str] = None
+
+
+class Comment(Schema):
+    commentId: Optional[str] = None
+    userId: Optional[str] = None
+    userName: Optional[str] = None
+    comment: Optional[str] = None
+    timestamp: Optional[datetime.datetime] = None
+
+
+class BasicInfo(Schema):
+    name: Optional[str] = None
+    photos: Optional[List[str]] = None
+    photoVariants: Optional[List[Dict[str, str]]] = None
+
+
+class SpecificInfo(Schema):
+    species: Optional[str] = None
+    breed: Optional[str] = None
+    size: Optional[str] = None
+    age: Optional[int] = None
+    sex: Optional[str] = None
+    colors: Optional[List[str]] = None
+    hasSpots: Optional[bool] = None
+    isVaccinated: Optional[bool] = None
+    hasIllness: Optional[bool] = None
+    illnessDetails: Optional[str] = None
+    temperament: Optional[str] = None
+    specialFeatures: Optional[str] = None
+
+
+class OwnerInfo(Schema):
+    ownerName: Optional[str] = None
+    ownerPhone: Optional[str] = None
+    ownerEmail: Optional[str] = None
+    altOwnerName: Optional[str] = None
+    altOwnerPhone: Optional[str] = None
+    address: Optional[str] = None
+
+
+class Pet(Schema):
+    petId: Optional[str] = None
+    ownerId: Optional[str] = None
+    # Dueño anterior ('CURRENT_USER_ID'), ver scripts/reassign_legacy_owners.py
+    legacyOwnerId: Optional[str] = None
+    status: Optional[str] = None
+    reportId: Optional[str] = None
+    basicInfo: Optional[BasicInfo] = None
+    specificInfo: Optional[SpecificInfo] = None
+    ownerInfo: Optional[OwnerInfo] = None
+    createdAt: Optional[datetime.datetime] = None
+
+
+class RoutePoint(Schema):
+    """Un avistamiento de la ruta de búsqueda, tal como se guarda en 'searchRoute'."""
+    sightingId: Optional[str] = None
+    reportedBy: Optional[str] = None
+    location: Optional[Location] = None
+    geohash: Optional[str] = None
+    notes: Optional[str] = None
+    photos: Optional[List[str]] = None
+    photoVariants: Optional[List[Dict[str, str]]] = None
+    timestamp: Optional[datetime.datetime] = None
+
+
+class Report(Schema):
+    reportId: Optional[str] = None
+    petId: Optional[str] = None
+    ownerId: Optional[str] = None
+    status: Optional[str] = None
+    lastSeenLocation: Optional[Location] = None
+    lastKnownLocation: Optional[Location] = None
+    geohash: Optional[str] = None
+    notificationRadius: Optional[int] = None
+    notes: Optional[str] = None
+    reportedAt: Optional[datetime.datetime] = None
+    lastSightingAt: Optional[datetime.datetime] = None
+    sightingsCount: Optional[int] = None
+    helpersCount: Optional[int] = None
+    viewsCount: Optional[int] = None
+    foundAt: Optional[datetime.datetime] = None
+    closedAt: Optional[datetime.datetime] = None
+    closeReason: Optional[str] = None
+    shareableImageUrl: Optional[str] = None
+    shareablePdfUrl: Optional[str] = None
+    flyerHash: Optional[str] = None
+    # Entradas del tablero (feed_service.build_entry): la mascota ya proyectada
+    petName: Optional[str] = None
+    thumbnailUrl: Optional[str] = None
+    species: Optional[str] = None
+    distanceInKm: Optional[float] = None
+    petInfo: Optional[Pet] = None
+    searchRoute: Optional[List[RoutePoint]] = None
+    sightingMatches: Optional[List[Dict[str, Any]]] = None
+
+
+class Sighting(Schema):
+    sightingId: Optional[str] = None
+    reportedBy: Optional[Union[UserProfile, str]] = None
+    location: Optional[Location] = None
+    geohash: Optional[str] = None
+    photos: Optional[List[str]] = None
+    photoVariants: Optional[List[Dict[str, str]]] = None
+    thumbnailUrl: Optional[str] = None
+    description: Optional[str] = None
+    petDescription: Optional[Dict[str, Any]] = None
+    timestamp: Optional[datetime.datetime] = None
+    comments: Optional[List[Comment]] = None
+    commentsCount: Optional[int] = None
+    status: Optional[str] = None
+    distanceInKm: Optional[float] = None
+    matches: Optional[List[Dict[str, Any]]] = None
+
+
+class PetPage(Schema):
+    pets: List[Pet]
+    nextCursor: Optional[str] = None
+
+
+class ReportPage(Schema):
+    reports: List[Report]
+    nextCursor: Optional[str] = None
+
+
+class SightingPage(Schema):
+    sightings: List[Sighting]
+    nextCursor: Optional[str] = None
+
+
+class CommentPage(Schema):
+    comments: List[Comment]
+    nextCursor: Optional[str] = None
+
+
+class PetDetail(Schema):
+    pet: Pet
+
+
+class ReportDetail(Schema):
+    report: Report
+
+
+class SightingDetail(Schema):
+    sighting: Sighting
@@ -1,118 +1,185 @@
-from fastapi import APIRouter, Query, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Form, Request
 from typing import Optional, List
-from ..services.firebase_service import db, bucket
+from ..services.firebase_service import db, get_document, run_blocking
+from ..services import matching_service
+from ..services.cache_service import detail_cache, serve_cached
+from ..services.geo_service import (
+    covering_cells, location_geohash, within_radius,
+    encode_distance_cursor, decode_distance_cursor,
+)
+from ..services.feed_service import load_board, rebuild_board
+from ..services.hydration_service import fetch_user_profiles
+from ..services.image_service import thumbnail_url
+from ..services.pagination_service import MAX_PAGE_SIZE, decode_cursor, fetch_page
+from ..services.serialization_service import FastJSONResponse, parse_fields, project
+from ..services.upload_service import check_upload_limits, upload_photos, variant_urls
+from ..services.unit_of_work import run_transaction
+from ..services.auth_service import AuthUser
+from .dependencies import admin_user, current_user, resolve_user_id
+from .schemas import CommentPage, ReportPage, SightingDetail, SightingPage
 from firebase_admin import firestore
-import uuid
-import math
 import datetime
+import logging
 import traceback # Importamos traceback para el diagnóstico
 
 router = APIRouter(prefix="/sightings", tags=["sightings"])
+logger = logging.getLogger(__name__)
 
-def _calculate_haversine_distance(lat1, lon1, lat2, lon2):
-    """Calcula la distancia en kilómetros entre dos puntos usando la fórmula de Haversine."""
-    R = 6371
-    dLat = math.radians(lat2 - lat1)
-    dLon = math.radians(lon2 - lon1)
-    a = (math.sin(dLat / 2) ** 2 +
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-         math.sin(dLon / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    distance = R * c
-    return round(distance, 2)
-
-@router.get("/active-reports")
+# Comentarios que se guardan dentro del documento; el resto solo en la subcolección 'comments'
+MAX_INLINE_COMMENTS = 20
+MAX_COMMENT_LENGTH = 500
+
+@router.get("/active-reports", response_model=ReportPage)
 async def get_active_reports(
     user_lat: float = Query(..., description="Latitud actual del usuario"),
     user_lon: float = Query(..., description="Longitud actual del usuario"),
-    limit: int = Query(20, description="Límite de resultados"),
-    offset: int = Query(0, description="Offset para paginación")
+    radius_km: float = Query(40, gt=0, le=150, description="Radio de búsqueda en km"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Límite de resultados"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas (p. ej. petInfo.basicInfo.name)")
 ):
-    """Obtener feed de reportes activos con distancia calculada."""
+    """
+    Obtener feed de reportes activos cercanos, ordenados por distancia real.
+    Se lee la proyección precalculada del tablero ('activeBoard') de las celdas
+    que cubren el radio; no se consulta ningún reporte ni mascota.
+    """
     try:
-        reports_ref = db.collection('lostReports')\
-            .where('status', '==', 'active')\
-            .order_by('reportedAt', direction=firestore.Query.DESCENDING)\
-            .limit(limit).offset(offset)
-        
+        after = decode_distance_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    projection = parse_fields(fields)
+
+    try:
+        entries = await load_board(covering_cells(user_lat, user_lon, radius_km))
+
+        located = [(report_id, entry) for report_id, entry in entries
+                   if (entry.get('lastKnownLocation') or {}).get('latitude') is not None]
+        indices, distances = within_radius(
+            user_lat, user_lon,
+            [entry['lastKnownLocation']['latitude'] for _, entry in located],
+            [entry['lastKnownLocation']['longitude'] for _, entry in located],
+            radius_km
+        )
+
+        nearby = []
+        for index, distance in zip(indices.tolist(), distances.tolist()):
+            report_id, entry = located[index]
+            if after and (distance, report_id) <= after:
+                continue
+            nearby.append((distance, report_id, entry))
+
+        # Ya vienen ordenados por distancia; el ID desempata para que el cursor sea estable
+        nearby.sort(key=lambda item: (item[0], item[1]))
+
+        page = nearby[:limit]
+        next_cursor = None
+        if len(nearby) > limit:
+            last_distance, last_id = page[-1][0], page[-1][1]
+            next_cursor = encode_distance_cursor(last_distance, last_id)
+
         reports_list = []
-        for doc in reports_ref.stream():
-            report_data = doc.to_dict()
-            
-            if 'reportedAt' in report_data and isinstance(report_data['reportedAt'], datetime.datetime):
-                report_data['reportedAt'] = report_data['reportedAt'].isoformat()
-            
-            search_route = report_data.get('searchRoute', [])
-            for sighting in search_route:
-                if 'timestamp' in sighting and isinstance(sighting['timestamp'], datetime.datetime):
-                    sighting['timestamp'] = sighting['timestamp'].isoformat()
-
-            pet_ref = db.collection('pets').document(report_data['petId'])
-            pet_doc = pet_ref.get()
-            if not pet_doc.exists: continue
-            pet_data = pet_doc.to_dict()
-            
-            last_known_location = search_route[-1].get('location') if search_route else report_data.get('lastSeenLocation')
-            distance = None
-            if last_known_location and 'latitude' in last_known_location:
-                distance = _calculate_haversine_distance(user_lat, user_lon, last_known_location['latitude'], last_known_location['longitude'])
-
-            report_data['reportId'] = doc.id
-            report_data['petInfo'] = pet_data
-            report_data['lastSeenLocation'] = last_known_location
-            report_data['distanceInKm'] = distance
-            reports_list.append(report_data)
-        
-        reports_list.sort(key=lambda r: r.get('distanceInKm') if r.get('distanceInKm') is not None else float('inf'))
-        return {'reports': reports_list}
+        for distance, report_id, entry in page:
+            entry['reportId'] = report_id
+            entry['lastSeenLocation'] = entry['lastKnownLocation']
+            entry['distanceInKm'] = distance
+            # Subconjunto de 'petInfo' que usan las versiones actuales de la app
+            entry['petInfo'] = {
+                'basicInfo': {'name': entry.get('petName'), 'photos': [entry['thumbnailUrl']] if entry.get('thumbnailUrl') else []},
+                'specificInfo': {'species': entry.get('species')}
+            }
+            reports_list.append(entry)
+
+        return FastJSONResponse({'reports': project(reports_list, projection, ['reportId']), 'nextCursor': next_cursor})
     except Exception as e:
         print("\n--- ERROR DETALLADO EN GET ACTIVE REPORTS ---")
         traceback.print_exc()
         print("-----------------------------------------\n")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/public-sightings")
+@router.post("/active-reports/rebuild")
+async def rebuild_active_board(admin: AuthUser = Depends(admin_user)):
+    """Reconstruye la proyección del tablero de reportes activos desde cero (solo administradores)."""
+    try:
+        count = await rebuild_board()
+        return {"success": True, "reports": count}
+    except Exception as e:
+        logger.exception("Error al reconstruir el tablero de reportes activos")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/matches/rebuild")
+async def rebuild_match_index(admin: AuthUser = Depends(admin_user)):
+    """Reconstruye el índice de coincidencias de este proceso a partir de los reportes activos (solo administradores)."""
+    try:
+        count = await matching_service.rebuild_index()
+        return {"success": True, "reports": count}
+    except Exception as e:
+        logger.exception("Error al reconstruir el índice de coincidencias")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/public-sightings/{sighting_id}/matches")
+async def get_sighting_matches(sighting_id: str):
+    """Reportes de mascotas perdidas que coinciden con el avistamiento, de mayor a menor puntuación."""
+    try:
+        sighting_doc = await get_document(db.collection('publicSightings').document(sighting_id))
+        if not sighting_doc.exists:
+            raise HTTPException(status_code=404, detail="Avistamiento no encontrado")
+        return {'matches': sighting_doc.to_dict().get('matches', [])}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/public-sightings", response_model=SightingPage)
 async def get_public_sightings(
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     radius: Optional[float] = None,
-    limit: int = Query(20),
-    offset: int = Query(0)
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas (p. ej. sightingId,thumbnailUrl)")
 ):
     """Obtener tablero público de avistamientos sin reporte formal"""
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    projection = parse_fields(fields)
+
     try:
         sightings_ref = db.collection('publicSightings')\
-            .where('status', '==', 'active')\
-            .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-            .limit(limit).offset(offset)
+            .where('status', '==', 'active')
+        page_docs, next_cursor = await fetch_page(sightings_ref, 'timestamp', limit, after)
         
+        page_data = [doc.to_dict() for doc in page_docs]
+        distances = {}
+        if latitude and longitude and radius:
+            # Filtro por radio de toda la página en una sola pasada vectorizada
+            indices, page_distances = within_radius(
+                latitude, longitude,
+                [d['location']['latitude'] for d in page_data],
+                [d['location']['longitude'] for d in page_data],
+                radius
+            )
+            distances = dict(zip(indices.tolist(), page_distances.tolist()))
+
         sightings = []
-        for doc in sightings_ref.stream():
-            sighting_data = doc.to_dict()
-            
+        for index, (doc, sighting_data) in enumerate(zip(page_docs, page_data)):
             if latitude and longitude and radius:
-                sighting_location = sighting_data['location']
-                distance = _calculate_haversine_distance(latitude, longitude, sighting_location['latitude'], sighting_location['longitude'])
-                if distance > radius: continue
+                if index not in distances: continue
+                sighting_data['distanceInKm'] = distances[index]
             
-            user_ref = db.collection('users').document(sighting_data['reportedBy'])
-            user_doc = user_ref.get()
-            user_data = user_doc.to_dict() if user_doc.exists else {}
-
-            if 'timestamp' in sighting_data and isinstance(sighting_data['timestamp'], datetime.datetime):
-                sighting_data['timestamp'] = sighting_data['timestamp'].isoformat()
-            
-            comments = sighting_data.get('comments', [])
-            for comment in comments:
-                 if 'timestamp' in comment and isinstance(comment['timestamp'], datetime.datetime):
-                    comment['timestamp'] = comment['timestamp'].isoformat()
+            sighting_data.setdefault('commentsCount', len(sighting_data.get('comments', [])))
 
             sighting_data['sightingId'] = doc.id
-            sighting_data['reportedBy'] = {'name': user_data.get('displayName', 'Usuario'), 'photo': user_data.get('photoURL')}
-            
+            sighting_data['thumbnailUrl'] = thumbnail_url(sighting_data.get('photos'), sighting_data.get('photoVariants'))
             sightings.append(sighting_data)
+
+        # Todos los autores de la página se resuelven en una sola llamada
+        profiles = await fetch_user_profiles(s['reportedBy'] for s in sightings)
+        for sighting_data in sightings:
+            sighting_data['reportedBy'] = profiles[sighting_data['reportedBy']]
         
-        return {'sightings': sightings}
+        return FastJSONResponse({'sightings': project(sightings, projection, ['sightingId']), 'nextCursor': next_cursor})
     except Exception as e:
         print("\n--- ERROR DETALLADO AL OBTENER AVISTAMIENTOS PÚBLICOS ---")
         traceback.print_exc()
@@ -120,14 +187,19 @@ async def get_public_sightings(
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- ¡NUEVO ENDPOINT AÑADIDO! ---
-@router.get("/public-sightings/{sighting_id}")
-async def get_public_sighting_details(sighting_id: str):
+@router.get("/public-sightings/{sighting_id}", response_model=SightingDetail)
+async def get_public_sighting_details(
+    sighting_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas")
+):
     """
     Obtiene los detalles de un avistamiento público específico por su ID.
+    La respuesta se cachea y lleva ETag; si no cambió se responde 304.
     """
-    try:
+    async def build():
         sighting_ref = db.collection('publicSightings').document(sighting_id)
-        sighting_doc = sighting_ref.get()
+        sighting_doc = await get_document(sighting_ref)
 
         if not sighting_doc.exists:
             raise HTTPException(status_code=404, detail="Avistamiento no encontrado")
@@ -135,24 +207,18 @@ async def get_public_sighting_details(sighting_id: str):
         sighting_data = sighting_doc.to_dict()
         
         # --- Obtener info del usuario ---
-        user_ref = db.collection('users').document(sighting_data['reportedBy'])
-        user_doc = user_ref.get()
-        user_data = user_doc.to_dict() if user_doc.exists else {}
-        sighting_data['reportedBy'] = {'name': user_data.get('displayName', 'Usuario'), 'photo': user_data.get('photoURL')}
-
-        # --- Formatear fechas (principal y comentarios) ---
-        if 'timestamp' in sighting_data and isinstance(sighting_data['timestamp'], datetime.datetime):
-            sighting_data['timestamp'] = sighting_data['timestamp'].isoformat()
-        
-        comments = sighting_data.get('comments', [])
-        for comment in comments:
-             if 'timestamp' in comment and isinstance(comment['timestamp'], datetime.datetime):
-                comment['timestamp'] = comment['timestamp'].isoformat()
+        sighting_data['reportedBy'] = (await fetch_user_profiles([sighting_data['reportedBy']]))[sighting_data['reportedBy']]
+
+        sighting_data.setdefault('commentsCount', len(sighting_data.get('comments', [])))
         
         sighting_data['sightingId'] = sighting_doc.id
 
-        return {"sighting": sighting_data}
-    
+        return {"sighting": sighting_data}, sighting_doc.update_time, ()
+
+    try:
+        return await serve_cached(request, f"sighting:{sighting_id}", build, parse_fields(fields))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"\n--- ERROR AL OBTENER DETALLE DE AVISTAMIENTO PÚBLICO ---")
         traceback.print_exc()
@@ -161,7 +227,7 @@ async def get_public_sighting_details(sighting_id: str):
 
 @router.post("/public-sightings/create")
 async def create_public_sighting(
-    reported_by: str = Form(...), 
+    reported_by: Optional[str] = Form(None),
     latitude: float = Form(...), 
     longitude: float = Form(...), 
     address: str = Form(...),
@@ -169,30 +235,37 @@ async def create_public_sighting(
     species: str = Form(...), 
     approximate_size: str = Form(...),
     colors: List[str] = Form(...), 
-    photos: List[UploadFile] = File([])
+    photos: List[UploadFile] = File([]),
+    user: AuthUser = Depends(current_user)
 ):
     """Crear avistamiento público (sin reporte formal)"""
+    check_upload_limits(photos)
+    reported_by = resolve_user_id(user, reported_by)
     try:
-        photo_urls = []
-        for photo in photos:
-            blob = bucket.blob(f'public_sightings/{uuid.uuid4()}.jpg')
-            blob.upload_from_string(await photo.read(), content_type=photo.content_type)
-            blob.make_public()
-            photo_urls.append(blob.public_url)
+        photo_variants = await upload_photos(photos, 'public_sightings')
+        photo_urls = variant_urls(photo_variants)
         
         sighting_data = {
             'reportedBy': reported_by,
             'location': {'latitude': latitude, 'longitude': longitude, 'address': address},
+            'geohash': location_geohash({'latitude': latitude, 'longitude': longitude}),
             'photos': photo_urls,
+            'photoVariants': photo_variants,
             'description': description,
             'petDescription': {'species': species, 'approximateSize': approximate_size, 'colors': colors},
             'timestamp': firestore.SERVER_TIMESTAMP,
             'comments': [],
+            'commentsCount': 0,
             'status': 'active'
         }
         
-        db.collection('publicSightings').add(sighting_data)
-        return {'success': True, 'message': 'Avistamiento público creado'}
+        sighting_ref = db.collection('publicSightings').document()
+        await run_blocking(sighting_ref.set, sighting_data)
+        # Las coincidencias con reportes de mascotas perdidas se buscan en segundo plano
+        matching_service.schedule(sighting_ref.id, sighting_data)
+        return {'success': True, 'sightingId': sighting_ref.id, 'message': 'Avistamiento público creado'}
+    except HTTPException:
+        raise
     except Exception as e:
         print("\n--- ERROR AL CREAR AVISTAMIENTO PÚBLICO ---")
         traceback.print_exc()
@@ -200,26 +273,76 @@ async def create_public_sighting(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/public-sightings/{sighting_id}/comment")
-async def add_comment_to_sighting(sighting_id: str, user_id: str, comment: str):
-    """Agregar comentario a un avistamiento público"""
+async def add_comment_to_sighting(
+    sighting_id: str,
+    user_id: Optional[str] = None,
+    comment: str = Query(..., min_length=1, max_length=MAX_COMMENT_LENGTH),
+    user: AuthUser = Depends(current_user)
+):
+    """
+    Agregar comentario a un avistamiento público. Todos los comentarios se
+    guardan en la subcolección 'comments'; el documento solo conserva los
+    últimos MAX_INLINE_COMMENTS para el detalle y el tablero.
+    """
+    user_id = resolve_user_id(user, user_id)
     try:
-        user_ref = db.collection('users').document(user_id)
-        user_doc = user_ref.get()
-        user_data = user_doc.to_dict() if user_doc.exists else {}
+        profile = await user.profile()
+        sighting_ref = db.collection('publicSightings').document(sighting_id)
+        comment_ref = sighting_ref.collection('comments').document()
         
         comment_data = {
+            'commentId': comment_ref.id,
             'userId': user_id,
-            'userName': user_data.get('displayName', 'Usuario'),
+            'userName': profile['name'],
             'comment': comment,
             'timestamp': datetime.datetime.now(datetime.timezone.utc)
         }
+
+        def work(uow):
+            (sighting_doc,) = uow.get(sighting_ref)
+            if not sighting_doc.exists:
+                raise HTTPException(status_code=404, detail="Avistamiento no encontrado")
+            inline = (sighting_doc.to_dict() or {}).get('comments') or []
+            # Los comentarios antiguos (sin commentId) solo existían en el array: se pasan a la subcolección
+            legacy = [c for c in inline if not c.get('commentId')]
+            for old in legacy:
+                legacy_ref = sighting_ref.collection('comments').document()
+                uow.set(legacy_ref, {**old, 'commentId': legacy_ref.id})
+            uow.set(comment_ref, comment_data)
+            kept = [c for c in inline if c.get('commentId')] + [comment_data]
+            uow.update(sighting_ref, {
+                'comments': kept[-MAX_INLINE_COMMENTS:],
+                'commentsCount': firestore.Increment(len(legacy) + 1),
+            })
+
+        await run_transaction(work)
+        detail_cache.invalidate(f"sighting:{sighting_id}")
         
-        sighting_ref = db.collection('publicSightings').document(sighting_id)
-        sighting_ref.update({'comments': firestore.ArrayUnion([comment_data])})
-        
-        return {'success': True}
+        return {'success': True, 'commentId': comment_ref.id}
+    except HTTPException:
+        raise
     except Exception as e:
         print("\n--- ERROR AL AÑADIR COMENTARIO PÚBLICO ---")
         traceback.print_exc()
         print("-------------------------------------------\n")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/public-sightings/{sighting_id}/comments", response_model=CommentPage)
+async def get_sighting_comments(
+    sighting_id: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior")
+):
+    """Todos los comentarios de un avistamiento, del más reciente al más antiguo, paginados por cursor."""
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        comments_ref = db.collection('publicSightings').document(sighting_id).collection('comments')
+        comment_docs, next_cursor = await fetch_page(comments_ref, 'timestamp', limit, after)
+        return FastJSONResponse({'comments': [doc.to_dict() for doc in comment_docs], 'nextCursor': next_cursor})
+    except Exception as e:
+        logger.exception("Error al obtener los comentarios del avistamiento %s", sighting_id)
+        raise HTTPException(status_code=500, detail=str(e))
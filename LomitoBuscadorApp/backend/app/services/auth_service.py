@@ -0,0 +1,107 @@
+# RUTA: backend/app/services/auth_service.py
+#
+# Verificación de ID tokens de Firebase Auth con caché. Las llaves públicas de
+# Google ya las guarda firebase_admin (sesión HTTP con CacheControl, según el
+# Cache-Control de Google); aquí se guardan además los tokens ya verificados
+# hasta su 'exp', para no repetir la verificación de firma en cada petición.
+
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+from firebase_admin import firestore
+from google.api_core.exceptions import Conflict
+
+from .cache_service import TTLCache
+from .firebase_service import db, run_blocking, verify_id_token
+from .hydration_service import fetch_user_profiles
+
+# Tokens verificados que se conservan (cada uno hasta su 'exp')
+TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '10000'))
+# Margen para no aceptar un token de la caché justo cuando expira
+EXPIRY_MARGIN_SECONDS = 30
+
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=3600)
+# Usuarios cuyo documento en 'users' ya se sabe que existe
+_known_users = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=24 * 3600)
+
+
+class InvalidToken(Exception):
+    """El ID token no es válido, expiró o fue revocado."""
+
+
+def _token_key(token: str) -> str:
+    # No se guardan los tokens en claro como clave
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Devuelve los claims del token. Si ya se verificó y no ha expirado, salen
+    de la caché; si no, se verifican con Firebase y se guardan hasta 'exp'.
+    Los tokens inválidos no se guardan. Lanza InvalidToken.
+    """
+    key = _token_key(token)
+    claims = _token_cache.get(key)
+    if claims is not None:
+        return claims
+    try:
+        claims = await run_blocking(verify_id_token, token)
+    except Exception as e:
+        raise InvalidToken(str(e)) from e
+    ttl = claims.get('exp', 0) - time.time() - EXPIRY_MARGIN_SECONDS
+    if ttl > 0:
+        _token_cache.set(key, claims, ttl=ttl)
+    return claims
+
+
+async def ensure_user_document(claims: Dict[str, Any]) -> bool:
+    """
+    Crea el documento del usuario la primera vez que inicia sesión.
+    Usa create() (una escritura que falla si ya existe) en lugar de leer y
+    luego escribir, y recuerda a los usuarios conocidos para no volver a
+    tocar Firestore. Devuelve True si el usuario es nuevo.
+    """
+    uid = claims['uid']
+    if _known_users.get(uid):
+        return False
+    user_data = {
+        'user_id': uid,
+        'email': claims.get('email', 'No email provided'),
+        'displayName': claims.get('name', 'No name provided'),
+        'createdAt': firestore.SERVER_TIMESTAMP,
+        'preferences': {
+            'notificationRadius': 24,
+            'enablePushNotifications': True
+        }
+    }
+    try:
+        await run_blocking(db.collection('users').document(uid).create, user_data)
+        created = True
+    except Conflict:
+        created = False
+    _known_users.set(uid, True)
+    return created
+
+
+class AuthUser:
+    """
+    Usuario autenticado de una petición. El perfil ('name', 'photo') se pide
+    una sola vez por petición y sale de la caché de hydration_service.
+    """
+
+    def __init__(self, claims: Dict[str, Any]):
+        self.claims = claims
+        self.uid: str = claims['uid']
+        self.email: Optional[str] = claims.get('email')
+        self.name: Optional[str] = claims.get('name')
+        self._profile: Optional[Dict[str, Any]] = None
+
+    async def profile(self) -> Dict[str, Any]:
+        if self._profile is None:
+            self._profile = (await fetch_user_profiles([self.uid]))[self.uid]
+        return self._profile
+
+    def __repr__(self) -> str:
+        return f"AuthUser(uid={self.uid!r})"
@@ -0,0 +1,152 @@
+# RUTA: backend/app/services/bulk_service.py
+#
+# Importación y exportación masiva en NDJSON (un objeto JSON por línea).
+
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from .firebase_service import db, run_blocking
+from .pagination_service import iter_query
+from .serialization_service import dumps, project
+
+logger = logging.getLogger(__name__)
+
+# Operaciones por batch de Firestore (máximo 500)
+FIRESTORE_BATCH_SIZE = 500
+# Límites de una importación: tamaño de cada línea y número de filas
+MAX_LINE_BYTES = 64 * 1024
+MAX_IMPORT_ROWS = int(os.getenv('BULK_MAX_IMPORT_ROWS', '5000'))
+# Documentos leídos por consulta al exportar
+EXPORT_PAGE_SIZE = 200
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+def to_ndjson(data: Dict[str, Any]) -> bytes:
+    return dumps(data) + b'\n'
+
+
+class ImportResponse(StreamingResponse):
+    """
+    Respuesta NDJSON que se genera mientras se lee el cuerpo de la petición.
+    StreamingResponse escucha la desconexión del cliente con `receive()` en
+    paralelo, y con servidores ASGI anteriores a la versión 2.4 se quedaría con
+    trozos del cuerpo; aquí solo lo lee el generador (una desconexión llega a
+    él como ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Parte el cuerpo en líneas a medida que llega. Devuelve (número_de_línea, línea);
+    la línea es None si supera MAX_LINE_BYTES. Se omiten las líneas vacías.
+    """
+    buffer = b''
+    number = 0
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                break
+            line, buffer = buffer[:end], buffer[end + 1:]
+            if skipping:
+                # Final de una línea demasiado larga que ya se reportó (y contó)
+                skipping = False
+                continue
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > MAX_LINE_BYTES and not skipping:
+            number += 1
+            yield number, None
+            buffer = b''
+            skipping = True
+        elif skipping:
+            buffer = b''
+    if buffer.strip() and not skipping:
+        yield number + 1, buffer
+
+
+def _error_message(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+async def import_rows(chunks: AsyncIterator[bytes], collection: str,
+                      build: Callable[[Dict[str, Any], str], Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Valida cada línea con `build(fila, id_del_documento) -> documento` (que
+    lanza ValueError o ValidationError si la fila no es válida) y guarda los
+    documentos en `collection` en batches de FIRESTORE_BATCH_SIZE mientras se
+    sigue leyendo. Genera el resultado de cada fila en cuanto se conoce (los
+    errores de validación al leer la línea, los IDs al guardar su batch, así
+    que no van en orden) y al final {'summary': ...}.
+    """
+    summary = {'imported': 0, 'failed': 0}
+    pending: List[Tuple[int, Any]] = []
+    batch = db.batch()
+
+    async def commit() -> List[Dict[str, Any]]:
+        nonlocal batch
+        try:
+            await run_blocking(batch.commit)
+            results = [{'line': line, 'id': ref.id} for line, ref in pending]
+            summary['imported'] += len(pending)
+        except Exception as e:
+            logger.exception("No se pudo guardar un lote de la importación")
+            results = [{'line': line, 'error': f"No se pudo guardar: {e}"} for line, _ in pending]
+            summary['failed'] += len(pending)
+        pending.clear()
+        batch = db.batch()
+        return results
+
+    rows = 0
+    async for number, line in iter_lines(chunks):
+        rows += 1
+        if rows > MAX_IMPORT_ROWS:
+            yield {'line': number, 'error': f"Se permiten como máximo {MAX_IMPORT_ROWS} filas por importación."}
+            summary['failed'] += 1
+            break
+        try:
+            if line is None:
+                raise ValueError(f"La línea supera {MAX_LINE_BYTES} bytes.")
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("Cada línea debe ser un objeto JSON.")
+            ref = db.collection(collection).document()
+            document = build(row, ref.id)
+        except (ValueError, ValidationError) as e:
+            # json.JSONDecodeError también es un ValueError
+            yield {'line': number, 'error': _error_message(e)}
+            summary['failed'] += 1
+            continue
+        batch.set(ref, document)
+        pending.append((number, ref))
+        if len(pending) == FIRESTORE_BATCH_SIZE:
+            for result in await commit():
+                yield result
+
+    if pending:
+        for result in await commit():
+            yield result
+    yield {'summary': summary}
+
+
+async def export_query(query, order_field: str, id_field: str,
+                       fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """Genera una línea NDJSON por documento de `query` (opcionalmente proyectado), leyendo una página a la vez."""
+    async for doc in iter_query(query, order_field, EXPORT_PAGE_SIZE):
+        yield to_ndjson(project([{**doc.to_dict(), id_field: doc.id}], fields, [id_field])[0])
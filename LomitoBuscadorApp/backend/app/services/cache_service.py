@@ -0,0 +1,192 @@
+# RUTA: backend/app/services/cache_service.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .serialization_service import dumps, project
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por tiempo (TTL) y desalojo LRU.
+    Es segura entre hilos y lleva contadores de aciertos/fallos.
+    `on_evict(clave)` se llama (fuera del lock) cuando una entrada sale por
+    expirar o por el LRU, no al invalidarla explícitamente.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0,
+                 on_evict: Optional[Callable[[Hashable], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._on_evict = on_evict
+
+    def _evicted(self, keys: List[Hashable]) -> None:
+        if self._on_evict is not None:
+            for key in keys:
+                self._on_evict(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        expired = []
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                expired.append(key)
+            self.misses += 1
+        self._evicted(expired)
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        evicted = []
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False)[0])
+        self._evicted(evicted)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class ResponseCache:
+    """
+    Caché de respuestas de detalle con ETag.
+    Cada entrada guarda la respuesta, su JSON ya codificado y su ETag (derivado del ID y de
+    la fecha de actualización de los documentos usados). Una entrada puede
+    depender de otras claves: invalidar 'pet:X' invalida también los reportes
+    que incluyen esa mascota. Las dependencias de una entrada se olvidan
+    cuando sale de la caché (invalidada, expirada o desalojada por el LRU).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=self._forget)
+        # dependencia -> entradas que la usan, y entrada -> sus dependencias
+        self._dependents: Dict[Hashable, set] = {}
+        self._depends_on: Dict[Hashable, Tuple[Hashable, ...]] = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, key: Hashable) -> None:
+        """Quita `key` de los conjuntos de dependientes (y los conjuntos que queden vacíos)."""
+        with self._lock:
+            for dep in self._depends_on.pop(key, ()):
+                dependents = self._dependents.get(dep)
+                if dependents is not None:
+                    dependents.discard(key)
+                    if not dependents:
+                        del self._dependents[dep]
+
+    def get(self, key: Hashable):
+        return self._cache.get(key)
+
+    def set(self, key: Hashable, etag: str, content: Any, depends_on=()) -> None:
+        self._forget(key)
+        depends_on = tuple(depends_on)
+        with self._lock:
+            self._depends_on[key] = depends_on
+            for dep in depends_on:
+                self._dependents.setdefault(dep, set()).add(key)
+        self._cache.set(key, (etag, content))
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            dependents = self._dependents.pop(key, set())
+        self._cache.invalidate(key)
+        self._forget(key)
+        for dependent in dependents:
+            self._cache.invalidate(dependent)
+            self._forget(dependent)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dependents.clear()
+            self._depends_on.clear()
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._cache.stats()
+        with self._lock:
+            stats['dependencies'] = len(self._dependents)
+        return stats
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compara un If-None-Match con el ETag actual como indica la RFC 9110:
+    acepta '*', listas separadas por comas y ETags débiles (W/"...").
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fuerte a partir del ID y la versión (update_time) de los documentos."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+# Caché compartida por los endpoints de detalle (mascota, reporte, avistamiento)
+detail_cache = ResponseCache()
+
+
+async def serve_cached(request: Request, key: Hashable,
+                       build: Callable[[], Awaitable[Tuple[Any, Any, Iterable[Hashable]]]],
+                       fields: Optional[List[str]] = None) -> Response:
+    """
+    Responde desde `detail_cache` o construye la respuesta con `build()`, que
+    devuelve (payload, versión, dependencias). Si el If-None-Match del
+    cliente incluye el ETag actual (ver `etag_matches`), responde 304 sin cuerpo. Con `fields`
+    se proyecta el objeto de cada clave del payload ({"report": {...}}) y el
+    ETag incluye la proyección.
+    """
+    entry = detail_cache.get(key)
+    if entry is None:
+        payload, version, depends_on = await build()
+        entry = (make_etag(key, version), (payload, dumps(payload)))
+        detail_cache.set(key, entry[0], entry[1], depends_on)
+    etag, (payload, body) = entry
+
+    if fields is not None:
+        etag = make_etag(etag, *fields)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    if fields is not None:
+        body = dumps({name: project([value], fields)[0] for name, value in payload.items()})
+    return Response(content=body, media_type='application/json', headers=headers)
@@ -0,0 +1,218 @@
+# RUTA: backend/app/services/deletion_service.py
+
+import asyncio
+import contextvars
+import datetime
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from . import feed_service
+from .firebase_service import bucket, db, get_document, run_blocking, stream_query
+from .flyer_service import flyer_prefix
+from .upload_service import blob_name_from_url, is_safe_blob_name, stored_photo_urls
+
+logger = logging.getLogger(__name__)
+
+# Los trabajos pendientes se guardan en Firestore para sobrevivir reinicios
+JOBS_COLLECTION = 'deletionJobs'
+# Reintentos con espera exponencial (30 s, 60 s, 120 s, ...) antes de marcar el trabajo como fallido
+MAX_ATTEMPTS = int(os.getenv('DELETION_MAX_ATTEMPTS', '6'))
+RETRY_BASE_SECONDS = float(os.getenv('DELETION_RETRY_BASE_SECONDS', '30'))
+# Borrados de Storage simultáneos y operaciones por batch de Firestore (máximo 500)
+DELETE_CONCURRENCY = int(os.getenv('DELETION_CONCURRENCY', '16'))
+FIRESTORE_BATCH_SIZE = 500
+
+
+def pet_storage_prefix(owner_id: str, pet_id: str) -> str:
+    """Carpeta de Storage con las fotos de una mascota (ver pets.register_pet)."""
+    return f"pets/{owner_id}/{pet_id}/"
+
+
+def is_safe_prefix(prefix: Optional[str]) -> bool:
+    """
+    Solo se borran por prefijo carpetas que genera el servidor
+    ('pets/<dueño>/<mascota>/', 'sightings/<reporte>/', ...): al menos dos
+    segmentos no vacíos y terminadas en '/'. Nunca un prefijo vacío o el bucket entero.
+    """
+    if not prefix or not prefix.endswith('/'):
+        return False
+    segments = prefix[:-1].split('/')
+    return len(segments) >= 2 and all(segment not in ('', '.', '..') for segment in segments)
+
+
+def owner_storage_prefix(owner_id: str) -> str:
+    """Carpeta del dueño; las fotos anteriores a la carpeta por mascota están directamente aquí."""
+    return f"pets/{owner_id}/"
+
+
+def photo_blob_names(basic_info: Dict[str, Any], prefix: str, legacy_prefixes: Iterable[str] = ()) -> List[str]:
+    """
+    Objetos concretos de las fotos de una mascota (originales y derivados).
+    Las URLs vienen del documento, que el cliente puede editar, así que solo
+    se aceptan las que caen dentro de la carpeta de la mascota o, para las
+    fotos antiguas ('pets/<dueño>/<uuid>.jpg'), justo dentro de alguna de
+    `legacy_prefixes` (nunca en una subcarpeta, que sería de otra mascota).
+    """
+    legacy_prefixes = [p for p in legacy_prefixes if is_safe_prefix(p)]
+    names = []
+    for url in stored_photo_urls(basic_info):
+        name = blob_name_from_url(url)
+        legacy = any(is_safe_blob_name(name, p) and '/' not in name[len(p):] for p in legacy_prefixes)
+        if (legacy or is_safe_blob_name(name, prefix)) and name not in names:
+            names.append(name)
+    return names
+
+
+async def _delete_blobs(blobs) -> int:
+    slots = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+    async def delete(blob) -> int:
+        async with slots:
+            try:
+                await run_blocking(blob.delete)
+            except NotFound:
+                # Otro intento ya lo borró
+                return 0
+            return 1
+
+    return sum(await asyncio.gather(*(delete(blob) for blob in blobs)))
+
+
+async def delete_blob_names(names: List[str]) -> int:
+    """Borra objetos por su nombre exacto, en paralelo. Devuelve cuántos se borraron."""
+    return await _delete_blobs([bucket.blob(name) for name in dict.fromkeys(names)])
+
+
+async def delete_prefixes(prefixes: List[str]) -> int:
+    """
+    Borra todos los objetos bajo cada carpeta del servidor, en paralelo.
+    Los prefijos que no pasan `is_safe_prefix` se ignoran. Devuelve cuántos se borraron.
+    """
+    prefixes = [p for p in prefixes if is_safe_prefix(p)]
+    listings = await asyncio.gather(*(run_blocking(lambda p=p: list(bucket.list_blobs(prefix=p))) for p in prefixes))
+    blobs = {blob.name: blob for listing in listings for blob in listing}
+    return await _delete_blobs(blobs.values())
+
+
+async def _delete_documents(refs) -> None:
+    for start in range(0, len(refs), FIRESTORE_BATCH_SIZE):
+        batch = db.batch()
+        for ref in refs[start:start + FIRESTORE_BATCH_SIZE]:
+            batch.delete(ref)
+        await run_blocking(batch.commit)
+
+
+async def _cascade_report(report_doc) -> None:
+    """Borra un reporte de la mascota: su ruta, las fotos de sus avistamientos y su entrada del tablero."""
+    report_ref = report_doc.reference
+    report_data = report_doc.to_dict() or {}
+    route_docs = await stream_query(report_ref.collection('searchRoute'))
+    await delete_prefixes([f"sightings/{report_doc.id}/", flyer_prefix(report_doc.id)])
+    await _delete_documents([doc.reference for doc in route_docs] + [report_ref])
+    if report_data.get('status') == 'active':
+        await feed_service.remove_report(report_doc.id)
+
+
+async def run_job(job_id: str, job: Dict[str, Any]) -> None:
+    """Ejecuta un trabajo de borrado. Todos los pasos son idempotentes: se puede repetir."""
+    reports = await stream_query(db.collection('lostReports').where('petId', '==', job['petId']))
+    for report_doc in reports:
+        await _cascade_report(report_doc)
+    await delete_blob_names(job.get('blobNames', []))
+    await delete_prefixes(job.get('storagePrefixes', []))
+    await run_blocking(db.collection(JOBS_COLLECTION).document(job_id).delete)
+
+
+def stage_pet_deletion(writer, pet_ref, pet_data: Dict[str, Any]) -> Any:
+    """
+    Añade a un batch el borrado del documento de la mascota y el alta del
+    trabajo que limpiará Storage y los reportes. Devuelve la referencia del trabajo.
+    """
+    owner_id = pet_data.get('ownerId')
+    prefixes, names = [], []
+    if owner_id:
+        # Solo se borra lo que está en la carpeta que generó el servidor para esta mascota
+        folder = pet_storage_prefix(owner_id, pet_ref.id)
+        prefixes.append(folder)
+        # Las fotos antiguas se borran por nombre exacto; ver scripts/reassign_legacy_owners.py
+        owners = [owner_id] + ([pet_data['legacyOwnerId']] if pet_data.get('legacyOwnerId') else [])
+        names = photo_blob_names(pet_data.get('basicInfo', {}), folder, [owner_storage_prefix(o) for o in owners])
+    job_ref = db.collection(JOBS_COLLECTION).document(f"pet-{pet_ref.id}")
+    writer.delete(pet_ref)
+    writer.set(job_ref, {
+        'kind': 'pet', 'petId': pet_ref.id, 'storagePrefixes': prefixes, 'blobNames': names,
+        'status': 'pending', 'attempts': 0, 'lastError': None,
+        'createdAt': firestore.SERVER_TIMESTAMP,
+    })
+    return job_ref
+
+
+class DeletionQueue:
+    """
+    Cola de borrados en segundo plano. El trabajo ya está guardado en
+    Firestore antes de encolarse; si el proceso se reinicia, `resume` lo
+    recupera. Los fallos se reintentan con espera exponencial.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            # Contexto vacío: el worker no debe heredar las métricas de la petición que lo arrancó
+            self._worker = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    def enqueue(self, job_id: str) -> None:
+        self._ensure_worker()
+        self._queue.put_nowait(job_id)
+
+    async def join(self) -> None:
+        """Espera a que se procesen los trabajos encolados (no los reintentos programados)."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def resume(self) -> int:
+        """Encola los trabajos pendientes que quedaron en Firestore. Devuelve cuántos."""
+        docs = await stream_query(db.collection(JOBS_COLLECTION).where('status', '==', 'pending'))
+        for doc in docs:
+            self.enqueue(doc.id)
+        return len(docs)
+
+    async def _process(self, job_id: str) -> None:
+        job_ref = db.collection(JOBS_COLLECTION).document(job_id)
+        job_doc = await get_document(job_ref)
+        if not job_doc.exists or job_doc.get('status') != 'pending':
+            return
+        job = job_doc.to_dict()
+        try:
+            await run_job(job_id, job)
+        except Exception as e:
+            logger.exception("Error en el borrado en segundo plano %s", job_id)
+            attempts = job.get('attempts', 0) + 1
+            delay = RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            await run_blocking(job_ref.update, {
+                'attempts': attempts, 'lastError': str(e),
+                'status': 'pending' if attempts < MAX_ATTEMPTS else 'failed',
+                'nextAttemptAt': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=delay),
+            })
+            if attempts < MAX_ATTEMPTS:
+                asyncio.get_running_loop().call_later(delay, self.enqueue, job_id)
+
+    async def _run(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception:
+                logger.exception("Error al procesar el borrado %s", job_id)
+            finally:
+                self._queue.task_done()
+
+
+deletion_queue = DeletionQueue()
@@ -0,0 +1,608 @@
+# RUTA: backend/app/services/fake_firebase.py
+#
+# Backend en memoria con el subconjunto de Firestore y Cloud Storage que usan
+# los routers. Sirve para desarrollo local, pruebas y benchmarks:
+#
+#   FIREBASE_BACKEND=memory uvicorn app.app:app
+#
+# Cada llamada que en el SDK real sería una ida y vuelta a la red cuenta como
+# un round-trip y puede simular latencia (FAKE_FIREBASE_LATENCY_MS).
+
+import copy
+import datetime
+import io
+import itertools
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import Aborted, AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+_ASCENDING = 'ASCENDING'
+_DESCENDING = 'DESCENDING'
+_MISSING = object()
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _get_path(data: Dict[str, Any], field_path: str) -> Any:
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply_value(container: Dict[str, Any], key: str, value: Any, now: datetime.datetime) -> None:
+    """Asigna `value` en `container[key]` resolviendo los centinelas de Firestore."""
+    if value is transforms.DELETE_FIELD:
+        container.pop(key, None)
+    elif value is transforms.SERVER_TIMESTAMP:
+        container[key] = now
+    elif isinstance(value, transforms.ArrayUnion):
+        current = list(container.get(key) or [])
+        current.extend(v for v in value.values if v not in current)
+        container[key] = current
+    elif isinstance(value, transforms.ArrayRemove):
+        container[key] = [v for v in (container.get(key) or []) if v not in value.values]
+    elif isinstance(value, transforms.Increment):
+        container[key] = (container.get(key) or 0) + value.value
+    elif isinstance(value, dict):
+        container[key] = _resolve(value, now)
+    else:
+        container[key] = copy.deepcopy(value)
+
+
+def _resolve(data: Dict[str, Any], now: datetime.datetime) -> Dict[str, Any]:
+    result = {}
+    for key, value in data.items():
+        _apply_value(result, key, value, now)
+    return result
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any], now: datetime.datetime) -> None:
+    """set(merge=True): los mapas anidados se fusionan campo a campo."""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value, now)
+        else:
+            _apply_value(target, key, value, now)
+
+
+def _update_path(target: Dict[str, Any], field_path: str, value: Any, now: datetime.datetime) -> None:
+    """update(): las claves con puntos son rutas de campo."""
+    parts = field_path.split('.')
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    _apply_value(target, parts[-1], value, now)
+
+
+class _StoredDocument:
+    __slots__ = ('data', 'create_time', 'update_time')
+
+    def __init__(self, data, now):
+        self.data = data
+        self.create_time = now
+        self.update_time = now
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        if self._data is None:
+            return None
+        value = _get_path(self._data, field_path)
+        return None if value is _MISSING else copy.deepcopy(value)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, name: str):
+        return FakeCollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, *args, **kwargs):
+        self._client._rpc(reads=1)
+        return self._client._snapshot(self)
+
+    def create(self, data):
+        self._client._rpc(writes=1)
+        self._client._write(self, 'create', data)
+
+    def set(self, data, merge=False):
+        self._client._rpc(writes=1)
+        self._client._write(self, 'set', data, merge=merge)
+
+    def update(self, data):
+        self._client._rpc(writes=1)
+        self._client._write(self, 'update', data)
+
+    def delete(self):
+        self._client._rpc(writes=1)
+        self._client._write(self, 'delete', None)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class FakeQuery:
+    def __init__(self, client, collection_path: str, filters=(), orders=(), limit=None, offset=0, start=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._start = start
+
+    def _copy(self, **changes):
+        params = dict(filters=self._filters, orders=self._orders, limit=self._limit,
+                      offset=self._offset, start=self._start)
+        params.update(changes)
+        return FakeQuery(self._client, self._collection_path, **params)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=_ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip):
+        return self._copy(offset=num_to_skip)
+
+    def start_after(self, document_fields):
+        return self._copy(start=document_fields)
+
+    def stream(self, *args, **kwargs):
+        docs = self._client._run_query(self)
+        self._client._rpc(reads=max(1, len(docs)))
+        return iter(docs)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream())
+
+    # --- Evaluación ---
+    def _matches(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        for field_path, op, expected in self._filters:
+            value = doc_id if field_path == '__name__' else _get_path(data, field_path)
+            if value is _MISSING:
+                return False
+            try:
+                if op == '==' and not value == expected: return False
+                if op == '!=' and not value != expected: return False
+                if op == '<' and not value < expected: return False
+                if op == '<=' and not value <= expected: return False
+                if op == '>' and not value > expected: return False
+                if op == '>=' and not value >= expected: return False
+                if op == 'in' and value not in expected: return False
+                if op == 'not-in' and value in expected: return False
+                if op == 'array_contains' and expected not in (value or []): return False
+                if op == 'array_contains_any' and not set(expected) & set(value or []): return False
+            except TypeError:
+                return False
+        # Firestore excluye los documentos sin los campos de orden
+        return all(field == '__name__' or _get_path(data, field) is not _MISSING for field, _ in self._orders)
+
+    def _sort_key(self, doc_id: str, data: Dict[str, Any]) -> Tuple:
+        return tuple(doc_id if field == '__name__' else _get_path(data, field) for field, _ in self._orders)
+
+    def _cursor_values(self) -> Optional[Tuple]:
+        if self._start is None:
+            return None
+        if isinstance(self._start, FakeDocumentSnapshot):
+            return self._sort_key(self._start.id, self._start._data or {})
+        values = []
+        for field, _ in self._orders[:len(self._start)]:
+            value = self._start[field]
+            if field == '__name__' and isinstance(value, FakeDocumentReference):
+                value = value.id
+            elif field == '__name__' and isinstance(value, str):
+                value = value.rsplit('/', 1)[-1]
+            values.append(value)
+        return tuple(values)
+
+    def _is_after(self, key: Tuple, cursor: Tuple) -> bool:
+        for (field, direction), value, bound in zip(self._orders, key, cursor):
+            if value == bound:
+                continue
+            return value < bound if direction == _DESCENDING else value > bound
+        return False
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, path: str):
+        super().__init__(client, path)
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def document(self, document_id: Optional[str] = None):
+        document_id = document_id or uuid.uuid4().hex[:20]
+        return FakeDocumentReference(self._client, f"{self.path}/{document_id}")
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        ref.set(document_data)
+        return self._client._snapshot(ref).update_time, ref
+
+    def list_documents(self):
+        self._client._rpc()
+        return [FakeDocumentReference(self._client, f"{self.path}/{doc_id}")
+                for doc_id in list(self._client._collection(self.path))]
+
+
+class FakeWriteBatch:
+    """Batch de escrituras: se aplica de forma atómica en un solo round-trip."""
+
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, document_data, merge=False):
+        self._ops.append((reference, 'set', document_data, merge))
+
+    def update(self, reference, field_updates):
+        self._ops.append((reference, 'update', field_updates, False))
+
+    def delete(self, reference):
+        self._ops.append((reference, 'delete', None, False))
+
+    def __len__(self):
+        return len(self._ops)
+
+    def commit(self):
+        self._client._rpc(writes=len(self._ops))
+        with self._client._lock:
+            self._apply()
+        ops, self._ops = self._ops, []
+        return [None] * len(ops)
+
+    def _apply(self) -> None:
+        # Se valida todo antes de escribir nada: o se aplican todas las operaciones o ninguna
+        for reference, kind, _, _ in self._ops:
+            if kind == 'update' and self._client._stored(reference) is None:
+                raise NotFound(f"No document to update: {reference.path}")
+        for reference, kind, data, merge in self._ops:
+            self._client._write(reference, kind, data, merge=merge)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Transacción optimista: recuerda la versión de cada documento leído y, al
+    confirmar, aborta (Aborted) si alguno cambió. Implementa los métodos
+    internos que usa el decorador `firestore.transactional` para reintentar.
+    """
+
+    def __init__(self, client, max_attempts: int = 5, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._read_versions: Dict[str, Any] = {}
+
+    def _clean_up(self) -> None:
+        self._ops = []
+        self._read_versions = {}
+        self._id = None
+
+    def _begin(self, retry_id=None) -> None:
+        self._client._rpc()
+        self._id = uuid.uuid4().bytes
+
+    def _rollback(self) -> None:
+        if self._id is not None:
+            self._client._rpc()
+        self._clean_up()
+
+    def _commit(self):
+        self._client._rpc(writes=len(self._ops))
+        with self._client._lock:
+            for path, version in self._read_versions.items():
+                stored = self._client._stored(FakeDocumentReference(self._client, path))
+                if (stored.update_time if stored else None) != version:
+                    raise Aborted(f"Transaction contention on {path}")
+            self._apply()
+        ops = self._ops
+        self._clean_up()
+        return [None] * len(ops)
+
+    def _record_read(self, snapshot: FakeDocumentSnapshot) -> None:
+        self._read_versions.setdefault(snapshot.reference.path, snapshot.update_time)
+
+
+class FakeFirestore:
+    """Cliente de Firestore en memoria, seguro entre hilos."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._collections: Dict[str, Dict[str, _StoredDocument]] = {}
+        self._lock = threading.RLock()
+        self._clock = itertools.count()
+        self.stats = {'round_trips': 0, 'reads': 0, 'writes': 0}
+
+    # --- API pública compatible con google.cloud.firestore.Client ---
+    def collection(self, path: str):
+        return FakeCollectionReference(self, path)
+
+    def document(self, path: str):
+        return FakeDocumentReference(self, path)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        references = list(references)
+        self._rpc(reads=len(references))
+        snapshots = [self._snapshot(ref) for ref in references]
+        if transaction is not None:
+            for snapshot in snapshots:
+                transaction._record_read(snapshot)
+        return snapshots
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False):
+        return FakeTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    def close(self):
+        pass
+
+    # --- Utilidades para pruebas y benchmarks ---
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {'round_trips': 0, 'reads': 0, 'writes': 0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._collections.clear()
+
+    # --- Internos ---
+    def _rpc(self, reads: int = 0, writes: int = 0) -> None:
+        with self._lock:
+            self.stats['round_trips'] += 1
+            self.stats['reads'] += reads
+            self.stats['writes'] += writes
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _timestamp(self) -> datetime.datetime:
+        # Marca de tiempo estrictamente creciente para que update_time cambie en cada escritura
+        return _now() + datetime.timedelta(microseconds=next(self._clock) % 1000)
+
+    def _collection(self, path: str) -> Dict[str, _StoredDocument]:
+        return self._collections.setdefault(path, {})
+
+    def _stored(self, reference) -> Optional[_StoredDocument]:
+        collection_path, doc_id = reference.path.rsplit('/', 1)
+        return self._collections.get(collection_path, {}).get(doc_id)
+
+    def _snapshot(self, reference) -> FakeDocumentSnapshot:
+        with self._lock:
+            stored = self._stored(reference)
+            if stored is None:
+                return FakeDocumentSnapshot(reference, None)
+            return FakeDocumentSnapshot(reference, copy.deepcopy(stored.data), stored.create_time, stored.update_time)
+
+    def verify_id_token(self, token: str) -> Dict[str, Any]:
+        """Ver firebase_service.verify_id_token: el fake trae su propio verificador."""
+        return verify_id_token(token)
+
+    def _write(self, reference, kind: str, data, merge: bool = False) -> None:
+        with self._lock:
+            collection_path, doc_id = reference.path.rsplit('/', 1)
+            collection = self._collection(collection_path)
+            stored = collection.get(doc_id)
+            now = self._timestamp()
+            if kind == 'delete':
+                collection.pop(doc_id, None)
+                return
+            if kind == 'update':
+                if stored is None:
+                    raise NotFound(f"No document to update: {reference.path}")
+                for field_path, value in data.items():
+                    _update_path(stored.data, field_path, value, now)
+                stored.update_time = now
+                return
+            if kind == 'create' and stored is not None:
+                raise AlreadyExists(f"Document already exists: {reference.path}")
+            if stored is None:
+                collection[doc_id] = _StoredDocument(_resolve(data, now), now)
+            elif merge:
+                _merge(stored.data, data, now)
+                stored.update_time = now
+            else:
+                stored.data = _resolve(data, now)
+                stored.update_time = now
+
+    def _run_query(self, query: FakeQuery) -> List[FakeDocumentSnapshot]:
+        with self._lock:
+            rows = [(doc_id, stored) for doc_id, stored in self._collection(query._collection_path).items()
+                    if query._matches(doc_id, stored.data)]
+            for index in range(len(query._orders) - 1, -1, -1):
+                field, direction = query._orders[index]
+                rows.sort(key=lambda row: query._sort_key(row[0], row[1].data)[index],
+                          reverse=direction == _DESCENDING)
+            cursor = query._cursor_values()
+            if cursor is not None:
+                rows = [row for row in rows if query._is_after(query._sort_key(row[0], row[1].data), cursor)]
+            rows = rows[query._offset:]
+            if query._limit is not None:
+                rows = rows[:query._limit]
+            return [
+                FakeDocumentSnapshot(FakeDocumentReference(self, f"{query._collection_path}/{doc_id}"),
+                                     copy.deepcopy(stored.data), stored.create_time, stored.update_time)
+                for doc_id, stored in rows
+            ]
+
+
+class FakeBlob:
+    def __init__(self, bucket, name: str, chunk_size: Optional[int] = None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.content_type = None
+
+    @property
+    def public_url(self) -> str:
+        return f"https://storage.googleapis.com/{self.bucket.name}/{self.name}"
+
+    @property
+    def size(self) -> Optional[int]:
+        stored = self.bucket._blobs.get(self.name)
+        return len(stored['data']) if stored else None
+
+    @property
+    def updated(self) -> Optional[datetime.datetime]:
+        stored = self.bucket._blobs.get(self.name)
+        return stored['updated'] if stored else None
+
+    def upload_from_file(self, file_obj, content_type=None, predefined_acl=None, **kwargs):
+        buffer = io.BytesIO()
+        chunk = self.chunk_size or 1024 * 1024
+        while True:
+            data = file_obj.read(chunk)
+            if not data:
+                break
+            buffer.write(data)
+            # Una subida reanudable hace una petición por trozo
+            self.bucket._rpc(bytes_up=len(data))
+        self._store(buffer.getvalue(), content_type, predefined_acl)
+
+    def upload_from_string(self, data, content_type='text/plain', predefined_acl=None, **kwargs):
+        if isinstance(data, str):
+            data = data.encode()
+        self.bucket._rpc(bytes_up=len(data))
+        self._store(data, content_type, predefined_acl)
+
+    def download_as_bytes(self, **kwargs) -> bytes:
+        stored = self.bucket._blobs.get(self.name)
+        if stored is None:
+            raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+        self.bucket._rpc(bytes_down=len(stored['data']))
+        return stored['data']
+
+    def exists(self, **kwargs) -> bool:
+        self.bucket._rpc()
+        return self.name in self.bucket._blobs
+
+    def make_public(self, **kwargs):
+        self.bucket._rpc()
+        if self.name not in self.bucket._blobs:
+            raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+        self.bucket._blobs[self.name]['public'] = True
+
+    def delete(self, **kwargs):
+        self.bucket._rpc()
+        with self.bucket._lock:
+            if self.bucket._blobs.pop(self.name, None) is None:
+                raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+
+    def _store(self, data: bytes, content_type, predefined_acl) -> None:
+        self.content_type = content_type
+        with self.bucket._lock:
+            self.bucket._blobs[self.name] = {
+                'data': data, 'content_type': content_type,
+                'public': predefined_acl == 'publicRead',
+                'updated': datetime.datetime.now(datetime.timezone.utc),
+            }
+
+
+class FakeBucket:
+    """Bucket de Cloud Storage en memoria."""
+
+    def __init__(self, name: str = 'fake-bucket', latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._blobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.stats = {'round_trips': 0, 'bytes_up': 0, 'bytes_down': 0}
+
+    def blob(self, blob_name: str, chunk_size: Optional[int] = None, **kwargs):
+        return FakeBlob(self, blob_name, chunk_size)
+
+    def get_blob(self, blob_name: str, **kwargs):
+        self._rpc()
+        return FakeBlob(self, blob_name) if blob_name in self._blobs else None
+
+    def list_blobs(self, prefix: Optional[str] = None, **kwargs):
+        self._rpc()
+        with self._lock:
+            names = [name for name in self._blobs if prefix is None or name.startswith(prefix)]
+        return [FakeBlob(self, name) for name in sorted(names)]
+
+    def delete_blobs(self, blobs, on_error=None, **kwargs):
+        for blob in blobs:
+            try:
+                (blob if isinstance(blob, FakeBlob) else self.blob(blob)).delete()
+            except NotFound:
+                if on_error is None:
+                    raise
+                on_error(blob)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {'round_trips': 0, 'bytes_up': 0, 'bytes_down': 0}
+
+    def _rpc(self, bytes_up: int = 0, bytes_down: int = 0) -> None:
+        with self._lock:
+            self.stats['round_trips'] += 1
+            self.stats['bytes_up'] += bytes_up
+            self.stats['bytes_down'] += bytes_down
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def create_clients():
+    """Fábrica del backend 'memory' (ver firebase_service.register_backend)."""
+    latency = float(os.getenv('FAKE_FIREBASE_LATENCY_MS', '0')) / 1000
+    bucket_name = os.getenv('FIREBASE_STORAGE_BUCKET', 'lomito-app.firebasestorage.app')
+    return FakeFirestore(latency=latency), FakeBucket(bucket_name, latency=latency)
+
+
+FAKE_TOKEN_PREFIX = 'fake-token:'
+
+
+def verify_id_token(token: str) -> Dict[str, Any]:
+    """
+    Verificador de ID tokens del backend 'memory': acepta 'fake-token:<uid>'
+    y devuelve claims con la misma forma que firebase_admin (exp a una hora).
+    """
+    if not token or not token.startswith(FAKE_TOKEN_PREFIX) or len(token) == len(FAKE_TOKEN_PREFIX):
+        raise ValueError("ID token inválido.")
+    uid = token[len(FAKE_TOKEN_PREFIX):]
+    now = int(time.time())
+    return {'uid': uid, 'user_id': uid, 'sub': uid, 'iat': now, 'exp': now + 3600,
+            'email': f"{uid}@example.com", 'name': uid}
@@ -0,0 +1,185 @@
+# RUTA: backend/app/services/feed_service.py
+
+import asyncio
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from .cache_service import TTLCache
+from .firebase_service import db, run_blocking, stream_query
+from .geo_service import MAX_COVERING_CELLS, MAX_COVERING_PRECISION, location_geohash
+from .hydration_service import attach_pet_info
+from .image_service import thumbnail_url
+from .pagination_service import iter_by_name, iter_query
+
+# El tablero de reportes activos se guarda ya proyectado en la colección
+# 'activeBoard': un documento pequeño por reporte (mismo ID) con su geohash.
+# Un feed se resuelve con una consulta por rango de geohash por cada celda
+# que cubre el radio, así que cada reporte se escribe por separado (sin
+# documentos compartidos que limiten las escrituras por segundo ni el tamaño).
+BOARD_COLLECTION = 'activeBoard'
+# Documentos por página y por batch al reconstruir el tablero (máximo 500)
+REBUILD_PAGE_SIZE = 500
+# Segundos que se reutiliza la lectura de una celda: las páginas siguientes del
+# feed (y otros usuarios en la misma zona) no vuelven a consultar Firestore
+BOARD_CELL_TTL = float(os.getenv('BOARD_CELL_TTL_SECONDS', '15'))
+
+# Celda -> entradas del tablero en ella. Las escrituras de este proceso
+# invalidan las celdas del nuevo geohash; un reporte cerrado o movido puede
+# seguir en la celda anterior como mucho BOARD_CELL_TTL segundos.
+board_cache = TTLCache(maxsize=4096, ttl=BOARD_CELL_TTL)
+
+
+def _entry_ref(report_id: str):
+    return db.collection(BOARD_COLLECTION).document(report_id)
+
+
+def _forget_cells(geohash: Optional[str]) -> None:
+    """Invalida las celdas cacheadas (de cualquier precisión de feed) que contienen `geohash`."""
+    for precision in range(1, MAX_COVERING_PRECISION + 1):
+        if geohash and len(geohash) >= precision:
+            board_cache.invalidate(geohash[:precision])
+
+
+def build_entry(report_data: Dict[str, Any], pet_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Proyección compacta de un reporte activo para el tablero público."""
+    basic_info = pet_data.get('basicInfo', {})
+    return {
+        'petId': report_data.get('petId'),
+        'petName': basic_info.get('name'),
+        'thumbnailUrl': thumbnail_url(basic_info.get('photos'), basic_info.get('photoVariants')),
+        'species': pet_data.get('specificInfo', {}).get('species'),
+        'lastKnownLocation': report_data.get('lastKnownLocation') or report_data.get('lastSeenLocation'),
+        # Los reportes anteriores al geohash se indexan por su ubicación
+        'geohash': report_data.get('geohash') or location_geohash(
+            report_data.get('lastKnownLocation') or report_data.get('lastSeenLocation')),
+        'reportedAt': report_data.get('reportedAt'),
+        'lastSightingAt': report_data.get('lastSightingAt'),
+        'sightingsCount': report_data.get('sightingsCount', 0),
+    }
+
+
+def stage_upsert(writer, report_id: str, entry: Dict[str, Any]) -> None:
+    """Añade la escritura del tablero a un batch, transacción o UnitOfWork en curso."""
+    if entry.get('geohash'):
+        writer.set(_entry_ref(report_id), entry)
+        _forget_cells(entry['geohash'])
+
+
+def stage_remove(writer, report_id: str) -> None:
+    """Como `stage_upsert`, pero quita la entrada del reporte."""
+    writer.delete(_entry_ref(report_id))
+
+
+async def upsert_report(report_id: str, entry: Dict[str, Any]) -> None:
+    """Añade o reemplaza la entrada de un reporte en el tablero."""
+    if entry.get('geohash'):
+        await run_blocking(_entry_ref(report_id).set, entry)
+        _forget_cells(entry['geohash'])
+
+
+async def remove_report(report_id: str) -> None:
+    """Quita un reporte del tablero (encontrado o cerrado)."""
+    await run_blocking(_entry_ref(report_id).delete)
+
+
+async def record_sighting(report_id: str, location: Dict[str, Any], geohash: str, timestamp) -> None:
+    """Actualiza la última ubicación de un reporte tras un avistamiento (si sigue en el tablero)."""
+    try:
+        await run_blocking(_entry_ref(report_id).update, {
+            'lastKnownLocation': location, 'geohash': geohash, 'lastSightingAt': timestamp,
+            'sightingsCount': firestore.Increment(1),
+        })
+    except NotFound:
+        # El reporte se cerró mientras tanto
+        pass
+    _forget_cells(geohash)
+
+
+def _range_query(prefix: str):
+    """Entradas del tablero cuyo geohash empieza por `prefix`."""
+    query = db.collection(BOARD_COLLECTION)
+    if not prefix:
+        return query
+    return query.where('geohash', '>=', prefix).where('geohash', '<=', prefix + '~')
+
+
+async def _load_cell(cell: str) -> List[Tuple[str, Dict[str, Any]]]:
+    cached = board_cache.get(cell)
+    if cached is None:
+        cached = [(doc.id, doc.to_dict() or {}) for doc in await stream_query(_range_query(cell))]
+        board_cache.set(cell, cached)
+    return cached
+
+
+async def load_board(cells: Iterable[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Entradas del tablero dentro de `cells` (como mucho MAX_COVERING_CELLS):
+    una consulta por rango por celda, en paralelo, y solo para las celdas que
+    no están en `board_cache`. Devuelve copias que el llamador puede modificar.
+    """
+    cells = list(dict.fromkeys(cells))
+    if len(cells) > MAX_COVERING_CELLS:
+        raise ValueError(f"Se leen como mucho {MAX_COVERING_CELLS} celdas del tablero por consulta.")
+    results = await asyncio.gather(*(_load_cell(cell) for cell in cells))
+    entries = {}
+    for cell_entries in results:
+        for report_id, entry in cell_entries:
+            entries[report_id] = dict(entry)
+    return list(entries.items())
+
+
+async def load_board_prefix(prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Entradas del tablero cuyo geohash empieza por `prefix` (para el mapa), como mucho `limit`."""
+    query = _range_query(prefix)
+    if limit is not None:
+        query = query.limit(limit)
+    return [(doc.id, doc.to_dict() or {}) for doc in await stream_query(query)]
+
+
+async def rebuild_board() -> int:
+    """
+    Reconstruye el tablero completo a partir de 'lostReports' (para la primera
+    carga o para corregir desviaciones), página a página: cada página de
+    reportes se escribe en su propio batch y después se borran las entradas de
+    reportes que ya no están activos. Devuelve el número de reportes.
+    """
+    active = set()
+    page: List[Dict[str, Any]] = []
+
+    async def flush():
+        reports = await attach_pet_info(page)
+        batch = db.batch()
+        for report_data in reports:
+            entry = build_entry(report_data, report_data['petInfo'])
+            if entry['geohash']:
+                batch.set(_entry_ref(report_data['reportId']), entry)
+        await run_blocking(batch.commit)
+        page.clear()
+        board_cache.clear()
+
+    query = db.collection('lostReports').where('status', '==', 'active')
+    async for doc in iter_query(query, 'reportedAt', REBUILD_PAGE_SIZE):
+        report_data = doc.to_dict()
+        report_data['reportId'] = doc.id
+        active.add(doc.id)
+        page.append(report_data)
+        if len(page) == REBUILD_PAGE_SIZE:
+            await flush()
+    if page:
+        await flush()
+
+    # Se recorre por ID (no por 'reportedAt') para no saltarse entradas sin ese campo
+    stale = []
+    async for doc in iter_by_name(db.collection(BOARD_COLLECTION), REBUILD_PAGE_SIZE):
+        if doc.id not in active:
+            stale.append(doc.reference)
+    for start in range(0, len(stale), REBUILD_PAGE_SIZE):
+        batch = db.batch()
+        for ref in stale[start:start + REBUILD_PAGE_SIZE]:
+            batch.delete(ref)
+        await run_blocking(batch.commit)
+    board_cache.clear()
+    return len(active)
@@ -1,18 +1,250 @@
 # RUTA: backend/app/services/firebase_service.py
 
-import firebase_admin
-from firebase_admin import credentials, firestore, storage # 1. Importa storage
-
-# Carga las credenciales (asegúrate de que el nombre del archivo sea correcto)
-cred = credentials.Certificate('lomito-app-firebase-adminsdk-fbsvc-8b3b69e589.json')
-
-# Inicializar la app de Firebase si no se ha hecho
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred, {
-        # 2. Añade la URL de tu bucket de Firebase Storage
-        'storageBucket': 'lomito-app.firebasestorage.app'
-    })
-
-# Exportar las instancias para usarlas en otros archivos
-db = firestore.client()
-bucket = storage.bucket() # 3. Exporta el bucket
\ No newline at end of file
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import metrics_service
+
+# --- Configuración (variables de entorno) ---
+# FIREBASE_BACKEND: 'firebase' (por defecto), 'emulator' o 'memory' (fake en
+# memoria, ver fake_firebase.py). También se puede inyectar cualquier otro
+# backend con `use_backend`.
+FIREBASE_BACKEND = os.getenv('FIREBASE_BACKEND', 'firebase')
+FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS', 'lomito-app-firebase-adminsdk-fbsvc-8b3b69e589.json')
+FIREBASE_STORAGE_BUCKET = os.getenv('FIREBASE_STORAGE_BUCKET', 'lomito-app.firebasestorage.app')
+FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID', 'lomito-app')
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _create_firebase_clients():
+    """Inicializa el SDK de firebase_admin con las credenciales de servicio."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore, storage
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS), {
+            'storageBucket': FIREBASE_STORAGE_BUCKET
+        })
+    return firestore.client(), storage.bucket()
+
+
+def _create_emulator_clients():
+    """
+    Clientes contra el Firebase Emulator Suite local; usa FIRESTORE_EMULATOR_HOST
+    y STORAGE_EMULATOR_HOST y no necesita credenciales.
+    """
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore as gcloud_firestore, storage as gcloud_storage
+
+    firestore_client = gcloud_firestore.Client(project=FIREBASE_PROJECT_ID, credentials=AnonymousCredentials())
+    storage_client = gcloud_storage.Client(project=FIREBASE_PROJECT_ID, credentials=AnonymousCredentials())
+    return firestore_client, storage_client.bucket(FIREBASE_STORAGE_BUCKET)
+
+
+def _create_memory_clients():
+    """Firestore y Storage en memoria, con latencia simulada opcional (FAKE_FIREBASE_LATENCY_MS)."""
+    from .fake_firebase import create_clients
+
+    return create_clients()
+
+
+_BACKENDS = {
+    'firebase': _create_firebase_clients,
+    'emulator': _create_emulator_clients,
+    'memory': _create_memory_clients,
+}
+
+
+def register_backend(name: str, factory) -> None:
+    """Registra una fábrica `() -> (db, bucket)` seleccionable con FIREBASE_BACKEND."""
+    _BACKENDS[name] = factory
+
+
+def use_backend(db_client, bucket_client) -> None:
+    """Sustituye los clientes activos (pruebas, benchmarks o un backend en memoria)."""
+    with _clients_lock:
+        _clients['db'], _clients['bucket'] = db_client, bucket_client
+
+
+def _get_clients():
+    """Crea los clientes la primera vez que se usan y los reutiliza después."""
+    if 'db' not in _clients:
+        with _clients_lock:
+            if 'db' not in _clients:
+                factory = _BACKENDS.get(FIREBASE_BACKEND)
+                if factory is None:
+                    raise RuntimeError(f"Backend de Firebase desconocido: {FIREBASE_BACKEND}")
+                _clients['db'], _clients['bucket'] = factory()
+    return _clients['db'], _clients['bucket']
+
+
+def get_db():
+    return _get_clients()[0]
+
+
+def get_bucket():
+    return _get_clients()[1]
+
+
+def is_initialized() -> bool:
+    return 'db' in _clients
+
+
+class _LazyClient:
+    """Objeto que delega en el cliente real, creado en el primer uso."""
+
+    def __init__(self, getter):
+        self._getter = getter
+
+    def __getattr__(self, name):
+        return getattr(self._getter(), name)
+
+
+# Exportar las instancias para usarlas en otros archivos.
+# No se conecta nada al importar: el SDK se inicializa con la primera llamada.
+db = _LazyClient(get_db)
+bucket = _LazyClient(get_bucket)
+
+
+# --- Acceso asíncrono ---
+# El SDK de firebase_admin es síncrono; para no bloquear el event loop de
+# uvicorn, todas las llamadas de red se ejecutan en un pool de hilos acotado.
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('FIREBASE_MAX_WORKERS', '16')),
+            thread_name_prefix='firebase'
+        )
+    return _executor
+
+
+_WRITE_METHODS = ('set', 'update', 'delete', 'create', 'add')
+
+
+def _describe(func):
+    """Clasifica una llamada del SDK para las métricas: (operación, lecturas, escrituras)."""
+    owner = getattr(func, '__self__', None)
+    if owner is None:
+        return None
+    name = getattr(func, '__name__', '')
+    kind = type(owner).__name__
+    if 'Blob' in kind or 'Bucket' in kind:
+        return f"storage.{name}", 0, 0
+    if name == 'commit':
+        return 'firestore.commit', 0, len(owner)
+    if name in _WRITE_METHODS and 'Reference' in kind:
+        return 'firestore.write', 0, 1
+    if name == 'get' and 'Document' in kind:
+        return 'firestore.get', 1, 0
+    return None
+
+
+async def _in_executor(func, *args, **kwargs):
+    # El contexto se copia al hilo para que las métricas se asignen a la petición actual
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Ejecuta una llamada bloqueante del SDK en el pool sin bloquear el event loop.
+    Las lecturas, escrituras y llamadas a Storage reconocibles se registran en las métricas.
+    """
+    described = _describe(func)
+    if described is None:
+        return await _in_executor(func, *args, **kwargs)
+    op, reads, writes = described
+    start = time.perf_counter()
+    try:
+        return await _in_executor(func, *args, **kwargs)
+    finally:
+        metrics_service.record_call(op, time.perf_counter() - start, reads=reads, writes=writes)
+
+
+async def warm_up() -> None:
+    """Crea los clientes fuera del event loop (se lanza en segundo plano al arrancar)."""
+    await run_blocking(_get_clients)
+
+
+def _auth_app():
+    """
+    App de firebase_admin para Auth. Con el backend 'firebase' es la app por
+    defecto; con el emulador u otros clientes inyectados se crea una solo con
+    el ID del proyecto (basta para verificar tokens y para el Auth Emulator).
+    """
+    import firebase_admin
+
+    with _clients_lock:
+        for name in (firebase_admin._DEFAULT_APP_NAME, 'auth'):
+            if name in firebase_admin._apps:
+                return firebase_admin.get_app(name)
+        return firebase_admin.initialize_app(options={'projectId': FIREBASE_PROJECT_ID}, name='auth')
+
+
+def verify_id_token(token: str):
+    """
+    Verifica un ID token de Firebase Auth con el backend activo: si el cliente
+    de Firestore trae su propio verificador (fake_firebase) se usa ese; si no,
+    firebase_admin.
+    """
+    from firebase_admin import auth as firebase_auth
+
+    client = get_db()
+    verify = getattr(client, 'verify_id_token', None)
+    if verify is not None:
+        return verify(token)
+    return firebase_auth.verify_id_token(token, app=_auth_app())
+
+
+async def get_document(ref):
+    """Lee un documento (DocumentReference.get) de forma asíncrona."""
+    return await run_blocking(ref.get)
+
+
+async def stream_query(query):
+    """Ejecuta una consulta y devuelve la lista completa de snapshots."""
+    start = time.perf_counter()
+    docs = await _in_executor(lambda: list(query.stream()))
+    # Firestore cobra al menos una lectura por consulta, aunque no devuelva documentos
+    metrics_service.record_call('firestore.query', time.perf_counter() - start, reads=max(1, len(docs)))
+    return docs
+
+
+async def get_documents(refs):
+    """Lectura múltiple (db.get_all) de varios documentos en una sola llamada."""
+    if not refs:
+        return []
+    start = time.perf_counter()
+    docs = await _in_executor(lambda: list(db.get_all(refs)))
+    metrics_service.record_call('firestore.get_all', time.perf_counter() - start, reads=len(refs))
+    return docs
+
+
+async def check_ready(timeout: float = 3.0) -> None:
+    """Comprueba que los clientes existen y que Firestore responde; lanza una excepción si no."""
+    await asyncio.wait_for(warm_up(), timeout=timeout)
+    ref = db.collection('_health').document('ping')
+    await asyncio.wait_for(get_document(ref), timeout=timeout)
+
+
+def shutdown() -> None:
+    """Libera el pool de hilos y cierra el cliente de Firestore, si se creó."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    client = _clients.get('db')
+    if client is not None and hasattr(client, 'close'):
+        client.close()
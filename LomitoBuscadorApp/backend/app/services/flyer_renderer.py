@@ -0,0 +1,114 @@
+# RUTA: backend/app/services/flyer_renderer.py
+#
+# Dibujo del cartel "SE BUSCA". Este módulo solo depende de Pillow porque se
+# importa en los procesos del pool de flyer_service: no debe arrastrar
+# FastAPI ni los clientes de Firebase.
+
+import io
+import textwrap
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps, UnidentifiedImageError
+
+# Cartel vertical de 1200 x 1800 px (4x6 pulgadas a 300 ppp)
+FLYER_SIZE = (1200, 1800)
+PDF_RESOLUTION = 300
+JPEG_QUALITY = 88
+
+HEADER_COLOR = (255, 215, 0)
+TITLE_COLOR = (210, 43, 43)
+TEXT_COLOR = (51, 51, 51)
+BACKGROUND = (255, 255, 255)
+
+_FONT_FILES = {True: 'DejaVuSans-Bold.ttf', False: 'DejaVuSans.ttf'}
+
+
+def _font(size: int, bold: bool = False):
+    """
+    DejaVu si está instalada; si no, la fuente escalable que trae Pillow.
+    Sin FreeType (ImportError) o con Pillow < 10.1 (sin `size`, TypeError)
+    queda la fuente de mapa de bits: pequeña, sin `size` y solo Latin-1.
+    """
+    try:
+        return ImageFont.truetype(_FONT_FILES[bold], size)
+    except (OSError, ImportError):
+        pass
+    try:
+        return ImageFont.load_default(size=size)
+    except (ImportError, TypeError):
+        return ImageFont.load_default()
+
+
+def _drawable(text: str, font) -> str:
+    # La fuente de mapa de bits solo tiene Latin-1: el resto se cambia por '?'
+    if isinstance(font, ImageFont.FreeTypeFont):
+        return text
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+def _centered(draw: ImageDraw.ImageDraw, y: int, text: str, font, fill) -> int:
+    """Escribe una línea centrada y devuelve la `y` de la siguiente."""
+    text = _drawable(text, font)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text(((FLYER_SIZE[0] - (right - left)) / 2, y), text, font=font, fill=fill)
+    return y + (bottom - top) + int(getattr(font, 'size', bottom - top) * 0.35)
+
+
+def _photo(photo: Optional[bytes], box: Tuple[int, int]) -> Image.Image:
+    if photo:
+        try:
+            with Image.open(io.BytesIO(photo)) as source:
+                image = ImageOps.exif_transpose(source).convert('RGB')
+                return ImageOps.fit(image, box, Image.LANCZOS)
+        except (UnidentifiedImageError, OSError):
+            pass
+    placeholder = Image.new('RGB', box, (230, 230, 230))
+    draw = ImageDraw.Draw(placeholder)
+    font = _font(48)
+    # Centrado a mano: las versiones antiguas de Pillow no admiten `anchor` con fuentes de mapa de bits
+    left, top, right, bottom = draw.textbbox((0, 0), "Sin foto", font=font)
+    draw.text(((box[0] - (right - left)) / 2, (box[1] - (bottom - top)) / 2), "Sin foto", font=font, fill=(150, 150, 150))
+    return placeholder
+
+
+def render_flyer(inputs: Dict[str, Any], photo: Optional[bytes]) -> Tuple[bytes, bytes]:
+    """
+    Dibuja el cartel a partir de los datos de `flyer_service.flyer_inputs`
+    y la foto principal. Devuelve (jpg, pdf).
+    """
+    width, height = FLYER_SIZE
+    flyer = Image.new('RGB', FLYER_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(flyer)
+
+    draw.rectangle((0, 0, width, 170), fill=HEADER_COLOR)
+    _centered(draw, 30, "SE BUSCA", _font(110, bold=True), TITLE_COLOR)
+
+    flyer.paste(_photo(photo, (width - 120, 760)), (60, 200))
+
+    y = _centered(draw, 990, (inputs.get('name') or 'Mascota').upper(), _font(96, bold=True), TEXT_COLOR)
+    details = " · ".join(str(v) for v in (inputs.get('species'), inputs.get('breed'), inputs.get('sex'),
+                                          inputs.get('size')) if v)
+    if details:
+        y = _centered(draw, y, details, _font(44), TEXT_COLOR)
+    if inputs.get('colors'):
+        y = _centered(draw, y, f"Color: {inputs['colors']}", _font(40), TEXT_COLOR)
+    for line in textwrap.wrap(inputs.get('specialFeatures') or '', width=48)[:2]:
+        y = _centered(draw, y, line, _font(36), TEXT_COLOR)
+
+    y += 20
+    if inputs.get('lastSeenAddress'):
+        y = _centered(draw, y, "Visto por última vez en:", _font(40, bold=True), TITLE_COLOR)
+        for line in textwrap.wrap(inputs['lastSeenAddress'], width=44)[:2]:
+            y = _centered(draw, y, line, _font(40), TEXT_COLOR)
+    if inputs.get('lastSeenDate'):
+        y = _centered(draw, y, inputs['lastSeenDate'], _font(36), TEXT_COLOR)
+
+    draw.rectangle((0, height - 220, width, height), fill=TITLE_COLOR)
+    contact = inputs.get('ownerPhone') or ''
+    _centered(draw, height - 200, "Si la has visto, llama a:", _font(44, bold=True), BACKGROUND)
+    _centered(draw, height - 130, f"{inputs.get('ownerName') or ''} {contact}".strip(), _font(60, bold=True), BACKGROUND)
+
+    jpg, pdf = io.BytesIO(), io.BytesIO()
+    flyer.save(jpg, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    flyer.save(pdf, 'PDF', resolution=PDF_RESOLUTION)
+    return jpg.getvalue(), pdf.getvalue()
@@ -0,0 +1,203 @@
+# RUTA: backend/app/services/flyer_service.py
+
+import asyncio
+import contextvars
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from google.api_core.exceptions import NotFound
+
+from .firebase_service import bucket, db, get_document, run_blocking
+from .flyer_renderer import render_flyer
+from .hydration_service import fetch_pets
+from .image_service import thumbnail_url
+from .upload_service import blob_name_from_url
+
+logger = logging.getLogger(__name__)
+
+# Cambiar la versión cuando cambie el diseño, para que se vuelvan a generar todos
+FLYER_TEMPLATE_VERSION = 1
+# Procesos dedicados a dibujar carteles (el dibujo no libera el GIL)
+FLYER_WORKERS = int(os.getenv('FLYER_WORKERS', '2'))
+# Segundos máximos para dibujar y subir un cartel; un archivo más reciente puede ser de un render en curso
+FLYER_RENDER_TIMEOUT = int(os.getenv('FLYER_RENDER_TIMEOUT', '120'))
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Renders en curso por (reporte, hash): peticiones simultáneas del mismo cartel esperan al mismo.
+# El hash solo depende de lo que se dibuja, así que dos reportes pueden compartirlo.
+_in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+# Referencias a los renders lanzados en segundo plano (para que no los recolecte el GC)
+_background = set()
+
+
+def flyer_prefix(report_id: str) -> str:
+    """Carpeta de Storage con los carteles de un reporte."""
+    return f"flyers/{report_id}/"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 'spawn' evita heredar los hilos del SDK de Firebase al hacer fork
+        _pool = ProcessPoolExecutor(max_workers=FLYER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+async def _render(inputs: Dict[str, Any], photo: Optional[bytes]):
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), render_flyer, inputs, photo)
+    except BrokenProcessPool:
+        # Un proceso murió (p. ej. por memoria): se crea un pool nuevo y se reintenta una vez
+        shutdown()
+        return await loop.run_in_executor(_get_pool(), render_flyer, inputs, photo)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def flyer_inputs(report_data: Dict[str, Any], pet_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Todo lo que aparece en el cartel; si nada de esto cambia, el cartel tampoco."""
+    basic_info = pet_data.get('basicInfo', {})
+    specific_info = pet_data.get('specificInfo', {})
+    owner_info = pet_data.get('ownerInfo', {})
+    reported_at = report_data.get('reportedAt')
+    colors = specific_info.get('colors')
+    return {
+        'name': basic_info.get('name'),
+        'photoUrl': thumbnail_url(basic_info.get('photos'), basic_info.get('photoVariants'), 'full'),
+        'species': specific_info.get('species'),
+        'breed': specific_info.get('breed'),
+        'sex': specific_info.get('sex'),
+        'size': specific_info.get('size'),
+        'colors': ", ".join(colors) if isinstance(colors, list) else colors,
+        'specialFeatures': specific_info.get('specialFeatures'),
+        'lastSeenAddress': (report_data.get('lastSeenLocation') or {}).get('address'),
+        'lastSeenDate': reported_at.strftime('%d/%m/%Y') if isinstance(reported_at, datetime.datetime) else None,
+        'ownerName': owner_info.get('ownerName'),
+        'ownerPhone': owner_info.get('ownerPhone'),
+    }
+
+
+def content_hash(inputs: Dict[str, Any]) -> str:
+    raw = json.dumps({'v': FLYER_TEMPLATE_VERSION, **inputs}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+
+def _download_photo(url: Optional[str]) -> Optional[bytes]:
+    # Solo se descargan fotos de nuestro propio bucket
+    name = blob_name_from_url(url)
+    if not name:
+        return None
+    try:
+        return bucket.blob(name).download_as_bytes()
+    except NotFound:
+        return None
+
+
+def _existing_flyer(jpg_name: str, pdf_name: str) -> bool:
+    names = {blob.name for blob in bucket.list_blobs(prefix=jpg_name.rsplit('.', 1)[0])}
+    return jpg_name in names and pdf_name in names
+
+
+async def _render_and_upload(report_id: str, inputs: Dict[str, Any], digest: str) -> Dict[str, str]:
+    jpg_blob = bucket.blob(f"{flyer_prefix(report_id)}{digest}.jpg")
+    pdf_blob = bucket.blob(f"{flyer_prefix(report_id)}{digest}.pdf")
+    # Otra instancia pudo haberlo generado ya
+    if not await run_blocking(_existing_flyer, jpg_blob.name, pdf_blob.name):
+        photo = await run_blocking(_download_photo, inputs.get('photoUrl'))
+        jpg, pdf = await asyncio.wait_for(_render(inputs, photo), FLYER_RENDER_TIMEOUT)
+        await asyncio.gather(
+            run_blocking(jpg_blob.upload_from_string, jpg, content_type='image/jpeg', predefined_acl='publicRead'),
+            run_blocking(pdf_blob.upload_from_string, pdf, content_type='application/pdf', predefined_acl='publicRead'),
+        )
+    return {'imageUrl': jpg_blob.public_url, 'pdfUrl': pdf_blob.public_url}
+
+
+def _is_stale(blob, report_id: str, digest: str, cutoff: datetime.datetime) -> bool:
+    blob_digest = blob.name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    if blob_digest == digest or (report_id, blob_digest) in _in_flight:
+        return False
+    # Otra instancia puede estar generando una versión más nueva: solo se borra
+    # lo que lleva más de FLYER_RENDER_TIMEOUT sin cambios
+    return blob.updated is not None and blob.updated < cutoff
+
+
+async def _remove_stale(report_id: str, digest: str) -> None:
+    """Borra los carteles de versiones anteriores del reporte que ya no se estén generando."""
+    blobs = await run_blocking(lambda: list(bucket.list_blobs(prefix=flyer_prefix(report_id))))
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=FLYER_RENDER_TIMEOUT)
+    for blob in blobs:
+        if _is_stale(blob, report_id, digest, cutoff):
+            try:
+                await run_blocking(blob.delete)
+            except NotFound:
+                pass
+
+
+async def ensure_flyer(report_id: str, report_data: Dict[str, Any], pet_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Devuelve las URLs del cartel (JPG y PDF) del reporte. Solo se dibuja si
+    cambió alguno de los datos que aparecen en él: el hash de esos datos se
+    guarda en el reporte junto a las URLs y forma parte del nombre del archivo.
+    """
+    digest = content_hash(flyer_inputs(report_data, pet_data))
+    if report_data.get('flyerHash') == digest and report_data.get('shareableImageUrl'):
+        return {'imageUrl': report_data['shareableImageUrl'], 'pdfUrl': report_data.get('shareablePdfUrl'),
+                'hash': digest, 'cached': True}
+
+    key = (report_id, digest)
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(
+            _render_and_upload(report_id, flyer_inputs(report_data, pet_data), digest))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    urls = await asyncio.shield(task)
+
+    try:
+        await run_blocking(db.collection('lostReports').document(report_id).update, {
+            'shareableImageUrl': urls['imageUrl'], 'shareablePdfUrl': urls['pdfUrl'], 'flyerHash': digest,
+        })
+    except NotFound:
+        # El reporte se borró mientras se dibujaba el cartel
+        pass
+    await _remove_stale(report_id, digest)
+    return {**urls, 'hash': digest, 'cached': False}
+
+
+async def refresh_flyer(report_id: str) -> Optional[Dict[str, Any]]:
+    """Lee el reporte y su mascota y asegura que el cartel esté al día. None si ya no existen."""
+    report_doc = await get_document(db.collection('lostReports').document(report_id))
+    if not report_doc.exists:
+        return None
+    report_data = report_doc.to_dict()
+    pet_data = (await fetch_pets([report_data.get('petId')])).get(report_data.get('petId'))
+    if pet_data is None:
+        return None
+    return await ensure_flyer(report_id, report_data, pet_data)
+
+
+async def _refresh_in_background(report_id: str) -> None:
+    try:
+        await refresh_flyer(report_id)
+    except Exception:
+        logger.exception("Error al generar el cartel del reporte %s", report_id)
+
+
+def schedule(report_id: str) -> None:
+    """Genera el cartel en segundo plano, fuera de la petición que lo pide."""
+    task = asyncio.get_running_loop().create_task(_refresh_in_background(report_id), context=contextvars.Context())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
@@ -0,0 +1,210 @@
+# RUTA: backend/app/services/geo_service.py
+
+import base64
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Alfabeto base32 estándar de geohash
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precisión con la que se guarda el geohash en cada documento.
+# 9 caracteres equivalen a celdas de ~5 m, suficiente para cualquier consulta.
+GEOHASH_PRECISION = 9
+
+# Consultas por búsqueda de radio: como mucho MAX_COVERING_CELLS prefijos,
+# de precisión MAX_COVERING_PRECISION o menor (7 = celdas de ~150 m)
+MAX_COVERING_CELLS = 24
+MAX_COVERING_PRECISION = 7
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_many(lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Distancias en km desde (lat, lon) a cada punto, en una sola pasada vectorizada."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Rectángulo (lat_min, lat_max, lon_min, lon_max) que contiene el círculo de búsqueda."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def within_radius(lat: float, lon: float, lats: Sequence[float], lons: Sequence[float],
+                  radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Índices de los puntos a menos de `radius_km`, ordenados de más cercano a
+    más lejano, y sus distancias (redondeadas a 2 decimales como la API).
+    Antes del cálculo exacto se descartan los puntos fuera del rectángulo.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    lat_min, lat_max, lon_min, lon_max = bounding_box(lat, lon, radius_km)
+    # Diferencia de longitud normalizada a [-180, 180) para cruzar el antimeridiano
+    lon_delta = (lons - lon + 180.0) % 360.0 - 180.0
+    candidates = np.nonzero(
+        (lats >= lat_min) & (lats <= lat_max) & (np.abs(lon_delta) <= lon_max - lon)
+    )[0]
+
+    distances = np.round(haversine_many(lat, lon, lats[candidates], lons[candidates]), 2)
+    inside = distances <= radius_km
+    candidates, distances = candidates[inside], distances[inside]
+    order = np.argsort(distances, kind='stable')
+    return candidates[order], distances[order]
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Codifica una coordenada como geohash con la precisión indicada."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits, bit_count, even = 0, 0, True
+    while len(geohash) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(geohash)
+
+
+def location_geohash(location: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Devuelve el geohash de un dict {'latitude', 'longitude'} o None si no es válido."""
+    if not location or location.get('latitude') is None or location.get('longitude') is None:
+        return None
+    return encode_geohash(float(location['latitude']), float(location['longitude']))
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """
+    Devuelve los prefijos geohash que cubren el círculo (centro, radio): las
+    celdas del rectángulo que lo contiene, con la precisión más fina que no
+    pase de MAX_COVERING_CELLS celdas (p. ej. 40 km se cubren con ~20 celdas
+    de precisión 4 en lugar de 9 de ~156 km).
+    """
+    lat_min, lat_max, lon_min, lon_max = bounding_box(latitude, longitude, radius_km)
+    precision = precision_for_bbox(lat_min, lon_min, lat_max, lon_max, MAX_COVERING_PRECISION, MAX_COVERING_CELLS)
+    return cells_in_bbox(lat_min, lon_min, lat_max, lon_max, precision)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Tamaño exacto (alto, ancho) en grados de una celda geohash."""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+# Límite de celdas que enumera `cells_in_bbox` (protege de rectángulos enormes a precisión fina)
+MAX_BBOX_CELLS = 4096
+
+
+def _bbox_grid(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               precision: int) -> Tuple[range, range, int]:
+    """
+    Filas y columnas (índices de la rejilla geohash) que cubren el rectángulo,
+    y el número de columnas del mundo. La latitud se recorta a ±90 y el ancho
+    a 360°; `max_lon` puede pasar de 180 si el rectángulo cruza el antimeridiano.
+    """
+    height, width = geohash_cell_size(precision)
+    rows, cols = round(180.0 / height), round(360.0 / width)
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    first_row = min(int(math.floor((min_lat + 90.0) / height)), rows - 1)
+    last_row = min(int(math.floor((max_lat + 90.0) / height)), rows - 1)
+    first_col = int(math.floor((min_lon + 180.0) / width))
+    last_col = min(int(math.floor((max_lon + 180.0) / width)), first_col + cols - 1)
+    return range(first_row, last_row + 1), range(first_col, last_col + 1), cols
+
+
+def count_cells_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float, precision: int) -> int:
+    """Número de celdas que devolvería `cells_in_bbox`, sin enumerarlas."""
+    rows, cols, _ = _bbox_grid(min_lat, min_lon, max_lat, max_lon, precision)
+    return len(rows) * len(cols)
+
+
+def precision_for_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                       max_precision: int, max_cells: int) -> int:
+    """
+    Precisión más fina (hasta `max_precision`) con la que el rectángulo se
+    cubre con `max_cells` celdas como mucho. Nunca baja de 1 (32 celdas para el mundo entero).
+    """
+    precision = max(1, max_precision)
+    while precision > 1 and count_cells_in_bbox(min_lat, min_lon, max_lat, max_lon, precision) > max_cells:
+        precision -= 1
+    return precision
+
+
+def cells_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float, precision: int) -> List[str]:
+    """
+    Celdas geohash de la precisión dada que cubren el rectángulo. Se recorren
+    los índices de la rejilla (el centro de cada celda), así que no hay
+    duplicados salvo al dar la vuelta al mundo. ValueError si son más de MAX_BBOX_CELLS.
+    """
+    rows, cols, world_cols = _bbox_grid(min_lat, min_lon, max_lat, max_lon, precision)
+    if len(rows) * len(cols) > MAX_BBOX_CELLS:
+        raise ValueError(f"El rectángulo necesita más de {MAX_BBOX_CELLS} celdas de precisión {precision}.")
+    height, width = geohash_cell_size(precision)
+    cells = []
+    seen = set()
+    for row in rows:
+        lat = -90.0 + (row + 0.5) * height
+        for col in cols:
+            lon = -180.0 + ((col % world_cols) + 0.5) * width
+            cell = encode_geohash(lat, lon, precision)
+            if cell not in seen:
+                seen.add(cell)
+                cells.append(cell)
+    return cells
+
+
+def geohash_bounds(cell: str) -> Tuple[float, float, float, float]:
+    """Límites (lat_min, lon_min, lat_max, lon_max) de una celda geohash."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def encode_distance_cursor(distance: float, doc_id: str) -> str:
+    """Genera un cursor opaco a partir del último resultado (distancia, id) de la página."""
+    raw = json.dumps({'d': distance, 'id': doc_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_distance_cursor(cursor: Optional[str]) -> Optional[Tuple[float, str]]:
+    """Decodifica un cursor generado por `encode_distance_cursor`."""
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return float(data['d']), str(data['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido")
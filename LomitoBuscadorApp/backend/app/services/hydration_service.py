@@ -0,0 +1,69 @@
+# RUTA: backend/app/services/hydration_service.py
+
+from typing import Any, Dict, Iterable, List
+
+from .cache_service import TTLCache
+from .firebase_service import db, get_documents
+
+# Perfiles públicos de usuario (nombre y foto); se refrescan cada 5 minutos
+user_profile_cache = TTLCache(maxsize=2048, ttl=300)
+
+
+async def fetch_pets(pet_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Resuelve varias mascotas con una sola lectura múltiple (db.get_all).
+    Los IDs repetidos se piden una sola vez; las mascotas que no existen
+    no aparecen en el resultado.
+    """
+    unique_ids = list(dict.fromkeys(pid for pid in pet_ids if pid))
+    if not unique_ids:
+        return {}
+    refs = [db.collection('pets').document(pid) for pid in unique_ids]
+    return {doc.id: doc.to_dict() for doc in await get_documents(refs) if doc.exists}
+
+
+async def attach_pet_info(reports: List[Dict[str, Any]], drop_missing: bool = True) -> List[Dict[str, Any]]:
+    """
+    Añade 'petInfo' a cada reporte de la lista usando `fetch_pets`.
+    Si `drop_missing` es True se descartan los reportes cuya mascota ya no existe.
+    """
+    pets = await fetch_pets(report.get('petId') for report in reports)
+    hydrated = []
+    for report in reports:
+        pet_data = pets.get(report.get('petId'))
+        if pet_data is None and drop_missing:
+            continue
+        report['petInfo'] = pet_data
+        hydrated.append(report)
+    return hydrated
+
+
+async def fetch_user_profiles(user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Devuelve {uid: {'name', 'photo'}} para cada usuario pedido.
+    Los perfiles se leen de la caché y los que faltan se piden en una sola
+    lectura múltiple. Los usuarios inexistentes (o sin uid) obtienen el perfil
+    por defecto.
+    """
+    unique_ids = list(dict.fromkeys(user_ids))
+    profiles = {}
+    missing = []
+    for uid in unique_ids:
+        if not uid:
+            profiles[uid] = {'name': 'Usuario', 'photo': None}
+            continue
+        profile = user_profile_cache.get(uid)
+        if profile is None:
+            missing.append(uid)
+        else:
+            profiles[uid] = dict(profile)
+
+    if missing:
+        refs = [db.collection('users').document(uid) for uid in missing]
+        found = {doc.id: doc.to_dict() for doc in await get_documents(refs) if doc.exists}
+        for uid in missing:
+            user_data = found.get(uid, {})
+            profile = {'name': user_data.get('displayName', 'Usuario'), 'photo': user_data.get('photoURL')}
+            user_profile_cache.set(uid, profile)
+            profiles[uid] = dict(profile)
+    return profiles
@@ -0,0 +1,102 @@
+# RUTA: backend/app/services/image_service.py
+
+import io
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Dict
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Lado mayor (en px) de cada derivado que se genera al subir una foto
+DERIVATIVE_SIZES = {
+    'thumb': 200,
+    'card': 640,
+    'full': 1600,
+}
+DERIVATIVE_FORMAT = 'WEBP'
+DERIVATIVE_CONTENT_TYPE = 'image/webp'
+DERIVATIVE_QUALITY = {'thumb': 70, 'card': 78, 'full': 85}
+
+# Píxeles máximos de una foto; por encima se rechaza (bombas de descompresión)
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', str(Image.MAX_IMAGE_PIXELS)))
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Formato en que se guarda el original: (formato de PIL, content type, extensión).
+# Los formatos que no están aquí (HEIC, GIF, BMP, ...) se guardan como JPEG.
+ORIGINAL_FORMATS = {
+    'JPEG': ('JPEG', 'image/jpeg', 'jpg'),
+    'PNG': ('PNG', 'image/png', 'png'),
+    'WEBP': ('WEBP', 'image/webp', 'webp'),
+}
+ORIGINAL_JPEG_QUALITY = 92
+
+
+class InvalidImage(ValueError):
+    """El archivo no es una imagen que se pueda procesar (o es demasiado grande)."""
+
+
+@dataclass
+class ProcessedImage:
+    """Original sin metadatos y sus derivados, listos para subir."""
+    original: bytes
+    content_type: str
+    extension: str
+    derivatives: Dict[str, bytes]
+
+
+def _encode_original(image: Image.Image, source_format: str) -> ProcessedImage:
+    image_format, content_type, extension = ORIGINAL_FORMATS.get(source_format, ORIGINAL_FORMATS['JPEG'])
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    # No se pasa 'exif' ni 'pnginfo': la imagen se guarda sin metadatos
+    if image_format == 'JPEG':
+        image.save(buffer, image_format, quality=ORIGINAL_JPEG_QUALITY, optimize=True)
+    elif image_format == 'WEBP':
+        image.save(buffer, image_format, quality=90, method=4)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return ProcessedImage(buffer.getvalue(), content_type, extension, {})
+
+
+def process_image(fileobj: BinaryIO) -> ProcessedImage:
+    """
+    Prepara una foto subida para publicarla: el original se re-codifica sin
+    metadatos (incluida la ubicación GPS del teléfono) y se generan las
+    versiones reducidas (thumb, card, full) en WebP. La orientación EXIF se
+    aplica a los píxeles. Lanza InvalidImage si el archivo no es una imagen
+    reconocible o supera MAX_IMAGE_PIXELS.
+    """
+    fileobj.seek(0)
+    try:
+        with Image.open(fileobj) as source:
+            width, height = source.size
+            if width * height > MAX_IMAGE_PIXELS:
+                raise InvalidImage(f"La imagen supera {MAX_IMAGE_PIXELS} píxeles.")
+            source_format = source.format
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+            processed = _encode_original(image, source_format)
+            for name, max_side in DERIVATIVE_SIZES.items():
+                resized = image.copy()
+                resized.thumbnail((max_side, max_side), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY[name], method=4)
+                processed.derivatives[name] = buffer.getvalue()
+            return processed
+    except Image.DecompressionBombError as e:
+        raise InvalidImage(str(e))
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        # SyntaxError: algunos decodificadores de PIL lo lanzan con archivos corruptos
+        raise InvalidImage("El archivo no es una imagen válida.")
+    finally:
+        fileobj.seek(0)
+
+
+def thumbnail_url(photos, photo_variants, size: str = 'thumb'):
+    """URL de la primera foto en el tamaño pedido; recurre a 'photos' en documentos antiguos."""
+    if photo_variants:
+        return photo_variants[0].get(size) or photo_variants[0].get('original')
+    return photos[0] if photos else None
@@ -0,0 +1,412 @@
+# RUTA: backend/app/services/matching_service.py
+#
+# Coincidencias entre avistamientos públicos y reportes de mascotas perdidas.
+# Cada proceso mantiene en memoria un índice de los reportes activos por
+# (celda geohash, especie); un avistamiento nuevo se compara solo con los
+# candidatos de su zona y se guardan los mejores en el avistamiento y en cada
+# reporte. Tamaño, colores y manchas no tienen listas propias: solo puntúan
+# (ver MatchIndex).
+
+import asyncio
+import contextvars
+import datetime
+import heapq
+import logging
+import os
+import time
+import unicodedata
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .firebase_service import db, stream_query
+from .geo_service import bounding_box, cells_in_bbox, encode_geohash, haversine_many
+from .hydration_service import attach_pet_info
+from .image_service import thumbnail_url
+from .unit_of_work import run_transaction
+
+logger = logging.getLogger(__name__)
+
+# Celdas del índice espacial: geohash de 4 caracteres (~20 x 39 km)
+INDEX_CELL_PRECISION = 4
+# Distancia máxima entre el avistamiento y la última ubicación conocida del reporte
+MATCH_RADIUS_KM = float(os.getenv('MATCH_RADIUS_KM', '25'))
+# Coincidencias guardadas en cada avistamiento y en cada reporte, y puntuación mínima
+MATCH_TOP_K = int(os.getenv('MATCH_TOP_K', '5'))
+MAX_REPORT_MATCHES = 20
+MIN_MATCH_SCORE = 0.35
+# Cada cuánto se reconstruye el índice desde Firestore (otras instancias también escriben)
+INDEX_TTL_SECONDS = float(os.getenv('MATCH_INDEX_TTL_SECONDS', '600'))
+
+# Peso de cada criterio en la puntuación (suman 1)
+WEIGHTS = {'colors': 0.35, 'size': 0.2, 'spots': 0.1, 'distance': 0.35}
+_BEST_TRAITS_SCORE = WEIGHTS['colors'] + WEIGHTS['size'] + WEIGHTS['spots']
+# Tamaños de menor a mayor: uno de diferencia cuenta como media coincidencia
+SIZE_ORDER = ['mini', 'chico', 'mediano', 'grande', 'gigante']
+_SIZE_ALIASES = {'pequeno': 'chico', 'small': 'chico', 'medium': 'mediano', 'large': 'grande',
+                 'toy': 'mini', 'enorme': 'gigante'}
+
+
+def normalize(value: Any) -> Optional[str]:
+    """Minúsculas, sin acentos ni espacios sobrantes ('Café ' -> 'cafe')."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = unicodedata.normalize('NFKD', value.strip().lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def _size_rank(value: Any) -> Optional[int]:
+    size = normalize(value)
+    size = _SIZE_ALIASES.get(size, size)
+    return SIZE_ORDER.index(size) if size in SIZE_ORDER else None
+
+
+def _color_set(colors: Any) -> FrozenSet[str]:
+    if isinstance(colors, str):
+        colors = colors.split(',')
+    return frozenset(c for c in (normalize(color) for color in colors or []) if c)
+
+
+@dataclass
+class Candidate:
+    """Lo que el índice guarda de cada reporte activo."""
+    report_id: str
+    pet_id: Optional[str]
+    pet_name: Optional[str]
+    thumbnail_url: Optional[str]
+    species: Optional[str]
+    size: Optional[int]
+    colors: FrozenSet[str]
+    has_spots: Optional[bool]
+    latitude: float
+    longitude: float
+    cell: str
+
+
+@dataclass
+class SightingTraits:
+    species: Optional[str]
+    size: Optional[int]
+    colors: FrozenSet[str]
+    has_spots: Optional[bool]
+    latitude: float
+    longitude: float
+
+
+def candidate_from(report_id: str, report_data: Dict[str, Any], pet_data: Dict[str, Any]) -> Optional[Candidate]:
+    location = report_data.get('lastKnownLocation') or report_data.get('lastSeenLocation') or {}
+    if location.get('latitude') is None or location.get('longitude') is None:
+        return None
+    basic_info = pet_data.get('basicInfo', {})
+    specific_info = pet_data.get('specificInfo', {})
+    latitude, longitude = float(location['latitude']), float(location['longitude'])
+    return Candidate(
+        report_id=report_id,
+        pet_id=report_data.get('petId'),
+        pet_name=basic_info.get('name'),
+        thumbnail_url=thumbnail_url(basic_info.get('photos'), basic_info.get('photoVariants')),
+        species=normalize(specific_info.get('species')),
+        size=_size_rank(specific_info.get('size')),
+        colors=_color_set(specific_info.get('colors')),
+        has_spots=specific_info.get('hasSpots'),
+        latitude=latitude, longitude=longitude,
+        cell=encode_geohash(latitude, longitude, INDEX_CELL_PRECISION),
+    )
+
+
+def traits_from(sighting_data: Dict[str, Any]) -> SightingTraits:
+    description = sighting_data.get('petDescription') or {}
+    location = sighting_data.get('location') or {}
+    return SightingTraits(
+        species=normalize(description.get('species')),
+        size=_size_rank(description.get('approximateSize')),
+        colors=_color_set(description.get('colors')),
+        has_spots=description.get('hasSpots'),
+        latitude=float(location['latitude']), longitude=float(location['longitude']),
+    )
+
+
+def score(traits: SightingTraits, candidate: Candidate, distance_km: float, radius_km: float) -> float:
+    """
+    Puntuación entre 0 y 1. Un criterio desconocido en cualquiera de los dos
+    lados cuenta como media coincidencia: ni suma ni descarta.
+    """
+    if traits.colors and candidate.colors:
+        colors = len(traits.colors & candidate.colors) / len(traits.colors | candidate.colors)
+    else:
+        colors = 0.5
+    if traits.size is not None and candidate.size is not None:
+        size = {0: 1.0, 1: 0.5}.get(abs(traits.size - candidate.size), 0.0)
+    else:
+        size = 0.5
+    if traits.has_spots is not None and candidate.has_spots is not None:
+        spots = 1.0 if traits.has_spots == candidate.has_spots else 0.0
+    else:
+        spots = 0.5
+    distance = max(0.0, 1.0 - distance_km / radius_km)
+    return (WEIGHTS['colors'] * colors + WEIGHTS['size'] * size
+            + WEIGHTS['spots'] * spots + WEIGHTS['distance'] * distance)
+
+
+class _Bucket:
+    """Reportes de una celda y especie, con sus coordenadas como arreglo (se recalcula al cambiar)."""
+
+    __slots__ = ('coords', '_ids', '_array')
+
+    def __init__(self):
+        self.coords: Dict[str, Tuple[float, float]] = {}
+        self._ids: Optional[List[str]] = None
+        self._array: Optional[np.ndarray] = None
+
+    def put(self, report_id: str, latitude: float, longitude: float) -> None:
+        self.coords[report_id] = (latitude, longitude)
+        self._ids = self._array = None
+
+    def discard(self, report_id: str) -> None:
+        if self.coords.pop(report_id, None) is not None:
+            self._ids = self._array = None
+
+    def arrays(self) -> Tuple[List[str], np.ndarray]:
+        if self._array is None:
+            self._ids = list(self.coords)
+            self._array = np.array(list(self.coords.values()), dtype=np.float64).reshape(-1, 2)
+        return self._ids, self._array
+
+
+class MatchIndex:
+    """
+    Índice invertido en memoria por (celda geohash, especie). La zona y la
+    especie filtran; el resto de criterios solo puntúan. No hay listas por
+    tamaño, color o manchas: un reporte sin ninguno en común aún puede entrar
+    por cercanía, y el recorrido del más cercano al más lejano ya corta en
+    cuanto la distancia no alcanza el top-k, así que unirlas costaba más que
+    lo que ahorraba. Las operaciones son síncronas y cortas, por lo que se
+    ejecutan en el bucle de eventos sin bloqueo.
+    """
+
+    def __init__(self):
+        self.candidates: Dict[str, Candidate] = {}
+        self.buckets: Dict[Tuple[str, Optional[str]], _Bucket] = {}
+        self.by_pet: Dict[str, str] = {}
+        self.built_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def add(self, candidate: Candidate) -> None:
+        self.remove(candidate.report_id)
+        self.candidates[candidate.report_id] = candidate
+        bucket = self.buckets.setdefault((candidate.cell, candidate.species), _Bucket())
+        bucket.put(candidate.report_id, candidate.latitude, candidate.longitude)
+        if candidate.pet_id:
+            self.by_pet[candidate.pet_id] = candidate.report_id
+
+    def remove(self, report_id: str) -> None:
+        candidate = self.candidates.pop(report_id, None)
+        if candidate is None:
+            return
+        key = (candidate.cell, candidate.species)
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.discard(report_id)
+            if not bucket.coords:
+                del self.buckets[key]
+        if self.by_pet.get(candidate.pet_id) == report_id:
+            del self.by_pet[candidate.pet_id]
+
+    def replace_all(self, candidates: Iterable[Candidate]) -> None:
+        self.candidates.clear()
+        self.buckets.clear()
+        self.by_pet.clear()
+        for candidate in candidates:
+            self.add(candidate)
+        self.built_at = time.monotonic()
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float,
+               species: Optional[str]) -> Tuple[List[str], np.ndarray]:
+        """IDs y coordenadas de los reportes de las celdas que cubren el radio (misma especie o sin especie)."""
+        lat_min, lat_max, lon_min, lon_max = bounding_box(latitude, longitude, radius_km)
+        cells = cells_in_bbox(lat_min, lon_min, lat_max, lon_max, INDEX_CELL_PRECISION)
+        if species is None:
+            # Avistamiento sin especie: se comparan todas las especies de esas celdas
+            wanted = set(cells)
+            keys = [key for key in self.buckets if key[0] in wanted]
+        else:
+            keys = [(cell, s) for cell in cells for s in (species, None)]
+        ids: List[str] = []
+        arrays = []
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket_ids, coords = bucket.arrays()
+                ids.extend(bucket_ids)
+                arrays.append(coords)
+        return ids, (np.concatenate(arrays) if arrays else np.empty((0, 2)))
+
+    def top_matches(self, traits: SightingTraits, k: int = MATCH_TOP_K,
+                    radius_km: float = MATCH_RADIUS_KM) -> List[Dict[str, Any]]:
+        """Los `k` reportes que mejor coinciden con el avistamiento, de mayor a menor puntuación."""
+        ids, coords = self.nearby(traits.latitude, traits.longitude, radius_km, traits.species)
+        if not ids:
+            return []
+        distances = haversine_many(traits.latitude, traits.longitude, coords[:, 0], coords[:, 1])
+        inside = np.nonzero(distances <= radius_km)[0]
+        # Se recorren de más cercano a más lejano: la distancia acota la puntuación
+        # máxima posible, así que al llenar el top-k se puede parar antes de puntuar todos.
+        best: List[Tuple[float, float, str]] = []
+        for position in inside[np.argsort(distances[inside], kind='stable')].tolist():
+            distance = float(distances[position])
+            floor = best[0][0] if len(best) == k else MIN_MATCH_SCORE
+            if _BEST_TRAITS_SCORE + WEIGHTS['distance'] * (1.0 - distance / radius_km) < floor:
+                break
+            value = score(traits, self.candidates[ids[position]], distance, radius_km)
+            if value < floor:
+                continue
+            heapq.heappush(best, (value, -distance, ids[position]))
+            if len(best) > k:
+                heapq.heappop(best)
+
+        matches = []
+        for value, negative_distance, report_id in sorted(best, reverse=True):
+            candidate = self.candidates[report_id]
+            matches.append({
+                'reportId': candidate.report_id, 'petId': candidate.pet_id, 'petName': candidate.pet_name,
+                'thumbnailUrl': candidate.thumbnail_url,
+                'score': round(value, 3), 'distanceKm': round(-negative_distance, 2),
+            })
+        return matches
+
+
+match_index = MatchIndex()
+_rebuild_lock: Optional[asyncio.Lock] = None
+# Referencias a las tareas en segundo plano (para que no las recolecte el GC)
+_background = set()
+
+
+async def rebuild_index() -> int:
+    """Carga en el índice todos los reportes activos. Devuelve cuántos."""
+    reports = []
+    for doc in await stream_query(db.collection('lostReports').where('status', '==', 'active')):
+        report_data = doc.to_dict()
+        report_data['reportId'] = doc.id
+        reports.append(report_data)
+    reports = await attach_pet_info(reports)
+    candidates = (candidate_from(r['reportId'], r, r['petInfo']) for r in reports)
+    match_index.replace_all(c for c in candidates if c is not None)
+    return len(match_index)
+
+
+async def ensure_index() -> MatchIndex:
+    """Construye el índice la primera vez y lo refresca cuando caduca."""
+    global _rebuild_lock
+    if _rebuild_lock is None:
+        _rebuild_lock = asyncio.Lock()
+    if time.monotonic() - match_index.built_at > INDEX_TTL_SECONDS or not match_index.built_at:
+        async with _rebuild_lock:
+            if time.monotonic() - match_index.built_at > INDEX_TTL_SECONDS or not match_index.built_at:
+                await rebuild_index()
+    return match_index
+
+
+# --- Mantenimiento del índice desde las rutas (solo si ya está construido) ---
+
+def index_report(report_id: str, report_data: Dict[str, Any], pet_data: Dict[str, Any]) -> None:
+    if match_index.built_at:
+        candidate = candidate_from(report_id, report_data, pet_data)
+        if candidate is not None:
+            match_index.add(candidate)
+
+
+def unindex_report(report_id: str) -> None:
+    match_index.remove(report_id)
+
+
+def move_report(report_id: str, location: Dict[str, Any]) -> None:
+    """Actualiza la ubicación de un reporte tras un avistamiento confirmado."""
+    candidate = match_index.candidates.get(report_id)
+    if candidate is None:
+        return
+    latitude, longitude = float(location['latitude']), float(location['longitude'])
+    match_index.add(replace(candidate, latitude=latitude, longitude=longitude,
+                            cell=encode_geohash(latitude, longitude, INDEX_CELL_PRECISION)))
+
+
+def update_pet(pet_id: str, basic_info: Dict[str, Any], specific_info: Dict[str, Any]) -> None:
+    """Aplica al reporte activo de la mascota los datos editados (los que vienen en None no cambian)."""
+    candidate = match_index.candidates.get(match_index.by_pet.get(pet_id, ''))
+    if candidate is None:
+        return
+    changes = {
+        'pet_name': basic_info.get('name'),
+        'species': normalize(specific_info.get('species')),
+        'size': _size_rank(specific_info.get('size')),
+        'colors': _color_set(specific_info.get('colors')) or None,
+        'has_spots': specific_info.get('hasSpots'),
+    }
+    match_index.add(replace(candidate, **{k: v for k, v in changes.items() if v is not None}))
+
+
+def unindex_pet(pet_id: str) -> None:
+    report_id = match_index.by_pet.get(pet_id)
+    if report_id:
+        match_index.remove(report_id)
+
+
+# --- Coincidencias de un avistamiento ---
+
+def _merge_report_matches(existing: List[Dict[str, Any]], match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    kept = [m for m in existing or [] if m.get('sightingId') != match['sightingId']] + [match]
+    kept.sort(key=lambda m: -m.get('score', 0))
+    return kept[:MAX_REPORT_MATCHES]
+
+
+async def match_sighting(sighting_id: str, sighting_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Calcula las mejores coincidencias del avistamiento y las guarda en una sola
+    transacción: la lista en el avistamiento ('matches') y una entrada en cada
+    reporte ('sightingMatches', los MAX_REPORT_MATCHES mejores).
+    """
+    index = await ensure_index()
+    matches = index.top_matches(traits_from(sighting_data))
+    sighting_ref = db.collection('publicSightings').document(sighting_id)
+    report_refs = [db.collection('lostReports').document(m['reportId']) for m in matches]
+    thumbnail = thumbnail_url(sighting_data.get('photos'), sighting_data.get('photoVariants'))
+    # SERVER_TIMESTAMP no se admite dentro de arrays
+    matched_at = datetime.datetime.now(datetime.timezone.utc)
+
+    def store(uow):
+        reports = uow.get(*report_refs) if report_refs else []
+        for match, report_doc in zip(matches, reports):
+            if not report_doc.exists:
+                continue
+            entry = {'sightingId': sighting_id, 'score': match['score'], 'distanceKm': match['distanceKm'],
+                     'thumbnailUrl': thumbnail, 'matchedAt': matched_at}
+            uow.update(report_doc.reference, {
+                'sightingMatches': _merge_report_matches(report_doc.to_dict().get('sightingMatches'), entry),
+            })
+        uow.update(sighting_ref, {'matches': matches})
+
+    await run_transaction(store)
+    return matches
+
+
+async def _match_in_background(sighting_id: str, sighting_data: Dict[str, Any]) -> None:
+    try:
+        await match_sighting(sighting_id, sighting_data)
+    except Exception:
+        logger.exception("Error al buscar coincidencias del avistamiento %s", sighting_id)
+
+
+def schedule(sighting_id: str, sighting_data: Dict[str, Any]) -> None:
+    """Busca las coincidencias en segundo plano, fuera de la petición que crea el avistamiento."""
+    task = asyncio.get_running_loop().create_task(_match_in_background(sighting_id, sighting_data),
+                                                  context=contextvars.Context())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def join() -> None:
+    """Espera a que terminen las búsquedas en segundo plano (benchmarks y pruebas)."""
+    while _background:
+        await asyncio.gather(*list(_background))
@@ -0,0 +1,206 @@
+# RUTA: backend/app/services/metrics_service.py
+#
+# Métricas por petición: lecturas/escrituras de Firestore, bytes de Storage,
+# idas y vueltas al backend y tiempo de cada llamada. firebase_service y
+# upload_service registran cada llamada con `record_call`; el middleware
+# agrega los totales por ruta, los expone en /metrics (formato Prometheus) y
+# los devuelve al cliente en la cabecera Server-Timing.
+
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Límites de los histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+READS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class RequestMetrics:
+    """Contadores de una sola petición (se comparten con los hilos del pool)."""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.storage_bytes = 0
+        self.round_trips: Dict[str, int] = {}
+        self.durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, op: str, seconds: float, reads: int, writes: int, storage_bytes: int) -> None:
+        backend = op.split('.', 1)[0]
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.storage_bytes += storage_bytes
+            self.round_trips[backend] = self.round_trips.get(backend, 0) + 1
+            self.durations[backend] = self.durations.get(backend, 0.0) + seconds
+
+
+_current: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar('request_metrics', default=None)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Agregados de todo el proceso, por ruta y por tipo de llamada al backend."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], _Histogram] = {}
+        self.reads_per_request: Dict[Tuple[str, str], _Histogram] = {}
+        self.route_totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.backend_calls: Dict[str, List[float]] = {}
+
+    def observe_call(self, op: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.backend_calls.setdefault(op, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, metrics: RequestMetrics) -> None:
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, _Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.reads_per_request.setdefault(key, _Histogram(READS_BUCKETS)).observe(metrics.reads)
+            totals = self.route_totals.setdefault(key, {})
+            totals['reads'] = totals.get('reads', 0) + metrics.reads
+            totals['writes'] = totals.get('writes', 0) + metrics.writes
+            totals['storage_bytes'] = totals.get('storage_bytes', 0) + metrics.storage_bytes
+            for backend, trips in metrics.round_trips.items():
+                totals[f"rt:{backend}"] = totals.get(f"rt:{backend}", 0) + trips
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus."""
+        lines: List[str] = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, values):
+            for (method, route), hist in sorted(values.items()):
+                labels = f'method="{method}",route="{route}"'
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f'{name}_sum{{{labels}}} {hist.sum}')
+                lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+        with self._lock:
+            header('lomito_http_requests_total', 'counter', 'Peticiones HTTP por ruta y estado.')
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'lomito_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            header('lomito_http_request_duration_seconds', 'histogram', 'Latencia de las peticiones HTTP.')
+            histogram('lomito_http_request_duration_seconds', self.latency)
+
+            header('lomito_firestore_reads_per_request', 'histogram', 'Documentos de Firestore leídos por petición.')
+            histogram('lomito_firestore_reads_per_request', self.reads_per_request)
+
+            for metric, field, text in (
+                ('lomito_firestore_reads_total', 'reads', 'Documentos de Firestore leídos.'),
+                ('lomito_firestore_writes_total', 'writes', 'Documentos de Firestore escritos.'),
+                ('lomito_storage_bytes_total', 'storage_bytes', 'Bytes subidos a Cloud Storage.'),
+            ):
+                header(metric, 'counter', text)
+                for (method, route), totals in sorted(self.route_totals.items()):
+                    lines.append(f'{metric}{{method="{method}",route="{route}"}} {totals.get(field, 0)}')
+
+            header('lomito_backend_round_trips_total', 'counter', 'Idas y vueltas a Firestore/Storage por ruta.')
+            for (method, route), totals in sorted(self.route_totals.items()):
+                for field, value in sorted(totals.items()):
+                    if field.startswith('rt:'):
+                        lines.append(f'lomito_backend_round_trips_total{{method="{method}",route="{route}",backend="{field[3:]}"}} {value}')
+
+            header('lomito_backend_call_duration_seconds', 'summary', 'Tiempo de las llamadas al backend por operación.')
+            for op, (count, total) in sorted(self.backend_calls.items()):
+                lines.append(f'lomito_backend_call_duration_seconds_sum{{op="{op}"}} {total}')
+                lines.append(f'lomito_backend_call_duration_seconds_count{{op="{op}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def record_call(op: str, seconds: float, reads: int = 0, writes: int = 0, storage_bytes: int = 0) -> None:
+    """
+    Registra una llamada al backend ('firestore.get', 'storage.upload', ...).
+    Fuera de una petición (p. ej. el worker de notificaciones) solo cuenta
+    en los agregados por operación.
+    """
+    registry.observe_call(op, seconds)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add(op, seconds, reads, writes, storage_bytes)
+
+
+def server_timing(metrics: RequestMetrics, total_seconds: float) -> str:
+    """Valor de la cabecera Server-Timing para una petición."""
+    parts = [f"app;dur={total_seconds * 1000:.1f}"]
+    for backend in sorted(metrics.durations):
+        parts.append(f'{backend};dur={metrics.durations[backend] * 1000:.1f};desc="{metrics.round_trips[backend]} rt"')
+    parts.append(f'reads;desc="{metrics.reads}"')
+    parts.append(f'writes;desc="{metrics.writes}"')
+    if metrics.storage_bytes:
+        parts.append(f'storage-bytes;desc="{metrics.storage_bytes}"')
+    return ", ".join(parts)
+
+
+def _route_template(scope) -> str:
+    """Plantilla de la ruta ('/pets/{pet_id}') para no crear una serie por ID."""
+    route = scope.get('route')
+    if route is not None and hasattr(route, 'path'):
+        return route.path
+    return 'unmatched'
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada petición HTTP y añade la cabecera Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                header = server_timing(metrics, time.perf_counter() - start)
+                message['headers'] = list(message.get('headers', [])) + [(b'server-timing', header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            registry.observe_request(scope['method'], _route_template(scope), status,
+                                     time.perf_counter() - start, metrics)
@@ -0,0 +1,162 @@
+# RUTA: backend/app/services/notification_service.py
+
+import asyncio
+import contextvars
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from firebase_admin import messaging
+
+from .firebase_service import db, get_db, get_documents, run_blocking, stream_query
+from .geo_service import covering_cells, within_radius
+
+logger = logging.getLogger(__name__)
+
+# FCM acepta como máximo 500 tokens por envío multicast
+MULTICAST_CHUNK_SIZE = 500
+# Radio de aviso permitido (km); los reportes antiguos con radios mayores se recortan
+MIN_NOTIFICATION_RADIUS_KM = 1
+MAX_NOTIFICATION_RADIUS_KM = 50
+
+
+@dataclass
+class NotificationJob:
+    """
+    Notificación pendiente para los usuarios dentro de `radius_km` de un punto.
+    El radio se recorta a [MIN_NOTIFICATION_RADIUS_KM, MAX_NOTIFICATION_RADIUS_KM].
+    """
+    latitude: float
+    longitude: float
+    radius_km: float
+    title: str
+    body: str
+    data: Dict[str, str] = field(default_factory=dict)
+    exclude_user_ids: List[str] = field(default_factory=list)
+    extra_user_ids: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.radius_km = min(max(float(self.radius_km), MIN_NOTIFICATION_RADIUS_KM), MAX_NOTIFICATION_RADIUS_KM)
+
+
+class FCMSender:
+    """Envía notificaciones push reales con Firebase Cloud Messaging."""
+
+    def send_multicast(self, tokens: List[str], title: str, body: str, data: Dict[str, str]) -> int:
+        get_db()  # asegura que el SDK de firebase_admin está inicializado
+        message = messaging.MulticastMessage(
+            tokens=tokens,
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+        )
+        response = messaging.send_each_for_multicast(message)
+        return response.success_count
+
+
+class StubSender:
+    """Emisor local que solo guarda los envíos en memoria (desarrollo y pruebas)."""
+
+    def __init__(self):
+        self.sent: List[Dict[str, Any]] = []
+
+    def send_multicast(self, tokens: List[str], title: str, body: str, data: Dict[str, str]) -> int:
+        self.sent.append({'tokens': list(tokens), 'title': title, 'body': body, 'data': dict(data)})
+        return len(tokens)
+
+
+async def resolve_recipients(job: NotificationJob) -> List[str]:
+    """
+    Devuelve los tokens FCM de los usuarios cuya última ubicación conocida está
+    dentro del radio, más los de `extra_user_ids`, sin duplicados.
+    Solo se consultan las celdas geohash que cubren el radio.
+    """
+    cell_queries = [
+        db.collection('users')
+            .where('geohash', '>=', cell)
+            .where('geohash', '<=', cell + '~')
+        for cell in covering_cells(job.latitude, job.longitude, job.radius_km)
+    ]
+    candidates = {}
+    for cell_docs in await asyncio.gather(*(stream_query(q) for q in cell_queries)):
+        for doc in cell_docs:
+            user_data = doc.to_dict()
+            if (user_data.get('lastKnownLocation') or {}).get('latitude') is not None:
+                candidates[doc.id] = user_data
+
+    located = list(candidates.items())
+    indices, _ = within_radius(
+        job.latitude, job.longitude,
+        [data['lastKnownLocation']['latitude'] for _, data in located],
+        [data['lastKnownLocation']['longitude'] for _, data in located],
+        job.radius_km
+    )
+    users = dict(located[i] for i in indices.tolist())
+
+    extra_ids = [uid for uid in job.extra_user_ids if uid and uid not in users]
+    if extra_ids:
+        refs = [db.collection('users').document(uid) for uid in extra_ids]
+        for doc in await get_documents(refs):
+            if doc.exists:
+                users[doc.id] = doc.to_dict()
+
+    tokens = []
+    for uid, user_data in users.items():
+        if uid in job.exclude_user_ids:
+            continue
+        if not user_data.get('preferences', {}).get('enablePushNotifications', True):
+            continue
+        token = user_data.get('fcmToken')
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+class NotificationDispatcher:
+    """
+    Cola en memoria con un worker en segundo plano: los endpoints encolan y
+    responden de inmediato; el worker resuelve destinatarios y envía por lotes.
+    """
+
+    def __init__(self, sender=None):
+        self.sender = sender or (StubSender() if os.getenv('NOTIFICATIONS_SENDER') == 'stub' else FCMSender())
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            # Contexto vacío: el worker no debe heredar las métricas de la petición que lo arrancó
+            self._worker = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    def enqueue(self, job: NotificationJob) -> None:
+        """Encola un envío; el worker se inicia la primera vez que se usa."""
+        self._ensure_worker()
+        self._queue.put_nowait(job)
+
+    async def deliver(self, job: NotificationJob) -> int:
+        """Resuelve los destinatarios y envía en lotes de MULTICAST_CHUNK_SIZE. Devuelve los envíos exitosos."""
+        tokens = await resolve_recipients(job)
+        delivered = 0
+        for start in range(0, len(tokens), MULTICAST_CHUNK_SIZE):
+            chunk = tokens[start:start + MULTICAST_CHUNK_SIZE]
+            delivered += await run_blocking(self.sender.send_multicast, chunk, job.title, job.body, job.data)
+        return delivered
+
+    async def join(self) -> None:
+        """Espera a que se procesen todos los envíos encolados."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.deliver(job)
+            except Exception:
+                logger.exception("Error al enviar notificaciones")
+            finally:
+                self._queue.task_done()
+
+
+dispatcher = NotificationDispatcher()
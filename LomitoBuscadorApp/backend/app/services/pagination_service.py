@@ -0,0 +1,93 @@
+# RUTA: backend/app/services/pagination_service.py
+
+import base64
+import datetime
+import json
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from .firebase_service import stream_query
+
+# Tamaño máximo de página aceptado por cualquier listado
+MAX_PAGE_SIZE = 50
+
+
+def encode_cursor(value: Any, doc_id: str) -> str:
+    """Cursor opaco con el valor del campo de orden y el ID del último documento."""
+    if isinstance(value, datetime.datetime):
+        payload = {'t': value.isoformat(), 'id': doc_id}
+    else:
+        payload = {'v': value, 'id': doc_id}
+    raw = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Any, str]]:
+    """Decodifica un cursor de `encode_cursor`. Lanza ValueError si no es válido."""
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if 't' in data:
+            return datetime.datetime.fromisoformat(data['t']), str(data['id'])
+        return data['v'], str(data['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido")
+
+
+async def fetch_page(query, order_field: str, limit: int, after: Optional[Tuple[Any, str]] = None,
+                     direction: str = firestore.Query.DESCENDING) -> Tuple[List[Any], Optional[str]]:
+    """
+    Lee una página de `query` ordenada por `order_field` (y por ID para desempatar)
+    usando start_after en lugar de offset, de modo que solo se leen los documentos
+    de la página. Devuelve (snapshots, siguiente_cursor).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page_query = query.order_by(order_field, direction=direction).order_by('__name__', direction=direction)
+    if after is not None:
+        value, doc_id = after
+        page_query = page_query.start_after({order_field: value, '__name__': doc_id})
+
+    docs = await stream_query(page_query.limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(order_field), last.id)
+    return docs, next_cursor
+
+
+async def iter_by_name(query, page_size: int = 500) -> AsyncIterator[Any]:
+    """
+    Recorre todos los documentos de `query` en orden de ID, página a página.
+    A diferencia de `iter_query` no se salta los documentos a los que les
+    falta algún campo (Firestore excluye de un order_by los que no lo tienen).
+    """
+    page_query = query.order_by('__name__').limit(page_size)
+    last = None
+    while True:
+        docs = await stream_query(page_query if last is None else page_query.start_after(last))
+        for doc in docs:
+            yield doc
+        if len(docs) < page_size:
+            return
+        last = docs[-1]
+
+
+async def iter_query(query, order_field: str, page_size: int = 200,
+                     direction: str = firestore.Query.DESCENDING) -> AsyncIterator[Any]:
+    """
+    Recorre todos los resultados de `query` página a página (con start_after),
+    para exportaciones y procesos largos: en memoria solo hay una página.
+    """
+    page_query = query.order_by(order_field, direction=direction).order_by('__name__', direction=direction)
+    after = None
+    while True:
+        current = page_query if after is None else page_query.start_after(after)
+        docs = await stream_query(current.limit(page_size))
+        for doc in docs:
+            yield doc
+        if len(docs) < page_size:
+            return
+        after = {order_field: docs[-1].get(order_field), '__name__': docs[-1].id}
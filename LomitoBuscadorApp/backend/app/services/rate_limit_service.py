@@ -0,0 +1,220 @@
+# RUTA: backend/app/services/rate_limit_service.py
+#
+# Límite de peticiones (token bucket) por cliente y límite de tamaño del
+# cuerpo para los endpoints que aceptan fotos o texto de los usuarios o que
+# generan archivos (los carteles).
+# Se aplica como middleware ASGI para rechazar la petición antes de leer el
+# cuerpo: con dependencias de FastAPI el multipart ya estaría leído.
+#
+# Cada petición se cobra al usuario de su ID token (verificado) o, si no trae
+# uno válido, a la IP del cliente. Detrás de un proxy (ngrok, Cloud Run,
+# nginx) la IP del socket es la del proxy y todos los clientes compartirían
+# el mismo bucket: RATE_LIMIT_PROXY_HOPS indica cuántos proxies de confianza
+# añaden su entrada a X-Forwarded-For. Por defecto 1 (el túnel de ngrok o el
+# balanceador de Cloud Run); con 0 se usa la IP del socket, que es lo correcto
+# solo si uvicorn recibe las conexiones directamente (si no, el cliente podría
+# falsear la cabecera).
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Pattern, Tuple
+
+from . import auth_service
+from .bulk_service import MAX_IMPORT_ROWS
+from .upload_service import MAX_REQUEST_BYTES
+
+# Margen para los campos de texto y las cabeceras del multipart
+FORM_OVERHEAD_BYTES = 64 * 1024
+# RATE_LIMIT_ENABLED=0 desactiva los buckets (p. ej. en benchmarks); el límite de tamaño se mantiene
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+PROXY_HOPS = int(os.getenv('RATE_LIMIT_PROXY_HOPS', '1'))
+
+
+class MemoryRateLimitStore:
+    """
+    Token buckets en memoria del proceso (LRU acotado). Para compartir los
+    límites entre instancias basta con otro objeto con el mismo método `take`
+    (p. ej. sobre Redis) pasado a `configure_store`.
+    """
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        """Consume `cost` tokens. Devuelve 0 si se permitió o los segundos a esperar si no."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+_store = MemoryRateLimitStore()
+
+
+def configure_store(store) -> None:
+    """Sustituye el almacén de buckets (cualquier objeto con `take`)."""
+    global _store
+    _store = store
+
+
+@dataclass
+class GuardRule:
+    """Límites de un endpoint: `rate` peticiones cada `per_seconds` y tamaño máximo del cuerpo."""
+    name: str
+    method: str
+    path: Pattern
+    rate: int
+    per_seconds: float
+    max_body_bytes: Optional[int] = None
+
+
+def _rule(name, method, path, rate, per_seconds, max_body_bytes=None) -> GuardRule:
+    return GuardRule(name, method, re.compile(path), rate, per_seconds, max_body_bytes)
+
+
+UPLOAD_BODY_LIMIT = MAX_REQUEST_BYTES + FORM_OVERHEAD_BYTES
+BULK_BODY_LIMIT = MAX_IMPORT_ROWS * 4 * 1024
+
+RULES: List[GuardRule] = [
+    _rule('public-sighting', 'POST', r'^/sightings/public-sightings/create$', 10, 3600, UPLOAD_BODY_LIMIT),
+    _rule('report-sighting', 'POST', r'^/reports/[^/]+/sighting$', 20, 3600, UPLOAD_BODY_LIMIT),
+    _rule('pet-register', 'POST', r'^/pets/register$', 20, 3600, UPLOAD_BODY_LIMIT),
+    _rule('pet-bulk-import', 'POST', r'^/pets/bulk-import$', 10, 3600, BULK_BODY_LIMIT),
+    _rule('comment', 'POST', r'^/sightings/public-sightings/[^/]+/comment$', 10, 60, FORM_OVERHEAD_BYTES),
+    # Cada petición puede dibujar y subir un cartel (ver flyer_service)
+    _rule('flyer', 'GET', r'^/reports/[^/]+/flyer$', 30, 3600),
+]
+
+
+def client_ip(scope, proxy_hops: Optional[int] = None) -> str:
+    """
+    IP del cliente. Cada proxy de confianza añade al final de X-Forwarded-For
+    la IP de quien le habló, así que con N proxies la entrada N desde la
+    derecha la escribió el primero de ellos; las anteriores las controla el cliente.
+    """
+    hops = PROXY_HOPS if proxy_hops is None else proxy_hops
+    if hops > 0:
+        forwarded = [value.decode('latin-1') for name, value in scope.get('headers', []) if name == b'x-forwarded-for']
+        entries = [entry.strip() for entry in ','.join(forwarded).split(',') if entry.strip()]
+        if len(entries) >= hops:
+            return entries[-hops]
+    client = scope.get('client')
+    return client[0] if client else 'unknown'
+
+
+async def client_key(scope) -> str:
+    """
+    Clave a la que se cobra la petición: el usuario si trae un ID token válido
+    (la verificación queda en caché para la ruta) o, si no, la IP. Nunca se
+    usan IDs que envía el cliente sin verificar.
+    """
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            scheme, _, token = value.decode('latin-1').partition(' ')
+            if scheme.lower() == 'bearer' and token.strip():
+                try:
+                    claims = await auth_service.verify_token(token.strip())
+                    return f"user:{claims['uid']}"
+                except auth_service.InvalidToken:
+                    pass
+            break
+    return f"ip:{client_ip(scope)}"
+
+
+def _match(scope) -> Optional[GuardRule]:
+    for rule in RULES:
+        if scope['method'] == rule.method and rule.path.match(scope['path']):
+            return rule
+    return None
+
+
+async def _reject(send, status: int, detail: str, headers=()) -> None:
+    body = json.dumps({'detail': detail}, ensure_ascii=False).encode()
+    await send({
+        'type': 'http.response.start', 'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class RequestGuardMiddleware:
+    """Aplica RULES: 429 si el cliente agotó su bucket y 413 si el cuerpo supera el límite."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        rule = _match(scope) if scope['type'] == 'http' else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = 0
+        if RATE_LIMIT_ENABLED:
+            key = await client_key(scope)
+            wait = _store.take(f"{rule.name}:{key}", rule.rate, rule.rate / rule.per_seconds)
+        if wait > 0:
+            await _reject(send, 429, "Demasiadas peticiones. Intenta de nuevo más tarde.",
+                          [(b'retry-after', str(int(wait) + 1).encode())])
+            return
+
+        limit = rule.max_body_bytes
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope.get('headers', []):
+            if name == b'content-length' and value.isdigit() and int(value) > limit:
+                await _reject(send, 413, "La petición supera el tamaño máximo permitido.")
+                return
+
+        # Sin Content-Length (chunked) se cuenta lo recibido y se corta al pasar el límite.
+        # FastAPI convierte los errores al leer el cuerpo en un 400, así que el 413
+        # se envía desde aquí y se descarta la respuesta que genere la aplicación.
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    if not response_started and not rejected:
+                        rejected = True
+                        await _reject(send, 413, "La petición supera el tamaño máximo permitido.")
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
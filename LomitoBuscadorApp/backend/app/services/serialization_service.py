@@ -0,0 +1,96 @@
+# RUTA: backend/app/services/serialization_service.py
+#
+# Serialización JSON de las respuestas. Las fechas de Firestore se convierten
+# aquí, en un solo paso, en lugar de recorrer cada lista en las rutas. Si
+# 'orjson' está instalado se usa (mucho más rápido en listas grandes); si no,
+# se recurre al módulo json estándar con el mismo resultado.
+
+import datetime
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # orjson solo serializa datetime exactos; los de Firestore son una subclase
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    # GeoPoint, referencias de documentos y demás tipos del SDK
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serializa a JSON (UTF-8) convirtiendo fechas a ISO 8601."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con `dumps`: sin pasar por jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Lee el parámetro `?fields=` ('reportId,petInfo.basicInfo.name,...').
+    Devuelve None si no se pidió proyección. Lanza 400 si está mal formado.
+    """
+    if not fields:
+        return None
+    paths = [path.strip() for path in fields.split(',') if path.strip()]
+    if not paths or any(not part for path in paths for part in path.split('.')):
+        raise HTTPException(status_code=400, detail="Parámetro 'fields' inválido.")
+    return paths
+
+
+def _tree(paths: Iterable[str]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        parts = path.split('.')
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[parts[-1]] = True
+    return tree
+
+
+def _pick(data: Any, tree: Dict[str, Any]) -> Any:
+    if not isinstance(data, dict):
+        return data
+    picked = {}
+    for key, subtree in tree.items():
+        if key in data:
+            picked[key] = data[key] if subtree is True else _pick(data[key], subtree)
+    return picked
+
+
+def project(items: List[Dict[str, Any]], fields: Optional[List[str]], always: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Deja en cada elemento solo los campos pedidos (con rutas con puntos para
+    campos anidados). Los de `always` (el ID) se incluyen siempre.
+    """
+    if fields is None:
+        return items
+    tree = _tree([*always, *fields])
+    return [_pick(item, tree) for item in items]
@@ -0,0 +1,72 @@
+# RUTA: backend/app/services/unit_of_work.py
+
+import time
+from typing import Any, Callable, Dict, List
+
+from firebase_admin import firestore
+
+from . import metrics_service
+from .firebase_service import db, run_blocking
+
+# Intentos antes de rendirse si otra petición modifica los mismos documentos
+MAX_ATTEMPTS = 5
+
+
+class UnitOfWork:
+    """
+    Lecturas y escrituras de una operación que se confirman juntas.
+    Dentro de una transacción las lecturas van primero; las escrituras se
+    acumulan y se envían en un solo commit al terminar.
+    """
+
+    def __init__(self, transaction):
+        self.transaction = transaction
+        self.reads = 0
+        self.writes = 0
+
+    def get(self, *refs) -> List[Any]:
+        """Lee varios documentos en una sola llamada, en el orden recibido."""
+        self.reads += len(refs)
+        snapshots = {doc.reference.path: doc for doc in db.get_all(list(refs), transaction=self.transaction)}
+        return [snapshots[ref.path] for ref in refs]
+
+    def set(self, ref, data: Dict[str, Any], merge: bool = False) -> None:
+        self.writes += 1
+        self.transaction.set(ref, data, merge=merge)
+
+    def update(self, ref, data: Dict[str, Any]) -> None:
+        self.writes += 1
+        self.transaction.update(ref, data)
+
+    def delete(self, ref) -> None:
+        self.writes += 1
+        self.transaction.delete(ref)
+
+
+def _run(work: Callable[[UnitOfWork], Any], max_attempts: int):
+    attempts = {'reads': 0, 'writes': 0}
+
+    @firestore.transactional
+    def in_transaction(transaction):
+        uow = UnitOfWork(transaction)
+        result = work(uow)
+        attempts['reads'] += uow.reads
+        attempts['writes'] = uow.writes
+        return result
+
+    start = time.perf_counter()
+    try:
+        return in_transaction(db.transaction(max_attempts=max_attempts))
+    finally:
+        metrics_service.record_call('firestore.transaction', time.perf_counter() - start,
+                                    reads=attempts['reads'], writes=attempts['writes'])
+
+
+async def run_transaction(work: Callable[[UnitOfWork], Any], max_attempts: int = MAX_ATTEMPTS):
+    """
+    Ejecuta `work(uow)` en una transacción de Firestore y devuelve su resultado.
+    `work` es síncrona y puede ejecutarse varias veces si hay contención, así
+    que no debe tener efectos fuera de `uow` (cachés, notificaciones, etc.);
+    eso se hace después, con el resultado.
+    """
+    return await run_blocking(_run, work, max_attempts)
@@ -0,0 +1,163 @@
+# RUTA: backend/app/services/upload_service.py
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlsplit
+
+from fastapi import HTTPException, UploadFile
+
+from . import metrics_service
+from .firebase_service import bucket, run_blocking
+from .image_service import DERIVATIVE_CONTENT_TYPE, DERIVATIVE_SIZES, InvalidImage, ProcessedImage, process_image
+
+# Límites por foto y por petición (en bytes)
+MAX_PHOTO_BYTES = int(os.getenv('MAX_PHOTO_BYTES', str(10 * 1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.getenv('MAX_UPLOAD_REQUEST_BYTES', str(40 * 1024 * 1024)))
+MAX_PHOTOS_PER_REQUEST = int(os.getenv('MAX_PHOTOS_PER_REQUEST', '6'))
+
+# Cada foto se decodifica y se vuelve a codificar (sin metadatos, más sus
+# derivados) antes de subirla, así que lo que se sube ya está en memoria y
+# acotado por MAX_PHOTO_BYTES y DERIVATIVE_SIZES: se envía en una sola
+# petición por objeto, sin subida reanudable por trozos.
+# Procesado (CPU) y subidas (red) tienen límites separados por proceso: mientras
+# unas fotos se suben, otras pueden procesarse.
+_process_slots = asyncio.Semaphore(int(os.getenv('IMAGE_PROCESS_CONCURRENCY', str(min(4, os.cpu_count() or 1)))))
+_upload_slots = asyncio.Semaphore(int(os.getenv('UPLOAD_CONCURRENCY', '8')))
+
+
+def _file_size(photo: UploadFile) -> int:
+    """Tamaño del archivo ya recibido por Starlette, sin leerlo en memoria."""
+    photo.file.seek(0, os.SEEK_END)
+    size = photo.file.tell()
+    photo.file.seek(0)
+    return size
+
+
+def check_upload_limits(photos: List[UploadFile]) -> None:
+    """Lanza 413 si hay demasiadas fotos o alguna foto o el total de la petición supera los límites."""
+    if len(photos) > MAX_PHOTOS_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"Se permiten como máximo {MAX_PHOTOS_PER_REQUEST} fotos por petición.")
+    total = 0
+    for photo in photos:
+        size = _file_size(photo)
+        if size > MAX_PHOTO_BYTES:
+            raise HTTPException(status_code=413, detail=f"La foto '{photo.filename}' supera el tamaño máximo permitido.")
+        total += size
+    if total > MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail="El total de las fotos supera el tamaño máximo permitido.")
+
+
+def _upload_public(data: bytes, blob_name: str, content_type: str) -> str:
+    """Sube un objeto con ACL pública incluida en la misma subida."""
+    start = time.perf_counter()
+    blob = bucket.blob(blob_name)
+    blob.upload_from_string(data, content_type=content_type, predefined_acl='publicRead')
+    metrics_service.record_call('storage.upload', time.perf_counter() - start, storage_bytes=len(data))
+    return blob.public_url
+
+
+async def _process_one(photo: UploadFile) -> ProcessedImage:
+    async with _process_slots:
+        try:
+            return await run_blocking(process_image, photo.file)
+        except InvalidImage as e:
+            raise HTTPException(status_code=400, detail=f"La foto '{photo.filename}' no se pudo procesar: {e}")
+
+
+async def _upload_object(data: bytes, blob_name: str, content_type: str) -> str:
+    async with _upload_slots:
+        return await run_blocking(_upload_public, data, blob_name, content_type)
+
+
+async def _upload_one(image: ProcessedImage, prefix: str) -> Dict[str, str]:
+    """Sube el original (ya sin metadatos) y sus derivados (thumb, card, full) junto a él, en paralelo."""
+    base_name = f"{prefix}/{uuid.uuid4()}"
+    names = ['original', *DERIVATIVE_SIZES]
+    urls = await asyncio.gather(
+        _upload_object(image.original, f"{base_name}.{image.extension}", image.content_type),
+        *(_upload_object(image.derivatives[size_name], f"{base_name}_{size_name}.webp", DERIVATIVE_CONTENT_TYPE)
+          for size_name in DERIVATIVE_SIZES)
+    )
+    return dict(zip(names, urls))
+
+
+async def upload_photos(photos: List[UploadFile], prefix: str) -> List[Dict[str, str]]:
+    """
+    Procesa y sube varias fotos en paralelo bajo `prefix` y devuelve, en el
+    mismo orden en que se recibieron, un dict por foto con las URLs públicas
+    de 'original', 'thumb', 'card' y 'full'. Todas se validan antes de subir
+    ninguna: si alguna no es una imagen válida se lanza 400 y no se sube nada.
+    """
+    check_upload_limits(photos)
+    images = await asyncio.gather(*(_process_one(photo) for photo in photos))
+    return list(await asyncio.gather(*(_upload_one(image, prefix) for image in images)))
+
+
+def variant_urls(variants: List[Dict[str, str]], size: str = 'full') -> List[str]:
+    """Extrae la URL de un tamaño concreto de cada foto subida."""
+    return [v[size] for v in variants]
+
+
+PUBLIC_STORAGE_HOST = 'storage.googleapis.com'
+
+
+def blob_name_from_url(url: str) -> Optional[str]:
+    """
+    Nombre del objeto en el bucket a partir de su URL pública
+    ('https://storage.googleapis.com/<bucket>/<nombre>'); None si es de otro sitio.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url)
+    bucket_path = f"/{bucket.name}/"
+    if parts.scheme != 'https' or parts.netloc != PUBLIC_STORAGE_HOST or not parts.path.startswith(bucket_path):
+        return None
+    return unquote(parts.path[len(bucket_path):]) or None
+
+
+def is_safe_blob_name(name: Optional[str], prefix: str) -> bool:
+    """True si `name` es un objeto concreto dentro de la carpeta `prefix` (sin '.', '..' ni segmentos vacíos)."""
+    if not name or not prefix or not name.startswith(prefix) or len(name) == len(prefix):
+        return False
+    return all(segment not in ('', '.', '..') for segment in name.split('/'))
+
+
+def photo_url_error(url: str, prefix: str) -> Optional[str]:
+    """
+    Motivo por el que no se acepta una URL de foto enviada por el cliente, o
+    None si es válida: debe ser http(s) y, si apunta a nuestro bucket, a un
+    objeto dentro de `prefix` (la carpeta de la mascota).
+    """
+    parts = urlsplit(url if isinstance(url, str) else '')
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return f"URL de foto no válida: {url!r}"
+    if parts.netloc == PUBLIC_STORAGE_HOST and not is_safe_blob_name(blob_name_from_url(url), prefix):
+        return f"La foto {url!r} no pertenece a esta mascota."
+    return None
+
+
+def stored_photo_urls(basic_info: Dict[str, Any]) -> List[str]:
+    """Todas las URLs de fotos guardadas en 'basicInfo' (las de 'photos' y las de sus derivados)."""
+    urls = [url for url in basic_info.get('photos') or [] if isinstance(url, str)]
+    for variants in basic_info.get('photoVariants') or []:
+        urls.extend(url for url in (variants or {}).values() if isinstance(url, str))
+    return list(dict.fromkeys(urls))
+
+
+def check_photo_urls(urls: List[str], prefix: str, stored: Iterable[str] = ()) -> List[str]:
+    """
+    Lanza 400 si alguna URL no pasa `photo_url_error`; devuelve la lista tal
+    cual. Las URLs de `stored` (las que ya tiene el documento, p. ej. fotos de
+    antes de la carpeta por mascota) se aceptan sin más.
+    """
+    stored = set(stored)
+    for url in urls:
+        if url in stored:
+            continue
+        error = photo_url_error(url, prefix)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+    return urls
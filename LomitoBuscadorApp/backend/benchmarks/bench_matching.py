@@ -0,0 +1,80 @@
+# RUTA: backend/benchmarks/bench_matching.py
+#
+# Benchmark del índice de coincidencias (matching_service) sin Firestore:
+# mide cuánto tarda en construirse con N reportes activos y la latencia
+# p50/p99 de buscar las mejores coincidencias de un avistamiento.
+#
+#   cd LomitoBuscadorApp/backend
+#   python -m benchmarks.bench_matching --reports 10000 50000 --queries 2000
+
+import argparse
+import random
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from app.services.matching_service import MATCH_RADIUS_KM, MatchIndex, SightingTraits, candidate_from, traits_from
+
+CENTER = (19.4326, -99.1332)
+SPREAD_DEG = 0.5
+SPECIES = ('Perro', 'Gato')
+SIZES = ('Mini', 'Chico', 'Mediano', 'Grande')
+COLORS = ('Negro', 'Blanco', 'Café', 'Gris', 'Dorado', 'Atigrado')
+
+
+def _location(rng: random.Random):
+    return {'latitude': CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            'longitude': CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)}
+
+
+def synthetic_candidates(count: int, rng: random.Random) -> List:
+    candidates = []
+    for i in range(count):
+        pet = {'basicInfo': {'name': f"Mascota {i}", 'photos': []},
+               'specificInfo': {'species': rng.choice(SPECIES), 'size': rng.choice(SIZES),
+                                'colors': rng.sample(COLORS, rng.randint(1, 3)), 'hasSpots': rng.random() < 0.3}}
+        report = {'petId': f"pet{i}", 'lastKnownLocation': _location(rng)}
+        candidates.append(candidate_from(f"report{i}", report, pet))
+    return candidates
+
+
+def synthetic_sightings(count: int, rng: random.Random) -> List[SightingTraits]:
+    return [traits_from({
+        'location': _location(rng),
+        'petDescription': {'species': rng.choice(SPECIES), 'approximateSize': rng.choice(SIZES),
+                           'colors': rng.sample(COLORS, rng.randint(1, 2))},
+    }) for _ in range(count)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reports', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(5)
+    sightings = synthetic_sightings(args.queries, rng)
+    print(f"{'reportes':>9} {'build ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'candidatos':>11} {'matches':>8}")
+    for count in args.reports:
+        candidates = synthetic_candidates(count, rng)
+        index = MatchIndex()
+        start = time.perf_counter()
+        index.replace_all(candidates)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        latencies, scanned, found = [], [], []
+        for traits in sightings:
+            start = time.perf_counter()
+            matches = index.top_matches(traits)
+            latencies.append((time.perf_counter() - start) * 1000)
+            scanned.append(len(index.nearby(traits.latitude, traits.longitude, MATCH_RADIUS_KM, traits.species)[0]))
+            found.append(len(matches))
+        print(f"{count:>9} {build_ms:>9.1f} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} "
+              f"{np.mean(scanned):>11.0f} {np.mean(found):>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# RUTA: backend/benchmarks/bench_routes.py
+#
+# Benchmark de los endpoints contra el backend en memoria (fake_firebase).
+# Siembra mascotas, reportes, avistamientos y usuarios sintéticos y mide, por
+# endpoint, la latencia p50/p99 y las idas y vueltas a Firestore/Storage por
+# petición. No necesita credenciales ni red:
+#
+#   cd LomitoBuscadorApp/backend
+#   python -m benchmarks.bench_routes --pets 2000 --latency-ms 5 --requests 50
+#
+# Con --cold se vacían las cachés de respuesta antes de cada petición.
+
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+os.environ.setdefault('NOTIFICATIONS_SENDER', 'stub')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+# Usuario administrador del benchmark (exporta todos los reportes)
+BENCH_ADMIN = 'bench-admin'
+os.environ.setdefault('ADMIN_UIDS', BENCH_ADMIN)
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from app.app import app
+from app.routes import maps
+from app.services import firebase_service, matching_service
+from app.services.cache_service import detail_cache
+from app.services.deletion_service import deletion_queue
+from app.services.fake_firebase import FAKE_TOKEN_PREFIX, FakeBucket, FakeFirestore
+from app.services.feed_service import board_cache, rebuild_board
+from app.services.geo_service import location_geohash
+from app.services.notification_service import dispatcher
+
+# Centro de la siembra (CDMX) y dispersión en grados
+CENTER = (19.4326, -99.1332)
+SPREAD_DEG = 0.5
+SPECIES = ('Perro', 'Gato')
+
+
+def _random_location(rng: random.Random) -> Dict[str, Any]:
+    return {
+        'latitude': CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+        'longitude': CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+        'address': 'Dirección sintética',
+    }
+
+
+def _photo_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 900), (180, 120, 60)).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def seed(db: FakeFirestore, pets: int, reports: int, sightings: int, users: int, seed_value: int = 7) -> Dict[str, Any]:
+    """Escribe los datos sintéticos directamente en el fake (sin latencia) y devuelve los IDs."""
+    rng = random.Random(seed_value)
+    ids: Dict[str, Any] = {'pets': [], 'reports': [], 'sightings': [], 'users': [], 'owners': [], 'pet_owner': {}}
+
+    for i in range(users):
+        uid = f"user{i:05d}"
+        location = _random_location(rng)
+        db.collection('users').document(uid).set({
+            'displayName': f"Usuario {i}", 'photoURL': None, 'fcmToken': f"token-{uid}",
+            'lastKnownLocation': location, 'geohash': location_geohash(location),
+            'preferences': {'enablePushNotifications': True},
+        })
+        ids['users'].append(uid)
+
+    owners = ids['users'][:max(1, users // 10)]
+    ids['owners'] = owners
+    for i in range(pets):
+        pet_id = f"pet{i:05d}"
+        photo = f"https://storage.googleapis.com/fake/pets/{pet_id}.jpg"
+        owner_id = rng.choice(owners)
+        db.collection('pets').document(pet_id).set({
+            'ownerId': owner_id,
+            'basicInfo': {'name': f"Mascota {i}", 'photos': [photo],
+                          'photoVariants': [{'original': photo, 'thumb': photo, 'card': photo, 'full': photo}]},
+            'specificInfo': {'species': rng.choice(SPECIES), 'breed': 'Mestizo', 'size': 'Mediano', 'age': rng.randint(1, 15),
+                             'sex': rng.choice(('Macho', 'Hembra')), 'colors': ['Café'], 'hasSpots': False},
+            'ownerInfo': {'ownerName': 'Dueño', 'ownerPhone': '5550000000', 'ownerEmail': 'owner@example.com'},
+            'status': 'safe', 'createdAt': _timestamp(i),
+        })
+        ids['pets'].append(pet_id)
+        ids['pet_owner'][pet_id] = owner_id
+
+    for i, pet_id in enumerate(ids['pets'][:reports]):
+        report_id = f"report{i:05d}"
+        location = _random_location(rng)
+        db.collection('lostReports').document(report_id).set({
+            'petId': pet_id, 'ownerId': ids['pet_owner'][pet_id], 'lastSeenLocation': location, 'lastKnownLocation': location,
+            'geohash': location_geohash(location), 'notificationRadius': 24, 'notes': '',
+            'reportedAt': _timestamp(i), 'lastSightingAt': None, 'sightingsCount': 0,
+            'status': 'active', 'helpersCount': 0, 'viewsCount': 0,
+        })
+        db.collection('pets').document(pet_id).update({'status': 'lost', 'reportId': report_id})
+        for j in range(3):
+            point = _random_location(rng)
+            # Misma forma que los puntos de POST /reports/{id}/sighting
+            db.collection('lostReports').document(report_id).collection('searchRoute').document().set({
+                'reportedBy': rng.choice(ids['users']), 'location': point, 'geohash': location_geohash(point),
+                'notes': 'Punto sintético', 'photos': [], 'photoVariants': [], 'timestamp': _timestamp(i * 3 + j),
+            })
+        ids['reports'].append(report_id)
+    # Mascotas sin reporte: cada POST /reports/create usa una distinta
+    ids['free_pets'] = ids['pets'][reports:]
+    ids['open_reports'] = list(ids['reports'])
+
+    for i in range(sightings):
+        sighting_id = f"sighting{i:05d}"
+        location = _random_location(rng)
+        db.collection('publicSightings').document(sighting_id).set({
+            'reportedBy': rng.choice(ids['users']), 'location': location, 'geohash': location_geohash(location),
+            'description': 'Avistamiento sintético', 'photos': [], 'photoVariants': [],
+            # GET /sightings/public-sightings ordena por 'timestamp' (como al crearlos)
+            'comments': [], 'status': 'active', 'timestamp': _timestamp(i),
+        })
+        ids['sightings'].append(sighting_id)
+    return ids
+
+
+def _timestamp(offset: int) -> datetime.datetime:
+    """Fechas distintas y crecientes para que el orden por fecha sea estable."""
+    return datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(minutes=offset)
+
+
+Scenario = Tuple[str, Callable[[random.Random], Dict[str, Any]]]
+
+
+def _auth(uid: str) -> Dict[str, str]:
+    """Cabecera de sesión con un token que acepta el verificador de fake_firebase."""
+    return {'Authorization': f"Bearer {FAKE_TOKEN_PREFIX}{uid}"}
+
+
+def build_scenarios(ids: Dict[str, Any], photo: bytes) -> List[Scenario]:
+    """Cada escenario devuelve los argumentos de httpx.request para una petición."""
+    lat, lon = CENTER
+
+    def files(count=1):
+        return [('photos', (f"foto{n}.jpg", photo, 'image/jpeg')) for n in range(count)]
+
+    bulk_rows = "\n".join(json.dumps({
+        'name': f"Refugio {n}", 'species': 'Perro', 'breed': 'Mestizo', 'size': 'Chico', 'age': 2, 'sex': 'Macho',
+        'colors': ['Negro'], 'isVaccinated': True, 'hasIllness': False, 'temperament': 'Juguetón',
+        'ownerName': 'Refugio', 'ownerPhone': '5550000000', 'ownerEmail': 'refugio@example.com'}) for n in range(100))
+
+    def update_pet(r):
+        pet_id = r.choice(ids['pets'])
+        # Mismos campos planos que envía EditPetProfileScreen (la foto es la que ya tenía)
+        return dict(method='PUT', url=f"/pets/{pet_id}", headers=_auth(ids['pet_owner'][pet_id]), json={
+            'name': 'Renombrada', 'photos': [f"https://storage.googleapis.com/fake/pets/{pet_id}.jpg"],
+            'species': 'Perro', 'breed': 'Mestizo', 'size': 'Mediano', 'age': '3', 'sex': 'Macho',
+            'isVaccinated': True, 'hasIllness': False, 'illnessDetails': '', 'temperament': 'Tranquilo',
+            'specialFeatures': '', 'ownerName': 'Dueño', 'ownerPhone': '5550000000',
+            'ownerEmail': 'owner@example.com', 'altOwnerName': '', 'altOwnerPhone': '', 'address': ''})
+
+    def create_report(r):
+        pet_id = ids['free_pets'].pop()
+        owner_id = ids['pet_owner'][pet_id]
+        return dict(method='POST', url='/reports/create', headers=_auth(owner_id), json={
+            'petId': pet_id, 'ownerId': owner_id, 'lastSeenLocation': _random_location(r), 'notificationRadius': 10})
+
+    def mark_found(r):
+        report_id = ids['open_reports'].pop()
+        pet_id = ids['pets'][int(report_id[len('report'):])]
+        return dict(method='POST', url=f"/reports/{report_id}/found", headers=_auth(ids['pet_owner'][pet_id]))
+
+    def delete_pet(r):
+        pet_id = ids['free_pets'].pop()
+        return dict(method='DELETE', url=f"/pets/{pet_id}", headers=_auth(ids['pet_owner'][pet_id]))
+
+    return [
+        ('GET /pets/{id}', lambda r: dict(method='GET', url=f"/pets/{r.choice(ids['pets'])}")),
+        ('GET /pets/my-pets/{owner}', lambda r: (lambda owner: dict(
+            method='GET', url=f"/pets/my-pets/{owner}?limit=20", headers=_auth(owner)))(r.choice(ids['owners']))),
+        ('PUT /pets/{id}', update_pet),
+        ('POST /pets/register', lambda r: dict(method='POST', url='/pets/register', files=files(),
+                                               headers=_auth(r.choice(ids['users'])), data={
+            'name': 'Nueva', 'species': 'Perro', 'breed': 'Mestizo', 'size': 'Chico', 'age': '2', 'sex': 'Macho',
+            'colors': 'Negro', 'isVaccinated': 'true', 'hasIllness': 'false', 'temperament': 'Juguetón',
+            'ownerName': 'Dueño', 'ownerPhone': '5550000000', 'ownerEmail': 'owner@example.com'})),
+        ('POST /pets/bulk-import', lambda r: dict(method='POST', url='/pets/bulk-import', content=bulk_rows, headers={
+            'content-type': 'application/x-ndjson', **_auth(r.choice(ids['owners']))})),
+        ('GET /reports/export', lambda r: dict(method='GET', url='/reports/export', params={'status': 'active'},
+                                               headers=_auth(BENCH_ADMIN))),
+        ('GET /reports/{id}', lambda r: dict(method='GET', url=f"/reports/{r.choice(ids['reports'])}")),
+        ('GET /reports/{id}/route', lambda r: dict(method='GET', url=f"/reports/{r.choice(ids['reports'])}/route")),
+        ('POST /reports/create', create_report),
+        ('POST /reports/{id}/sighting', lambda r: dict(method='POST', url=f"/reports/{r.choice(ids['reports'])}/sighting",
+                                                       files=files(), headers=_auth(r.choice(ids['users'])), data={
+            'latitude': str(lat + r.uniform(-0.1, 0.1)),
+            'longitude': str(lon + r.uniform(-0.1, 0.1)), 'address': 'Calle', 'notes': 'Lo vi'})),
+        ('GET /sightings/active-reports', lambda r: dict(method='GET', url='/sightings/active-reports', params={
+            'user_lat': lat, 'user_lon': lon, 'radius_km': 40, 'limit': 20})),
+        ('GET /sightings/public-sightings', lambda r: dict(method='GET', url='/sightings/public-sightings', params={
+            'latitude': lat, 'longitude': lon, 'radius': 30, 'limit': 20})),
+        ('GET /sightings/public-sightings/{id}', lambda r: dict(
+            method='GET', url=f"/sightings/public-sightings/{r.choice(ids['sightings'])}")),
+        ('POST /sightings/public-sightings/create', lambda r: dict(
+            method='POST', url='/sightings/public-sightings/create', files=files(),
+            headers=_auth(r.choice(ids['users'])), data={
+                'latitude': str(lat), 'longitude': str(lon),
+                'address': 'Calle', 'description': 'Perro suelto',
+                'species': 'Perro', 'approximate_size': 'Mediano', 'colors': 'Café'})),
+        ('GET /sightings/public-sightings/{id}/matches', lambda r: dict(
+            method='GET', url=f"/sightings/public-sightings/{r.choice(ids['sightings'])}/matches")),
+        # Tras la primera verificación de cada token los claims salen de la caché
+        ('POST /sightings/public-sightings/{id}/comment', lambda r: dict(
+            method='POST', url=f"/sightings/public-sightings/{r.choice(ids['sightings'])}/comment",
+            params={'comment': 'Yo también lo vi'}, headers=_auth(r.choice(ids['users'])))),
+        ('GET /sightings/public-sightings/{id}/comments', lambda r: dict(
+            method='GET', url=f"/sightings/public-sightings/{r.choice(ids['sightings'])}/comments", params={'limit': 20})),
+        ('PUT /notifications/location', lambda r: dict(
+            method='PUT', url='/notifications/location', headers=_auth(r.choice(ids['users'])),
+            json={k: v for k, v in _random_location(r).items() if k != 'address'})),
+        ('POST /reports/{id}/found', mark_found),
+        ('DELETE /pets/{id}', delete_pet),
+        ('GET /map/clusters', lambda r: dict(method='GET', url='/map/clusters', params={
+            'bbox': f"{lon - 0.6},{lat - 0.6},{lon + 0.6},{lat + 0.6}", 'zoom': 10})),
+    ]
+
+
+def _clear_caches() -> None:
+    detail_cache.clear()
+    maps.tile_cache.clear()
+    board_cache.clear()
+
+
+async def run_scenario(client: httpx.AsyncClient, db: FakeFirestore, store: FakeBucket,
+                       build: Callable, requests: int, cold: bool, rng: random.Random) -> Dict[str, Any]:
+    latencies, db_trips, storage_trips, errors = [], [], [], 0
+    for _ in range(requests):
+        if cold:
+            _clear_caches()
+        kwargs = build(rng)
+        db.reset_stats()
+        store.reset_stats()
+        start = time.perf_counter()
+        response = await client.request(**kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Los envíos y borrados encolados se atribuyen a la petición que los generó
+        await dispatcher.join()
+        await deletion_queue.join()
+        await matching_service.join()
+        db_trips.append(db.stats['round_trips'])
+        storage_trips.append(store.stats['round_trips'])
+        if response.status_code >= 400:
+            errors += 1
+    return {
+        'p50': float(np.percentile(latencies, 50)),
+        'p99': float(np.percentile(latencies, 99)),
+        'db': float(np.mean(db_trips)),
+        'storage': float(np.mean(storage_trips)),
+        'errors': errors,
+    }
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pets', type=int, default=1000)
+    parser.add_argument('--reports', type=int, default=300)
+    parser.add_argument('--sightings', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=30, help='Peticiones por endpoint')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='Latencia simulada por ida y vuelta')
+    parser.add_argument('--cold', action='store_true', help='Vaciar cachés antes de cada petición')
+    parser.add_argument('--only', default='', help='Solo los endpoints que contengan este texto')
+    args = parser.parse_args(argv)
+
+    db, store = FakeFirestore(), FakeBucket('lomito-bench')
+    firebase_service.use_backend(db, store)
+    ids = seed(db, args.pets, args.reports, args.sightings, args.users)
+    await rebuild_board()
+    await matching_service.rebuild_index()
+    db.latency = store.latency = args.latency_ms / 1000
+
+    rng = random.Random(11)
+    scenarios = [s for s in build_scenarios(ids, _photo_bytes()) if args.only in s[0]]
+    transport = httpx.ASGITransport(app=app)
+    print(f"{'endpoint':<46} {'p50 ms':>8} {'p99 ms':>8} {'db rt':>6} {'gcs rt':>6} {'err':>4}")
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        for name, build in scenarios:
+            result = await run_scenario(client, db, store, build, args.requests, args.cold, rng)
+            print(f"{name:<46} {result['p50']:>8.1f} {result['p99']:>8.1f} "
+                  f"{result['db']:>6.1f} {result['storage']:>6.1f} {result['errors']:>4}")
+    firebase_service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
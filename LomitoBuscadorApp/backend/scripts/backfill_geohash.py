@@ -0,0 +1,75 @@
+# RUTA: backend/scripts/backfill_geohash.py
+#
+# Rellena el campo 'geohash' de los documentos creados antes de que existiera:
+# sin él no aparecen en las consultas por rango de geohash (feed, mapa,
+# destinatarios de notificaciones). Es idempotente: solo toca los documentos
+# a los que les falta o tienen otro geohash que el de su ubicación. Al final
+# reconstruye el tablero de reportes activos ('activeBoard').
+#
+#   cd LomitoBuscadorApp/backend
+#   python -m scripts.backfill_geohash            # aplica los cambios
+#   python -m scripts.backfill_geohash --dry-run  # solo cuenta
+
+import argparse
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from app.services.feed_service import rebuild_board
+from app.services.firebase_service import db, run_blocking
+from app.services.geo_service import location_geohash
+from app.services.pagination_service import iter_by_name
+
+# Operaciones por batch de Firestore (máximo 500)
+BATCH_SIZE = 500
+
+# Colección -> ubicación de la que sale el geohash
+LOCATIONS: Dict[str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = {
+    'lostReports': lambda data: data.get('lastKnownLocation') or data.get('lastSeenLocation'),
+    'publicSightings': lambda data: data.get('location'),
+    'users': lambda data: data.get('lastKnownLocation'),
+}
+
+
+async def backfill_collection(collection: str, dry_run: bool = False) -> Dict[str, int]:
+    """Añade o corrige el geohash de cada documento de `collection`. Devuelve los contadores."""
+    location_of = LOCATIONS[collection]
+    counts = {'scanned': 0, 'updated': 0, 'without_location': 0}
+    batch, pending = db.batch(), 0
+    async for doc in iter_by_name(db.collection(collection), BATCH_SIZE):
+        counts['scanned'] += 1
+        data = doc.to_dict() or {}
+        try:
+            geohash = location_geohash(location_of(data))
+        except (TypeError, ValueError):
+            geohash = None
+        if geohash is None:
+            counts['without_location'] += 1
+            continue
+        if data.get('geohash') == geohash:
+            continue
+        counts['updated'] += 1
+        if dry_run:
+            continue
+        batch.update(doc.reference, {'geohash': geohash})
+        pending += 1
+        if pending == BATCH_SIZE:
+            await run_blocking(batch.commit)
+            batch, pending = db.batch(), 0
+    if pending:
+        await run_blocking(batch.commit)
+    return counts
+
+
+async def main(dry_run: bool) -> None:
+    for collection in LOCATIONS:
+        counts = await backfill_collection(collection, dry_run)
+        print(f"{collection}: {counts['scanned']} revisados, {counts['updated']} "
+              f"{'por actualizar' if dry_run else 'actualizados'}, {counts['without_location']} sin ubicación")
+    if not dry_run:
+        print(f"activeBoard: {await rebuild_board()} reportes activos")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rellena 'geohash' en reportes, avistamientos y usuarios antiguos.")
+    parser.add_argument('--dry-run', action='store_true', help="Solo cuenta los documentos que cambiarían")
+    asyncio.run(main(parser.parse_args().dry_run))
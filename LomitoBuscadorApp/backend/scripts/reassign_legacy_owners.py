@@ -0,0 +1,100 @@
+# RUTA: backend/scripts/reassign_legacy_owners.py
+#
+# Antes de tener sesión la app guardaba todas las mascotas con
+# ownerId = 'CURRENT_USER_ID'. Ahora el dueño sale del token, así que esas
+# mascotas no aparecen en "Mis mascotas" de nadie y no se pueden editar,
+# borrar ni reportar. Este script le asigna a cada una el usuario de 'users'
+# cuyo email coincide con 'ownerInfo.ownerEmail' (sin distinguir mayúsculas),
+# junto con sus reportes. Guarda el valor anterior en 'legacyOwnerId': sus
+# fotos siguen en 'pets/CURRENT_USER_ID/' (ver deletion_service).
+#
+# Es idempotente. Las mascotas sin email, sin usuario o con un email que
+# comparten varios usuarios se dejan como están y se listan al final.
+#
+#   cd LomitoBuscadorApp/backend
+#   python -m scripts.reassign_legacy_owners            # aplica los cambios
+#   python -m scripts.reassign_legacy_owners --dry-run  # solo cuenta
+
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Set
+
+from app.routes.dependencies import LEGACY_USER_ID
+from app.services.firebase_service import db, run_blocking, stream_query
+from app.services.pagination_service import iter_by_name
+
+# Operaciones por batch de Firestore (máximo 500)
+BATCH_SIZE = 500
+
+
+def normalize_email(email) -> Optional[str]:
+    if not isinstance(email, str) or '@' not in email:
+        return None
+    return email.strip().lower()
+
+
+async def load_user_emails() -> Dict[str, Set[str]]:
+    """Email normalizado -> UIDs de 'users' con ese email."""
+    emails: Dict[str, Set[str]] = {}
+    async for doc in iter_by_name(db.collection('users'), BATCH_SIZE):
+        email = normalize_email((doc.to_dict() or {}).get('email'))
+        if email:
+            emails.setdefault(email, set()).add(doc.id)
+    return emails
+
+
+async def reassign_pets(dry_run: bool = False) -> Dict[str, List[str]]:
+    """
+    Asigna a su dueño las mascotas (y sus reportes) con ownerId LEGACY_USER_ID.
+    Devuelve los IDs de mascota por resultado: 'reassigned', 'no_email',
+    'no_user' y 'ambiguous'.
+    """
+    emails = await load_user_emails()
+    outcome: Dict[str, List[str]] = {'reassigned': [], 'no_email': [], 'no_user': [], 'ambiguous': []}
+    batch, pending = db.batch(), 0
+
+    async def stage(ref, changes) -> None:
+        nonlocal batch, pending
+        batch.update(ref, changes)
+        pending += 1
+        if pending == BATCH_SIZE:
+            await run_blocking(batch.commit)
+            batch, pending = db.batch(), 0
+
+    query = db.collection('pets').where('ownerId', '==', LEGACY_USER_ID)
+    async for pet_doc in iter_by_name(query, BATCH_SIZE):
+        email = normalize_email(((pet_doc.to_dict() or {}).get('ownerInfo') or {}).get('ownerEmail'))
+        uids = emails.get(email, set()) if email else set()
+        if not email:
+            outcome['no_email'].append(pet_doc.id)
+            continue
+        if len(uids) != 1:
+            outcome['no_user' if not uids else 'ambiguous'].append(pet_doc.id)
+            continue
+        outcome['reassigned'].append(pet_doc.id)
+        if dry_run:
+            continue
+        uid = next(iter(uids))
+        await stage(pet_doc.reference, {'ownerId': uid, 'legacyOwnerId': LEGACY_USER_ID})
+        reports = await stream_query(db.collection('lostReports').where('petId', '==', pet_doc.id))
+        for report_doc in reports:
+            if (report_doc.to_dict() or {}).get('ownerId') in (LEGACY_USER_ID, None):
+                await stage(report_doc.reference, {'ownerId': uid})
+    if pending:
+        await run_blocking(batch.commit)
+    return outcome
+
+
+async def main(dry_run: bool) -> None:
+    outcome = await reassign_pets(dry_run)
+    print(f"pets: {len(outcome['reassigned'])} {'por reasignar' if dry_run else 'reasignadas'}")
+    for key, label in (('no_email', 'sin email'), ('no_user', 'sin usuario con ese email'),
+                       ('ambiguous', 'email de varios usuarios')):
+        if outcome[key]:
+            print(f"  {label} ({len(outcome[key])}): {', '.join(outcome[key])}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Asigna a su dueño las mascotas guardadas con 'CURRENT_USER_ID'.")
+    parser.add_argument('--dry-run', action='store_true', help="Solo cuenta las mascotas que cambiarían")
+    asyncio.run(main(parser.parse_args().dry_run))
@@ -0,0 +1,68 @@
+# RUTA: backend/tests/conftest.py
+#
+# Pruebas unitarias de los servicios, junto a los benchmarks. Usan el backend
+# en memoria (fake_firebase), así que no necesitan credenciales ni red:
+#
+#   cd LomitoBuscadorApp/backend
+#   python -m pytest -q tests
+
+import os
+
+os.environ.setdefault('FIREBASE_BACKEND', 'memory')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+os.environ.setdefault('NOTIFICATIONS_SENDER', 'stub')
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app.services import firebase_service, flyer_service, matching_service
+from app.services.cache_service import detail_cache
+from app.services.fake_firebase import FAKE_TOKEN_PREFIX, FakeBucket, FakeFirestore
+from app.services.deletion_service import deletion_queue
+from app.services.feed_service import board_cache
+from app.services.notification_service import dispatcher
+
+
+@pytest.fixture
+def fake_db():
+    """Firestore y Storage en memoria, nuevos para cada prueba (y las cachés vacías)."""
+    db = FakeFirestore()
+    firebase_service.use_backend(db, FakeBucket('test-bucket'))
+    detail_cache.clear()
+    board_cache.clear()
+    return db
+
+
+@pytest.fixture
+def fake_bucket(fake_db):
+    """El bucket en memoria que acompaña a `fake_db`."""
+    return firebase_service.get_bucket()
+
+
+@pytest.fixture
+def background(monkeypatch):
+    """
+    Sustituye los trabajos en segundo plano que lanzan las rutas (avisos,
+    carteles, borrados y coincidencias) por una lista de (tipo, argumento):
+    cada petición de TestClient usa su propio event loop y no los esperaría.
+    """
+    calls = []
+    monkeypatch.setattr(dispatcher, 'enqueue', lambda job: calls.append(('notify', job)))
+    monkeypatch.setattr(flyer_service, 'schedule', lambda report_id: calls.append(('flyer', report_id)))
+    monkeypatch.setattr(deletion_queue, 'enqueue', lambda job_id: calls.append(('delete', job_id)))
+    monkeypatch.setattr(matching_service, 'schedule', lambda sighting_id, data: calls.append(('match', sighting_id)))
+    return calls
+
+
+@pytest.fixture
+def client(fake_db):
+    """Cliente HTTP de la app sobre `fake_db` (sin el lifespan: no arranca los workers)."""
+    from app.app import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth():
+    """`auth(uid)` -> cabecera de sesión que acepta el verificador del backend en memoria."""
+    return lambda uid: {'Authorization': f"Bearer {FAKE_TOKEN_PREFIX}{uid}"}
@@ -0,0 +1,66 @@
+import datetime
+import json
+
+from app.routes import dependencies
+from app.services import bulk_service
+
+ROW = {
+    'name': 'Firulais', 'species': 'Perro', 'breed': 'Mestizo', 'size': 'Chico', 'age': 2, 'sex': 'Macho',
+    'colors': ['Negro'], 'isVaccinated': True, 'hasIllness': False, 'temperament': 'Juguetón',
+    'ownerName': 'Refugio', 'ownerPhone': '5550000000', 'ownerEmail': 'refugio@example.com',
+}
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_bulk_import_saves_every_batch_and_reports_bad_rows(fake_db, client, auth, monkeypatch):
+    monkeypatch.setattr(bulk_service, 'FIRESTORE_BATCH_SIZE', 3)
+    lines = [json.dumps({**ROW, 'name': f"Perro {n}"}) for n in range(8)]
+    lines[2] = 'esto no es json'
+    lines[5] = json.dumps({**ROW, 'age': 'viejo'})
+    lines.insert(6, '')
+    lines.append(json.dumps({**ROW, 'photos': ['https://storage.googleapis.com/test-bucket/pets/otro/x.jpg']}))
+    body = "\n".join(lines) + "\n"
+
+    response = client.post('/pets/bulk-import', content=body, headers={
+        'content-type': 'application/x-ndjson', **auth('refugio')})
+    assert response.status_code == 200
+    results = _ndjson(response)
+    assert results[-1] == {'summary': {'imported': 6, 'failed': 3}}
+    errors = {r['line']: r['error'] for r in results if 'error' in r}
+    assert sorted(errors) == [3, 6, 10]
+    assert errors[6].startswith('age:')
+    saved = [r['id'] for r in results if 'id' in r]
+    assert len(saved) == 6
+    pets = {doc.id: doc.to_dict() for doc in fake_db.collection('pets').stream()}
+    assert set(pets) == set(saved)
+    assert all(pet['ownerId'] == 'refugio' for pet in pets.values())
+
+
+def test_bulk_import_requires_a_session(fake_db, client):
+    response = client.post('/pets/bulk-import', content=json.dumps(ROW), headers={'content-type': 'application/x-ndjson'})
+    assert response.status_code == 401
+
+
+def test_export_is_limited_to_the_users_own_reports_unless_admin(fake_db, client, auth, monkeypatch):
+    monkeypatch.setattr(bulk_service, 'EXPORT_PAGE_SIZE', 2)
+    monkeypatch.setattr(dependencies, 'ADMIN_UIDS', {'admin'})
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    for n in range(5):
+        fake_db.collection('lostReports').document(f"r{n}").set({
+            'ownerId': 'ana' if n % 2 == 0 else 'beto', 'status': 'active', 'petId': f"p{n}",
+            'reportedAt': start + datetime.timedelta(hours=n)})
+
+    assert client.get('/reports/export').status_code == 401
+    assert client.get('/reports/export', params={'owner_id': 'beto'}, headers=auth('ana')).status_code == 403
+
+    own = _ndjson(client.get('/reports/export', headers=auth('ana')))
+    assert [r['reportId'] for r in own] == ['r4', 'r2', 'r0']
+
+    everything = _ndjson(client.get('/reports/export', params={'fields': 'ownerId'}, headers=auth('admin')))
+    assert [r['reportId'] for r in everything] == ['r4', 'r3', 'r2', 'r1', 'r0']
+    assert set(everything[0]) == {'reportId', 'ownerId'}
+    beto = _ndjson(client.get('/reports/export', params={'owner_id': 'beto'}, headers=auth('admin')))
+    assert [r['reportId'] for r in beto] == ['r3', 'r1']
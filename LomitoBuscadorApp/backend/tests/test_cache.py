@@ -0,0 +1,51 @@
+from app.services.cache_service import etag_matches
+
+PHOTO = 'https://storage.googleapis.com/test-bucket/pets/u1/p1/a.jpg'
+
+
+def _seed(fake_db):
+    fake_db.collection('pets').document('p1').set({
+        'ownerId': 'u1', 'status': 'lost', 'reportId': 'r1',
+        'basicInfo': {'name': 'Firulais', 'photos': [PHOTO]}, 'specificInfo': {'species': 'Perro'}})
+    fake_db.collection('lostReports').document('r1').set({'petId': 'p1', 'ownerId': 'u1', 'status': 'active'})
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_pet_detail_answers_304_from_the_cache(fake_db, client):
+    _seed(fake_db)
+    first = client.get('/pets/p1')
+    etag = first.headers['etag']
+    assert first.status_code == 200 and first.json()['pet']['petId'] == 'p1'
+
+    fake_db.reset_stats()
+    cached = client.get('/pets/p1', headers={'If-None-Match': f'W/{etag}, "otro"'})
+    assert cached.status_code == 304 and cached.content == b'' and cached.headers['etag'] == etag
+    # Ni la respuesta completa ni el 304 vuelven a leer Firestore
+    assert client.get('/pets/p1').json() == first.json()
+    assert fake_db.stats['round_trips'] == 0
+
+    # Con `fields` el ETag es otro: no se confunde con el del cuerpo completo
+    projected = client.get('/pets/p1', params={'fields': 'petId'})
+    assert projected.json() == {'pet': {'petId': 'p1'}} and projected.headers['etag'] != etag
+
+
+def test_editing_the_pet_changes_its_etag_and_the_report_etag(fake_db, client, auth):
+    _seed(fake_db)
+    pet_etag = client.get('/pets/p1').headers['etag']
+    report_etag = client.get('/reports/r1').headers['etag']
+
+    response = client.put('/pets/p1', headers=auth('u1'), json={'name': 'Max', 'photos': [PHOTO], 'age': '3'})
+    assert response.status_code == 200
+
+    pet = client.get('/pets/p1', headers={'If-None-Match': pet_etag})
+    assert pet.status_code == 200 and pet.json()['pet']['basicInfo']['name'] == 'Max'
+    assert pet.headers['etag'] != pet_etag
+    # El detalle del reporte incluye la mascota: depende de su clave en la caché
+    report = client.get('/reports/r1', headers={'If-None-Match': report_etag})
+    assert report.status_code == 200 and report.json()['report']['petInfo']['basicInfo']['name'] == 'Max'
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import deletion_service
+from app.services.deletion_service import (
+    JOBS_COLLECTION, DeletionQueue, owner_storage_prefix, pet_storage_prefix, photo_blob_names,
+)
+from app.services.upload_service import check_photo_urls, stored_photo_urls
+
+BASE = 'https://storage.googleapis.com/test-bucket/'
+
+
+def test_photo_blob_names_keeps_the_pet_folder_and_legacy_owner_photos(fake_db):
+    basic_info = {
+        'photos': [BASE + 'pets/u1/p1/a_full.webp', BASE + 'pets/CURRENT_USER_ID/viejo.jpg'],
+        'photoVariants': [{'original': BASE + 'pets/u1/p1/a.jpg', 'thumb': BASE + 'pets/u1/p1/a_thumb.webp'}],
+    }
+    # Fotos que el cliente pudo haber metido: otra mascota, otro dueño, otro sitio
+    basic_info['photos'] += [BASE + 'pets/u1/p2/b.jpg', BASE + 'pets/u2/c.jpg', 'https://example.com/d.jpg']
+    names = photo_blob_names(basic_info, pet_storage_prefix('u1', 'p1'),
+                             [owner_storage_prefix('u1'), owner_storage_prefix('CURRENT_USER_ID')])
+    assert names == ['pets/u1/p1/a_full.webp', 'pets/CURRENT_USER_ID/viejo.jpg', 'pets/u1/p1/a.jpg',
+                     'pets/u1/p1/a_thumb.webp']
+
+
+def test_check_photo_urls_accepts_urls_already_on_the_pet(fake_db):
+    legacy = BASE + 'pets/CURRENT_USER_ID/viejo.jpg'
+    stored = stored_photo_urls({'photos': [legacy]})
+    prefix = pet_storage_prefix('u1', 'p1')
+    assert check_photo_urls([legacy, BASE + 'pets/u1/p1/nueva.jpg'], prefix, stored)
+    with pytest.raises(HTTPException) as error:
+        check_photo_urls([BASE + 'pets/CURRENT_USER_ID/ajena.jpg'], prefix, stored)
+    assert error.value.status_code == 400
+
+
+def _store(bucket, *names):
+    for name in names:
+        bucket.blob(name).upload_from_string(b'x', content_type='image/jpeg')
+
+
+def _seed_pet_with_report(fake_db, fake_bucket):
+    fake_db.collection('pets').document('p1').set({
+        'ownerId': 'u1', 'legacyOwnerId': 'CURRENT_USER_ID', 'status': 'lost', 'reportId': 'r1',
+        'basicInfo': {'photos': [BASE + 'pets/CURRENT_USER_ID/viejo.jpg', BASE + 'pets/u1/p1/a.jpg']},
+    })
+    report_ref = fake_db.collection('lostReports').document('r1')
+    report_ref.set({'petId': 'p1', 'ownerId': 'u1', 'status': 'active'})
+    report_ref.collection('searchRoute').document('s1').set({'notes': 'Lo vi'})
+    fake_db.collection('activeBoard').document('r1').set({'petId': 'p1', 'geohash': '9g3w'})
+    _store(fake_bucket, 'pets/u1/p1/a.jpg', 'pets/u1/p1/a_thumb.webp', 'pets/CURRENT_USER_ID/viejo.jpg',
+           'sightings/r1/x.jpg', 'flyers/r1/abc.jpg',
+           # De otras mascotas: no se tocan
+           'pets/u1/p2/b.jpg', 'pets/CURRENT_USER_ID/otra.jpg', 'sightings/r2/y.jpg')
+
+
+def test_delete_pet_cascades_to_reports_route_board_and_photos(fake_db, fake_bucket, client, auth, background):
+    _seed_pet_with_report(fake_db, fake_bucket)
+    assert client.delete('/pets/p1', headers=auth('u2')).status_code == 403
+    assert client.delete('/pets/p1', headers=auth('u1')).status_code == 200
+    # El documento se borra en la petición; el resto queda en el trabajo encolado
+    assert not fake_db.collection('pets').document('p1').get().exists
+    assert background == [('delete', 'pet-p1')]
+
+    asyncio.run(DeletionQueue()._process('pet-p1'))
+    assert not fake_db.collection(JOBS_COLLECTION).document('pet-p1').get().exists
+    assert not fake_db.collection('lostReports').document('r1').get().exists
+    assert fake_db.collection('lostReports').document('r1').collection('searchRoute').get() == []
+    assert not fake_db.collection('activeBoard').document('r1').get().exists
+    assert sorted(blob.name for blob in fake_bucket.list_blobs()) == [
+        'pets/CURRENT_USER_ID/otra.jpg', 'pets/u1/p2/b.jpg', 'sightings/r2/y.jpg']
+
+
+def test_failed_deletion_stays_pending_and_resume_finishes_it(fake_db, fake_bucket, client, auth, background, monkeypatch):
+    _seed_pet_with_report(fake_db, fake_bucket)
+    client.delete('/pets/p1', headers=auth('u1'))
+    job_ref = fake_db.collection(JOBS_COLLECTION).document('pet-p1')
+    real_delete_prefixes = deletion_service.delete_prefixes
+
+    async def unavailable(prefixes):
+        raise RuntimeError("Storage no disponible")
+
+    async def fail_once():
+        monkeypatch.setattr(deletion_service, 'delete_prefixes', unavailable)
+        await DeletionQueue()._process('pet-p1')
+
+    asyncio.run(fail_once())
+    job = job_ref.get().to_dict()
+    assert job['status'] == 'pending' and job['attempts'] == 1 and 'Storage no disponible' in job['lastError']
+
+    # Tras un reinicio, `resume` recupera el trabajo de Firestore y lo termina
+    monkeypatch.setattr(deletion_service, 'delete_prefixes', real_delete_prefixes)
+
+    async def restart():
+        queue = DeletionQueue()
+        assert await queue.resume() == 1
+        await queue.join()
+
+    asyncio.run(restart())
+    assert not job_ref.get().exists
+    assert not fake_db.collection('lostReports').document('r1').get().exists
+    assert not fake_bucket.get_blob('pets/u1/p1/a_thumb.webp')
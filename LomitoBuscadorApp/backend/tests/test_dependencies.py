@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes import dependencies
+from app.routes.dependencies import LEGACY_USER_ID, bearer_token, is_admin, resolve_user_id
+from app.services import auth_service
+from app.services.auth_service import AuthUser
+
+
+def _pet(fake_db, pet_id, owner):
+    fake_db.collection('pets').document(pet_id).set({
+        'ownerId': owner, 'status': 'safe', 'basicInfo': {'name': pet_id, 'photos': []}, 'createdAt': pet_id})
+
+
+def test_bearer_token_and_resolve_user_id():
+    assert bearer_token('Bearer abc ') == 'abc' and bearer_token('bearer abc') == 'abc'
+    assert bearer_token('Basic abc') is None and bearer_token('Bearer ') is None and bearer_token(None) is None
+
+    user = AuthUser({'uid': 'u1'})
+    assert resolve_user_id(user) == resolve_user_id(user, 'u1') == resolve_user_id(user, LEGACY_USER_ID) == 'u1'
+    with pytest.raises(HTTPException) as error:
+        resolve_user_id(user, 'u2')
+    assert error.value.status_code == 403
+
+
+def test_writes_require_a_valid_token(fake_db, client, auth):
+    _pet(fake_db, 'p1', 'u1')
+    for headers in ({}, {'Authorization': 'Basic abc'}, {'Authorization': 'Bearer inventado'}):
+        response = client.put('/pets/p1', headers=headers, json={'name': 'Max'})
+        assert response.status_code == 401 and response.headers['www-authenticate'] == 'Bearer'
+    assert client.put('/pets/p1', headers=auth('u2'), json={'name': 'Max'}).status_code == 403
+    assert fake_db.collection('pets').document('p1').get().to_dict()['basicInfo']['name'] == 'p1'
+
+
+def test_my_pets_only_lists_the_session_user(fake_db, client, auth):
+    _pet(fake_db, 'p1', 'u1')
+    _pet(fake_db, 'p2', 'u2')
+    assert client.get('/pets/my-pets/u2', headers=auth('u1')).status_code == 403
+    for owner_id in ('u1', LEGACY_USER_ID):
+        pets = client.get(f"/pets/my-pets/{owner_id}", headers=auth('u1')).json()['pets']
+        assert [pet['petId'] for pet in pets] == ['p1']
+
+
+def test_admin_routes_accept_the_claim_or_admin_uids(fake_db, client, auth, monkeypatch):
+    assert client.post('/sightings/active-reports/rebuild', headers=auth('u1')).status_code == 403
+    monkeypatch.setattr(dependencies, 'ADMIN_UIDS', {'u1'})
+    assert client.post('/sightings/active-reports/rebuild', headers=auth('u1')).status_code == 200
+    assert is_admin(AuthUser({'uid': 'u9', 'admin': True}))
+    assert not is_admin(AuthUser({'uid': 'u9', 'admin': 'true'}))
+
+
+def test_verified_tokens_are_cached_until_they_expire(fake_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(auth_service, '_token_cache', auth_service.TTLCache(maxsize=10, ttl=3600))
+    monkeypatch.setattr(auth_service, 'verify_id_token', lambda token: calls.append(token) or {'uid': 'u1', 'exp': 0})
+
+    async def verify_twice():
+        await auth_service.verify_token('t')
+        await auth_service.verify_token('t')
+
+    # Un token que ya expiró no se guarda
+    asyncio.run(verify_twice())
+    assert calls == ['t', 't']
+
+    monkeypatch.setattr(auth_service, 'verify_id_token',
+                        lambda token: calls.append(token) or {'uid': 'u1', 'exp': time.time() + 3600})
+    calls.clear()
+    asyncio.run(verify_twice())
+    assert calls == ['t']
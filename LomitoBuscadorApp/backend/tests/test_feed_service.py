@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.services import feed_service
+from app.services.geo_service import encode_geohash
+
+CENTER = (19.4326, -99.1332)
+
+
+def _seed(fake_db, count):
+    for n in range(count):
+        location = {'latitude': CENTER[0] + n * 0.01, 'longitude': CENTER[1], 'address': 'Calle'}
+        fake_db.collection('activeBoard').document(f"r{n:02d}").set({
+            'petName': f"Mascota {n}", 'lastKnownLocation': location,
+            'geohash': encode_geohash(location['latitude'], location['longitude'])})
+
+
+def test_feed_pages_reuse_the_cell_reads(fake_db, client):
+    _seed(fake_db, 12)
+    params = {'user_lat': CENTER[0], 'user_lon': CENTER[1], 'radius_km': 40, 'limit': 5}
+    seen, cursor, trips = [], None, []
+    while True:
+        fake_db.reset_stats()
+        body = client.get('/sightings/active-reports', params={**params, **({'cursor': cursor} if cursor else {})}).json()
+        trips.append(fake_db.stats['round_trips'])
+        seen.extend(report['reportId'] for report in body['reports'])
+        cursor = body['nextCursor']
+        if cursor is None:
+            break
+    assert seen == [f"r{n:02d}" for n in range(12)]
+    # La primera página lee cada celda una vez; las siguientes salen de la caché
+    assert trips[0] > 0 and trips[1:] == [0, 0]
+
+
+def test_board_writes_invalidate_the_cached_cells(fake_db):
+    _seed(fake_db, 1)
+    cells = [encode_geohash(*CENTER, 4)]
+    assert [report_id for report_id, _ in asyncio.run(feed_service.load_board(cells))] == ['r00']
+
+    location = {'latitude': CENTER[0] + 0.001, 'longitude': CENTER[1]}
+    asyncio.run(feed_service.upsert_report('nuevo', {
+        'lastKnownLocation': location, 'geohash': encode_geohash(location['latitude'], location['longitude'])}))
+    assert sorted(report_id for report_id, _ in asyncio.run(feed_service.load_board(cells))) == ['nuevo', 'r00']
+
+
+def test_load_board_is_bounded(fake_db):
+    with pytest.raises(ValueError):
+        asyncio.run(feed_service.load_board([f"9g{c}" for c in '0123456789bcdefghjkmnpqrstuvwxyz']))
@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+import io
+
+from PIL import Image, ImageFont
+from PIL._util import DeferredError
+
+from app.services import flyer_service, rate_limit_service
+from app.services.flyer_renderer import FLYER_SIZE, render_flyer
+from app.services.rate_limit_service import MemoryRateLimitStore
+
+REPORT = {'petId': 'p1', 'lastSeenLocation': {'address': 'Zócalo, CDMX'},
+          'reportedAt': datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)}
+PET = {'basicInfo': {'name': 'Firulais', 'photos': []},
+       'specificInfo': {'species': 'Perro', 'colors': ['Café', 'Blanco']},
+       'ownerInfo': {'ownerName': 'Ana', 'ownerPhone': '5550000000'}}
+
+
+def test_render_flyer_returns_a_jpg_and_a_pdf():
+    photo = io.BytesIO()
+    Image.new('RGB', (300, 200), (200, 100, 50)).save(photo, 'JPEG')
+    for source in (photo.getvalue(), None, b'no es una imagen'):
+        jpg, pdf = render_flyer(flyer_service.flyer_inputs(REPORT, PET), source)
+        with Image.open(io.BytesIO(jpg)) as image:
+            assert image.format == 'JPEG' and image.size == FLYER_SIZE
+        assert pdf.startswith(b'%PDF')
+
+
+def test_render_flyer_without_freetype_uses_the_bitmap_font(monkeypatch):
+    # Así queda Pillow compilado sin FreeType: truetype() y load_default(size=...) lanzan ImportError
+    monkeypatch.setattr(ImageFont, 'core', DeferredError.new(ImportError("sin FreeType")))
+    inputs = {**flyer_service.flyer_inputs(REPORT, PET), 'name': 'Firulais 🐶'}
+    jpg, pdf = render_flyer(inputs, None)
+    assert jpg.startswith(b'\xff\xd8') and pdf.startswith(b'%PDF')
+
+
+def _count_renders(monkeypatch):
+    renders = []
+
+    async def fake_render(inputs, photo):
+        renders.append(inputs['name'])
+        # Cede el turno para que las peticiones simultáneas coincidan con el render en curso
+        await asyncio.sleep(0.01)
+        return b'jpg', b'pdf'
+
+    monkeypatch.setattr(flyer_service, '_render', fake_render)
+    return renders
+
+
+def test_concurrent_requests_share_one_render_and_unchanged_data_reuses_it(fake_db, fake_bucket, monkeypatch):
+    renders = _count_renders(monkeypatch)
+    report_ref = fake_db.collection('lostReports').document('r1')
+    report_ref.set(REPORT)
+
+    async def three_at_once():
+        return await asyncio.gather(*(flyer_service.ensure_flyer('r1', REPORT, PET) for _ in range(3)))
+
+    results = asyncio.run(three_at_once())
+    assert renders == ['Firulais']
+    assert len({(r['imageUrl'], r['pdfUrl']) for r in results}) == 1
+    digest = results[0]['hash']
+    assert sorted(blob.name for blob in fake_bucket.list_blobs()) == [f"flyers/r1/{digest}.jpg", f"flyers/r1/{digest}.pdf"]
+
+    # El reporte guarda el hash: con los mismos datos no se vuelve a dibujar ni a leer Storage
+    stored = report_ref.get().to_dict()
+    assert stored['flyerHash'] == digest
+    again = asyncio.run(flyer_service.ensure_flyer('r1', stored, PET))
+    assert again['cached'] is True and again['imageUrl'] == results[0]['imageUrl'] and renders == ['Firulais']
+
+
+def test_changed_data_renders_again_and_removes_only_stale_versions(fake_db, fake_bucket, monkeypatch):
+    renders = _count_renders(monkeypatch)
+    fake_db.collection('lostReports').document('r1').set(REPORT)
+    old = asyncio.run(flyer_service.ensure_flyer('r1', REPORT, PET))['hash']
+    renamed = {**PET, 'basicInfo': {'name': 'Max', 'photos': []}}
+
+    # Una versión reciente puede ser de otra instancia que aún la está generando: se conserva
+    recent = asyncio.run(flyer_service.ensure_flyer('r1', REPORT, renamed))['hash']
+    assert renders == ['Firulais', 'Max'] and recent != old
+    assert {blob.name.rsplit('/', 1)[-1] for blob in fake_bucket.list_blobs()} == {
+        f"{old}.jpg", f"{old}.pdf", f"{recent}.jpg", f"{recent}.pdf"}
+
+    # Pasado FLYER_RENDER_TIMEOUT sin cambios, la versión anterior se borra
+    for name in (f"flyers/r1/{old}.jpg", f"flyers/r1/{old}.pdf"):
+        fake_bucket._blobs[name]['updated'] -= datetime.timedelta(seconds=flyer_service.FLYER_RENDER_TIMEOUT + 1)
+    asyncio.run(flyer_service.ensure_flyer('r1', REPORT, renamed))
+    assert {blob.name.rsplit('/', 1)[-1] for blob in fake_bucket.list_blobs()} == {f"{recent}.jpg", f"{recent}.pdf"}
+
+
+def test_flyer_route_requires_a_session_and_is_rate_limited(fake_db, fake_bucket, client, auth, monkeypatch):
+    renders = _count_renders(monkeypatch)
+    fake_db.collection('lostReports').document('r1').set(REPORT)
+    fake_db.collection('pets').document('p1').set(PET)
+
+    assert client.get('/reports/r1/flyer').status_code == 401
+    assert client.get('/reports/nope/flyer', headers=auth('u1')).status_code == 404
+    response = client.get('/reports/r1/flyer', headers=auth('u1'))
+    assert response.status_code == 200 and response.json()['imageUrl'].endswith('.jpg') and renders == ['Firulais']
+
+    monkeypatch.setattr(rate_limit_service, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(rate_limit_service, '_store', MemoryRateLimitStore())
+    rule = next(rule for rule in rate_limit_service.RULES if rule.name == 'flyer')
+    statuses = [client.get('/reports/r1/flyer', headers=auth('u1')).status_code for _ in range(rule.rate + 1)]
+    assert statuses == [200] * rule.rate + [429]
+    # El límite es por usuario
+    assert client.get('/reports/r1/flyer', headers=auth('u2')).status_code == 200
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from app.services.geo_service import (
+    MAX_BBOX_CELLS, MAX_COVERING_CELLS, cells_in_bbox, count_cells_in_bbox, covering_cells,
+    decode_distance_cursor, encode_distance_cursor, encode_geohash, geohash_bounds,
+    haversine_many, precision_for_bbox, within_radius,
+)
+
+
+def test_encode_geohash_known_value():
+    assert encode_geohash(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+
+def test_geohash_bounds_contain_point():
+    lat, lon = 19.4326, -99.1332
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds(encode_geohash(lat, lon, 6))
+    assert min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+@pytest.mark.parametrize('radius_km', [1, 10, 24, 40, 50, 150])
+def test_covering_cells_contain_every_point_in_radius(radius_km):
+    rng = random.Random(radius_km)
+    for _ in range(50):
+        lat, lon = rng.uniform(-70, 70), rng.uniform(-180, 180)
+        cells = covering_cells(lat, lon, radius_km)
+        precision = len(cells[0])
+        assert len(cells) <= max(MAX_COVERING_CELLS, 32)
+        assert len(set(cells)) == len(cells)
+        for _ in range(20):
+            point_lat = lat + rng.uniform(-2, 2)
+            point_lon = ((lon + rng.uniform(-3, 3) + 180) % 360) - 180
+            if haversine_many(lat, lon, [point_lat], [point_lon])[0] <= radius_km:
+                assert encode_geohash(point_lat, point_lon, precision) in cells
+
+
+def test_covering_cells_are_finer_than_the_radius():
+    # 40 km se cubren con celdas de precisión 4 (~20 x 39 km), no de 156 km
+    cells = covering_cells(19.4326, -99.1332, 40)
+    assert len(cells[0]) == 4
+    assert len(cells) <= MAX_COVERING_CELLS
+
+
+def test_cells_in_bbox_matches_count_and_crosses_antimeridian():
+    cells = cells_in_bbox(-5, 170, 5, 190, 3)
+    assert len(cells) == count_cells_in_bbox(-5, 170, 5, 190, 3)
+    assert encode_geohash(0, 179.9, 3) in cells
+    assert encode_geohash(0, -179.9, 3) in cells
+
+
+def test_cells_in_bbox_whole_world_and_limit():
+    assert len(cells_in_bbox(-90, -180, 90, 180, 1)) == 32
+    with pytest.raises(ValueError):
+        cells_in_bbox(-90, -180, 90, 180, 4)
+    assert count_cells_in_bbox(-90, -180, 90, 180, 4) > MAX_BBOX_CELLS
+
+
+def test_precision_for_bbox_respects_limit():
+    precision = precision_for_bbox(19, -100, 22, -97, 7, 16)
+    assert count_cells_in_bbox(19, -100, 22, -97, precision) <= 16
+    assert count_cells_in_bbox(19, -100, 22, -97, precision + 1) > 16
+    assert precision_for_bbox(-90, -180, 90, 180, 7, 16) == 1
+
+
+def test_within_radius_sorted_by_distance():
+    lats = [19.5, 19.44, 25.0, 19.43]
+    lons = [-99.1, -99.13, -99.1, -99.133]
+    indices, distances = within_radius(19.4326, -99.1332, lats, lons, 20)
+    assert indices.tolist() == [3, 1, 0]
+    assert list(distances) == sorted(distances)
+
+
+def test_distance_cursor_roundtrip():
+    assert decode_distance_cursor(encode_distance_cursor(3.25, 'abc')) == (3.25, 'abc')
+    assert decode_distance_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_distance_cursor('no-es-un-cursor')
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.services import image_service
+from app.services.image_service import DERIVATIVE_SIZES, InvalidImage, process_image
+
+ORIENTATION = 0x0112
+GPS_IFD = 0x8825
+
+
+def _jpeg_with_exif(size=(2000, 1000)) -> bytes:
+    exif = Image.Exif()
+    # Foto tomada con el teléfono girado: se muestra rotada 90°
+    exif[ORIENTATION] = 6
+    exif[GPS_IFD] = {1: 'N', 2: (19.0, 25.0, 57.0)}
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (180, 120, 60)).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+def test_process_image_strips_metadata_and_applies_orientation():
+    processed = process_image(io.BytesIO(_jpeg_with_exif()))
+    assert processed.content_type == 'image/jpeg' and processed.extension == 'jpg'
+    with Image.open(io.BytesIO(processed.original)) as original:
+        assert original.size == (1000, 2000)
+        assert not original.getexif()
+    for name, max_side in DERIVATIVE_SIZES.items():
+        with Image.open(io.BytesIO(processed.derivatives[name])) as derivative:
+            assert derivative.format == 'WEBP'
+            assert max(derivative.size) == min(max_side, 2000) and derivative.size[1] > derivative.size[0]
+
+
+def test_process_image_keeps_png_and_rejects_bad_files(monkeypatch):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (50, 40), (0, 0, 0, 0)).save(buffer, 'PNG')
+    assert process_image(buffer).content_type == 'image/png'
+
+    with pytest.raises(InvalidImage):
+        process_image(io.BytesIO(b'no es una imagen'))
+    monkeypatch.setattr(image_service, 'MAX_IMAGE_PIXELS', 100)
+    with pytest.raises(InvalidImage):
+        process_image(buffer)
+
+
+FORM = {'name': 'Firulais', 'species': 'Perro', 'breed': 'Mestizo', 'size': 'Chico', 'age': '2', 'sex': 'Macho',
+        'colors': 'Negro', 'isVaccinated': 'true', 'hasIllness': 'false', 'temperament': 'Juguetón',
+        'ownerName': 'Ana', 'ownerPhone': '5550000000', 'ownerEmail': 'ana@example.com'}
+
+
+def test_register_uploads_the_original_and_its_derivatives(fake_db, fake_bucket, client, auth):
+    photo = ('photos', ('foto.jpg', _jpeg_with_exif((400, 300)), 'image/jpeg'))
+    response = client.post('/pets/register', headers=auth('u1'), data=FORM, files=[photo])
+    assert response.status_code == 200
+    pet_id = response.json()['petId']
+
+    variants = fake_db.collection('pets').document(pet_id).get().to_dict()['basicInfo']['photoVariants']
+    assert len(variants) == 1 and set(variants[0]) == {'original', *DERIVATIVE_SIZES}
+    blobs = {blob.name: blob for blob in fake_bucket.list_blobs(prefix=f"pets/u1/{pet_id}/")}
+    assert len(blobs) == 4
+    assert sorted(fake_bucket._blobs[name]['content_type'] for name in blobs) == [
+        'image/jpeg', 'image/webp', 'image/webp', 'image/webp']
+
+
+def test_register_with_an_invalid_photo_uploads_nothing(fake_db, fake_bucket, client, auth):
+    files = [('photos', ('foto.jpg', _jpeg_with_exif((40, 30)), 'image/jpeg')),
+             ('photos', ('roto.jpg', b'no es una imagen', 'image/jpeg'))]
+    response = client.post('/pets/register', headers=auth('u1'), data=FORM, files=files)
+    assert response.status_code == 400 and 'roto.jpg' in response.json()['detail']
+    assert fake_bucket.list_blobs() == [] and fake_db.collection('pets').get() == []
@@ -0,0 +1,52 @@
+import pytest
+
+from app.routes import maps
+from app.services.geo_service import encode_geohash
+
+
+@pytest.fixture
+def board(fake_db):
+    maps.tile_cache.clear()
+    for n in range(5):
+        location = {'latitude': 19.40 + n * 0.001, 'longitude': -99.13}
+        fake_db.collection('activeBoard').document(f"r{n}").set({
+            'lastKnownLocation': location, 'geohash': encode_geohash(location['latitude'], location['longitude'])})
+        fake_db.collection('publicSightings').document(f"s{n}").set({
+            'status': 'active', 'location': location,
+            'geohash': encode_geohash(location['latitude'], location['longitude'])})
+    return encode_geohash(19.40, -99.13, 3)
+
+
+@pytest.mark.parametrize('layer', ['reports', 'sightings'])
+def test_both_layers_are_capped_and_flag_truncation(board, client, monkeypatch, layer):
+    monkeypatch.setattr(maps, 'MAX_POINTS_PER_TILE', 3)
+    tile = client.get(f"/map/tiles/{layer}/6/{board}").json()
+    assert tile['truncated'] is True
+    assert sum(cluster['count'] for cluster in tile['clusters']) == 3
+
+    maps.tile_cache.clear()
+    monkeypatch.setattr(maps, 'MAX_POINTS_PER_TILE', 5)
+    tile = client.get(f"/map/tiles/{layer}/6/{board}").json()
+    assert tile['truncated'] is False
+    assert sum(cluster['count'] for cluster in tile['clusters']) == 5
+
+
+def test_tile_zoom_and_precision_are_validated(board, client):
+    assert client.get(f"/map/tiles/reports/23/{board}").status_code == 422
+    assert client.get(f"/map/tiles/reports/-1/{board}").status_code == 422
+    # Zoom 12 agrupa a precisión 6: la tesela debe tener al menos 4 caracteres
+    assert client.get(f"/map/tiles/reports/12/{board}").status_code == 400
+    assert client.get(f"/map/tiles/reports/12/{board}x").status_code == 200
+    # Con el mundo a la vista se aceptan teselas de un carácter
+    assert client.get(f"/map/tiles/reports/2/{board[0]}").status_code == 200
+
+
+def test_clusters_reject_a_bbox_too_large_for_the_zoom(board, client):
+    response = client.get('/map/clusters', params={'bbox': '-120,10,-80,30', 'zoom': 14})
+    assert response.status_code == 400
+    response = client.get('/map/clusters', params={'bbox': '-99.2,19.3,-99.0,19.5', 'zoom': 10})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['truncated'] is False
+    reports = [tile for tile in body['tiles'] if tile['layer'] == 'reports']
+    assert sum(cluster['count'] for tile in reports for cluster in tile['clusters']) == 5
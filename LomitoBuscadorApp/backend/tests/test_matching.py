@@ -0,0 +1,76 @@
+from app.services.matching_service import (
+    MIN_MATCH_SCORE, MatchIndex, candidate_from, normalize, score, traits_from,
+)
+
+ORIGIN = {'latitude': 19.4326, 'longitude': -99.1332}
+
+
+def _candidate(report_id, location, species='Perro', size='mediano', colors=('negro', 'blanco'), has_spots=False):
+    report = {'petId': f"pet-{report_id}", 'lastKnownLocation': location}
+    pet = {'basicInfo': {'name': report_id},
+           'specificInfo': {'species': species, 'size': size, 'colors': list(colors), 'hasSpots': has_spots}}
+    return candidate_from(report_id, report, pet)
+
+
+def _sighting(species='perro', size='Mediano', colors='negro,blanco', has_spots=False, location=ORIGIN):
+    return traits_from({'location': location, 'petDescription': {
+        'species': species, 'approximateSize': size, 'colors': colors, 'hasSpots': has_spots}})
+
+
+def _near(dlat, dlon=0.0):
+    return {'latitude': ORIGIN['latitude'] + dlat, 'longitude': ORIGIN['longitude'] + dlon}
+
+
+def test_normalize_strips_accents_and_case():
+    assert normalize(' Café ') == 'cafe'
+    assert normalize('') is None
+
+
+def test_score_prefers_matching_traits_and_distance():
+    traits = _sighting()
+    same = _candidate('same', _near(0.01))
+    different = _candidate('different', _near(0.01), size='gigante', colors=('cafe',), has_spots=True)
+    assert 0 <= score(traits, different, 1.0, 25) < score(traits, same, 1.0, 25) <= 1
+    assert score(traits, same, 1.0, 25) > score(traits, same, 20.0, 25)
+
+
+def test_top_matches_ranks_and_filters():
+    index = MatchIndex()
+    index.replace_all([
+        _candidate('best', _near(0.01)),
+        _candidate('farther', _near(0.1)),
+        _candidate('other-species', _near(0.01), species='gato'),
+        _candidate('out-of-radius', _near(1.0)),
+        _candidate('mismatch', _near(0.02), size='gigante', colors=('cafe',), has_spots=True),
+    ])
+    matches = index.top_matches(_sighting(), k=5, radius_km=25)
+    ids = [m['reportId'] for m in matches]
+    assert ids[:2] == ['best', 'farther']
+    assert 'other-species' not in ids and 'out-of-radius' not in ids
+    assert all(m['score'] >= MIN_MATCH_SCORE for m in matches)
+    assert [m['score'] for m in matches] == sorted((m['score'] for m in matches), reverse=True)
+
+
+def test_sighting_without_species_compares_every_species():
+    index = MatchIndex()
+    index.replace_all([_candidate('cat', _near(0.01), species='gato')])
+    assert [m['reportId'] for m in index.top_matches(_sighting(species=None), radius_km=25)] == ['cat']
+
+
+def test_remove_and_move_update_the_index():
+    index = MatchIndex()
+    index.add(_candidate('r1', _near(0.01)))
+    index.add(_candidate('r1', _near(2.0)))
+    assert len(index) == 1
+    assert index.top_matches(_sighting(), radius_km=25) == []
+    index.remove('r1')
+    assert len(index) == 0 and not index.buckets and not index.by_pet
+
+
+def test_a_report_with_no_trait_in_common_can_still_match_by_distance():
+    # Tamaño, colores y manchas solo puntúan: no filtran como la zona y la especie
+    index = MatchIndex()
+    index.replace_all([_candidate('next-door', _near(0.0), size='gigante', colors=('cafe',), has_spots=True)])
+    sighting = traits_from({'location': _near(0.0), 'petDescription': {
+        'species': 'perro', 'approximateSize': 'Mini', 'colors': 'negro'}})
+    assert [m['reportId'] for m in index.top_matches(sighting, radius_km=25)] == ['next-door']
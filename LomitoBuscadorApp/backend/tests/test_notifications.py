@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+from app.services import notification_service
+from app.services.geo_service import covering_cells, location_geohash
+from app.services.notification_service import (
+    MAX_NOTIFICATION_RADIUS_KM, MIN_NOTIFICATION_RADIUS_KM, NotificationDispatcher, NotificationJob, StubSender,
+)
+
+CENTER = (19.4326, -99.1332)
+# Un grado de latitud son ~111 km
+KM = 1 / 111.0
+
+
+def _user(fake_db, uid, km_north, token=None, push=True, with_geohash=True):
+    location = {'latitude': CENTER[0] + km_north * KM, 'longitude': CENTER[1]}
+    data = {'lastKnownLocation': location, 'fcmToken': token or f"token-{uid}",
+            'preferences': {'enablePushNotifications': push}}
+    if with_geohash:
+        data['geohash'] = location_geohash(location)
+    fake_db.collection('users').document(uid).set(data)
+
+
+def _deliver(*jobs):
+    sender = StubSender()
+    dispatcher = NotificationDispatcher(sender)
+
+    async def run():
+        for job in jobs:
+            dispatcher.enqueue(job)
+        await dispatcher.join()
+
+    asyncio.run(run())
+    return sender.sent
+
+
+def _job(radius_km, **extra):
+    return NotificationJob(latitude=CENTER[0], longitude=CENTER[1], radius_km=radius_km,
+                           title="¡Mascota perdida cerca de ti!", body="Firulais", data={'reportId': 'r1'}, **extra)
+
+
+def test_recipients_come_from_the_covering_cells_and_the_radius(fake_db):
+    _user(fake_db, 'cerca', 2)
+    _user(fake_db, 'borde', 9)
+    _user(fake_db, 'lejos', 30)
+    _user(fake_db, 'dueno', 1)
+    _user(fake_db, 'silencio', 1, push=False)
+    _user(fake_db, 'mismo-telefono', 3, token='token-cerca')
+    # Sin geohash (anterior a la indexación) no aparece en ninguna celda
+    _user(fake_db, 'sin-geohash', 1, with_geohash=False)
+    # Los ayudantes del reporte reciben el aviso aunque estén lejos
+    _user(fake_db, 'ayudante', 300)
+
+    fake_db.reset_stats()
+    sent = _deliver(_job(10, exclude_user_ids=['dueno'], extra_user_ids=['ayudante', 'no-existe']))
+    assert len(sent) == 1
+    assert sorted(sent[0]['tokens']) == ['token-ayudante', 'token-borde', 'token-cerca']
+    assert sent[0]['data'] == {'reportId': 'r1'}
+    # Una consulta por celda más una lectura múltiple de los ayudantes; nunca la colección completa
+    assert fake_db.stats['round_trips'] == len(covering_cells(CENTER[0], CENTER[1], 10)) + 1
+
+
+def test_radius_is_clamped_to_the_allowed_range(fake_db):
+    _user(fake_db, 'medio-km', 0.5)
+    _user(fake_db, 'a-dos-km', 2)
+    _user(fake_db, 'a-45-km', 45)
+    _user(fake_db, 'a-80-km', 80)
+
+    assert _job(0).radius_km == MIN_NOTIFICATION_RADIUS_KM
+    assert _job(500).radius_km == MAX_NOTIFICATION_RADIUS_KM
+    small, large = _deliver(_job(0), _job(500))
+    assert small['tokens'] == ['token-medio-km']
+    assert sorted(large['tokens']) == ['token-a-45-km', 'token-a-dos-km', 'token-medio-km']
+
+
+def test_tokens_are_sent_in_multicast_chunks(fake_db, monkeypatch):
+    monkeypatch.setattr(notification_service, 'MULTICAST_CHUNK_SIZE', 2)
+    for n in range(5):
+        _user(fake_db, f"u{n}", 1)
+    sent = _deliver(_job(5))
+    assert [len(batch['tokens']) for batch in sent] == [2, 2, 1]
+
+
+def test_worker_logs_failed_deliveries_and_keeps_going(fake_db, caplog):
+    _user(fake_db, 'cerca', 1)
+
+    class FailingSender(StubSender):
+        def send_multicast(self, tokens, title, body, data):
+            if not self.sent:
+                self.sent.append(None)
+                raise RuntimeError("FCM no disponible")
+            return super().send_multicast(tokens, title, body, data)
+
+    sender = FailingSender()
+    dispatcher = NotificationDispatcher(sender)
+
+    async def run():
+        dispatcher.enqueue(_job(5))
+        dispatcher.enqueue(_job(5))
+        await dispatcher.join()
+
+    with caplog.at_level(logging.ERROR, logger=notification_service.__name__):
+        asyncio.run(run())
+    assert [record.exc_info[0] for record in caplog.records] == [RuntimeError]
+    assert sender.sent[1]['tokens'] == ['token-cerca']
@@ -0,0 +1,47 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.services.pagination_service import decode_cursor, encode_cursor, fetch_page, iter_by_name
+
+
+def test_cursor_roundtrip_with_datetime_and_plain_values():
+    moment = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+    assert decode_cursor(encode_cursor(moment, 'doc1')) == (moment, 'doc1')
+    assert decode_cursor(encode_cursor(42, 'doc2')) == (42, 'doc2')
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize('cursor', ['basura', 'e30=', '!!!'])
+def test_invalid_cursor_raises(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_fetch_page_walks_every_document_once(fake_db):
+    for i in range(23):
+        # Valores repetidos: el ID desempata
+        fake_db.collection('items').document(f"item{i:02d}").set({'rank': i // 3})
+
+    async def walk():
+        seen, after = [], None
+        while True:
+            docs, cursor = await fetch_page(fake_db.collection('items'), 'rank', 5, after)
+            seen.extend(doc.id for doc in docs)
+            if cursor is None:
+                return seen
+            after = decode_cursor(cursor)
+
+    seen = asyncio.run(walk())
+    assert len(seen) == 23 and len(set(seen)) == 23
+
+
+def test_iter_by_name_includes_documents_without_the_order_field(fake_db):
+    for i in range(7):
+        fake_db.collection('items').document(f"item{i}").set({'rank': i} if i % 2 else {})
+
+    async def collect():
+        return [doc.id async for doc in iter_by_name(fake_db.collection('items'), page_size=3)]
+
+    assert asyncio.run(collect()) == [f"item{i}" for i in range(7)]
@@ -0,0 +1,46 @@
+import asyncio
+
+from app.services import rate_limit_service
+from app.services.fake_firebase import FAKE_TOKEN_PREFIX
+from app.services.rate_limit_service import MemoryRateLimitStore, client_ip, client_key
+
+
+def _scope(headers=(), client=('10.0.0.1', 1234), query=b''):
+    return {'type': 'http', 'headers': list(headers), 'client': client, 'query_string': query}
+
+
+def test_bucket_allows_capacity_then_waits(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit_service.time, 'monotonic', lambda: now[0])
+    store = MemoryRateLimitStore()
+    assert [store.take('k', 3, 1.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take('k', 3, 1.0) == 1.0
+    # Tras un segundo se recupera un token
+    now[0] += 1.0
+    assert store.take('k', 3, 1.0) == 0.0
+    # Otra clave tiene su propio bucket
+    assert store.take('otra', 3, 1.0) == 0.0
+
+
+def test_bucket_store_is_bounded():
+    store = MemoryRateLimitStore(maxsize=2)
+    for key in ('a', 'b', 'c'):
+        store.take(key, 1, 1.0)
+    assert list(store._buckets) == ['b', 'c']
+
+
+def test_client_ip_uses_the_entry_added_by_trusted_proxies():
+    forwarded = [(b'x-forwarded-for', b'6.6.6.6, 1.2.3.4, 10.1.1.1')]
+    assert client_ip(_scope(forwarded), proxy_hops=1) == '10.1.1.1'
+    assert client_ip(_scope(forwarded), proxy_hops=2) == '1.2.3.4'
+    assert client_ip(_scope(forwarded), proxy_hops=0) == '10.0.0.1'
+    # Sin la cabecera (o con menos entradas que proxies) se usa la IP del socket
+    assert client_ip(_scope(), proxy_hops=1) == '10.0.0.1'
+
+
+def test_client_key_uses_verified_uid_and_ignores_user_id_param(fake_db):
+    token = [(b'authorization', f"Bearer {FAKE_TOKEN_PREFIX}alice".encode())]
+    assert asyncio.run(client_key(_scope(token, query=b'user_id=bob'))) == 'user:alice'
+    assert asyncio.run(client_key(_scope(query=b'user_id=bob'))).startswith('ip:')
+    invalid = [(b'authorization', b'Bearer no-es-un-token')]
+    assert asyncio.run(client_key(_scope(invalid))).startswith('ip:')
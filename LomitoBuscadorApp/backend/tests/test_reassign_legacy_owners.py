@@ -0,0 +1,31 @@
+import asyncio
+
+from scripts.reassign_legacy_owners import reassign_pets
+
+
+def _pet(email):
+    return {'ownerId': 'CURRENT_USER_ID', 'ownerInfo': {'ownerEmail': email}, 'basicInfo': {'name': 'Firulais'}}
+
+
+def test_legacy_pets_and_their_reports_move_to_the_user_with_that_email(fake_db):
+    fake_db.collection('users').document('ana').set({'email': 'Ana@example.com'})
+    fake_db.collection('users').document('beto1').set({'email': 'beto@example.com'})
+    fake_db.collection('users').document('beto2').set({'email': 'beto@example.com'})
+    fake_db.collection('pets').document('p1').set(_pet(' ana@EXAMPLE.com '))
+    fake_db.collection('pets').document('p2').set(_pet('nadie@example.com'))
+    fake_db.collection('pets').document('p3').set(_pet('beto@example.com'))
+    fake_db.collection('pets').document('p4').set(_pet(None))
+    fake_db.collection('pets').document('p5').set({**_pet('ana@example.com'), 'ownerId': 'otro'})
+    fake_db.collection('lostReports').document('r1').set({'petId': 'p1', 'ownerId': 'CURRENT_USER_ID'})
+
+    dry = asyncio.run(reassign_pets(dry_run=True))
+    assert dry == {'reassigned': ['p1'], 'no_email': ['p4'], 'no_user': ['p2'], 'ambiguous': ['p3']}
+    assert fake_db.collection('pets').document('p1').get().get('ownerId') == 'CURRENT_USER_ID'
+
+    assert asyncio.run(reassign_pets())['reassigned'] == ['p1']
+    pet = fake_db.collection('pets').document('p1').get().to_dict()
+    assert pet['ownerId'] == 'ana' and pet['legacyOwnerId'] == 'CURRENT_USER_ID'
+    assert fake_db.collection('lostReports').document('r1').get().get('ownerId') == 'ana'
+    assert fake_db.collection('pets').document('p5').get().get('ownerId') == 'otro'
+    # Es idempotente
+    assert asyncio.run(reassign_pets())['reassigned'] == []
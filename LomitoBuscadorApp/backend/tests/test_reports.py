@@ -0,0 +1,97 @@
+import datetime
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _route_point(fake_db, report_id, point_id, minutes):
+    fake_db.collection('lostReports').document(report_id).collection('searchRoute').document(point_id).set({
+        'location': {'latitude': 19.4, 'longitude': -99.1, 'address': 'Calle'},
+        'timestamp': START + datetime.timedelta(minutes=minutes)})
+
+
+def test_route_pages_do_not_drop_points_that_share_a_timestamp(fake_db, client):
+    fake_db.collection('lostReports').document('r1').set({'status': 'active'})
+    # Tres puntos con la misma fecha justo en el borde de la página
+    for n, minutes in enumerate([0, 1, 2, 2, 2, 3]):
+        _route_point(fake_db, 'r1', f"p{n}", minutes)
+
+    first = client.get('/reports/r1/route', params={'limit': 3}).json()
+    assert [p['sightingId'] for p in first['route']] == ['p0', 'p1', 'p2'] and first['hasMore'] is True
+    second = client.get('/reports/r1/route', params={'limit': 3, 'cursor': first['nextCursor']}).json()
+    assert [p['sightingId'] for p in second['route']] == ['p3', 'p4', 'p5']
+    # Página exacta: no se anuncia otra página vacía
+    assert second['hasMore'] is False
+
+    # El último cursor sirve para pedir solo los puntos nuevos
+    empty = client.get('/reports/r1/route', params={'cursor': second['nextCursor']}).json()
+    assert empty['route'] == [] and empty['nextCursor'] == second['nextCursor']
+    _route_point(fake_db, 'r1', 'p6', 4)
+    new = client.get('/reports/r1/route', params={'cursor': second['nextCursor']}).json()
+    assert [p['sightingId'] for p in new['route']] == ['p6']
+
+
+def test_route_rejects_a_bad_cursor(fake_db, client):
+    assert client.get('/reports/r1/route', params={'cursor': 'basura'}).status_code == 400
+
+
+LOCATION = {'latitude': 19.4326, 'longitude': -99.1332, 'address': 'Zócalo'}
+
+
+def _pet(fake_db, pet_id='p1', owner='u1', **extra):
+    fake_db.collection('pets').document(pet_id).set({
+        'ownerId': owner, 'status': 'safe',
+        'basicInfo': {'name': 'Firulais', 'photos': []}, 'specificInfo': {'species': 'Perro'}, **extra})
+
+
+def _create(client, auth, uid='u1', pet_id='p1'):
+    return client.post('/reports/create', headers=auth(uid), json={'petId': pet_id, 'lastSeenLocation': LOCATION})
+
+
+def test_create_report_writes_report_pet_and_board_together(fake_db, client, auth, background):
+    _pet(fake_db)
+    response = _create(client, auth)
+    assert response.status_code == 200
+    report_id = response.json()['reportId']
+
+    report = fake_db.collection('lostReports').document(report_id).get().to_dict()
+    assert report['ownerId'] == 'u1' and report['status'] == 'active' and report['geohash']
+    assert fake_db.collection('pets').document('p1').get().to_dict()['reportId'] == report_id
+    assert fake_db.collection('activeBoard').document(report_id).get().exists
+    # El aviso y el cartel se lanzan después de confirmar, no dentro de la transacción
+    assert [kind for kind, _ in background] == ['notify', 'flyer']
+
+
+def test_create_report_rejects_a_second_report_and_other_owners(fake_db, client, auth, background):
+    _pet(fake_db)
+    assert _create(client, auth, uid='u2').status_code == 403
+    assert _create(client, auth).status_code == 200
+    assert _create(client, auth).status_code == 409
+    assert _create(client, auth, pet_id='nope').status_code == 404
+    # Ni el 403 ni el 409 escribieron nada
+    assert len(fake_db.collection('lostReports').get()) == 1
+    assert len(fake_db.collection('activeBoard').get()) == 1
+
+
+def test_finish_report_frees_the_pet_and_leaves_the_board(fake_db, client, auth, background):
+    _pet(fake_db)
+    report_id = _create(client, auth).json()['reportId']
+
+    assert client.post(f"/reports/{report_id}/found", headers=auth('u2')).status_code == 403
+    assert client.post(f"/reports/{report_id}/found", headers=auth('u1')).status_code == 200
+    assert client.post(f"/reports/{report_id}/close", headers=auth('u1')).status_code == 409
+
+    report = fake_db.collection('lostReports').document(report_id).get().to_dict()
+    pet = fake_db.collection('pets').document('p1').get().to_dict()
+    assert report['status'] == 'found' and report['foundAt'] is not None
+    assert pet['status'] == 'safe' and 'reportId' not in pet
+    assert not fake_db.collection('activeBoard').document(report_id).get().exists
+    # Con la mascota libre se puede volver a reportar
+    assert _create(client, auth).status_code == 200
+
+
+def test_closing_an_old_report_keeps_the_pet_on_its_current_report(fake_db, client, auth, background):
+    _pet(fake_db, status='lost', reportId='nuevo')
+    fake_db.collection('lostReports').document('viejo').set({'petId': 'p1', 'ownerId': 'u1', 'status': 'active'})
+    assert client.post('/reports/viejo/close', headers=auth('u1'), json={'reason': 'duplicado'}).status_code == 200
+    pet = fake_db.collection('pets').document('p1').get().to_dict()
+    assert pet['status'] == 'lost' and pet['reportId'] == 'nuevo'
@@ -0,0 +1,100 @@
+import datetime
+import io
+
+from PIL import Image
+from pydantic import BaseModel
+
+from app.app import app
+from app.routes import schemas
+from app.routes.schemas import ReportDetail
+
+CENTER = {'latitude': 19.4326, 'longitude': -99.1332}
+
+
+def test_report_detail_accepts_stored_route_points():
+    point = {
+        'sightingId': 's1', 'reportedBy': 'u1', 'geohash': '9g3w81t7j',
+        'location': {'latitude': 19.43, 'longitude': -99.13, 'address': 'Zócalo'},
+        'notes': 'Lo vi', 'photos': ['https://example.com/a.jpg'],
+        'photoVariants': [{'original': 'https://example.com/a.jpg', 'thumb': 'https://example.com/a_thumb.webp'}],
+        'timestamp': datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc),
+    }
+    detail = ReportDetail.model_validate({'report': {'reportId': 'r1', 'searchRoute': [point]}})
+    route_point = detail.report.searchRoute[0]
+    assert route_point.location.latitude == 19.43
+    assert route_point.location.address == 'Zócalo'
+    assert route_point.photoVariants[0]['thumb'].endswith('_thumb.webp')
+
+
+
+def _undeclared(value, path='') -> list:
+    """Rutas (p. ej. 'report.petInfo.basicInfo.foo') de los campos que el modelo no declara."""
+    if isinstance(value, BaseModel):
+        found = [f"{path}.{name}".lstrip('.') for name in (value.model_extra or {})]
+        for name in type(value).model_fields:
+            found += _undeclared(getattr(value, name), f"{path}.{name}")
+        return found
+    if isinstance(value, list):
+        return [p for item in value for p in _undeclared(item, f"{path}[]")]
+    return []
+
+
+def _photo():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (180, 120, 60)).save(buffer, 'JPEG')
+    return ('photos', ('foto.jpg', buffer.getvalue(), 'image/jpeg'))
+
+
+def _seed_through_the_api(client, auth):
+    """Crea los datos con las mismas rutas que usa la app, no escribiendo en Firestore a mano."""
+    pet_id = client.post('/pets/register', headers=auth('u1'), files=[_photo()], data={
+        'name': 'Firulais', 'species': 'Perro', 'breed': 'Mestizo', 'size': 'Chico', 'age': '2', 'sex': 'Macho',
+        'colors': ['Negro', 'Café'], 'isVaccinated': 'true', 'hasIllness': 'false', 'temperament': 'Juguetón',
+        'specialFeatures': 'Collar rojo', 'ownerName': 'Ana', 'ownerPhone': '5550000000',
+        'ownerEmail': 'ana@example.com'}).json()['petId']
+    report_id = client.post('/reports/create', headers=auth('u1'), json={
+        'petId': pet_id, 'lastSeenLocation': {**CENTER, 'address': 'Zócalo'}, 'notes': 'Asustadizo'}).json()['reportId']
+    client.post(f"/reports/{report_id}/sighting", headers=auth('u2'), files=[_photo()], data={
+        'latitude': str(CENTER['latitude'] + 0.001), 'longitude': str(CENTER['longitude']),
+        'address': 'Calle', 'notes': 'Lo vi'})
+    sighting_id = client.post('/sightings/public-sightings/create', headers=auth('u2'), files=[_photo()], data={
+        'latitude': str(CENTER['latitude']), 'longitude': str(CENTER['longitude']), 'address': 'Parque',
+        'description': 'Perro negro', 'species': 'Perro', 'approximate_size': 'Chico',
+        'colors': ['Negro']}).json()['sightingId']
+    client.post(f"/sightings/public-sightings/{sighting_id}/comment", headers=auth('u1'),
+                params={'comment': '¡Puede ser el mío!'})
+    return pet_id, report_id, sighting_id
+
+
+def test_route_output_matches_the_declared_schemas(fake_db, client, auth, background):
+    pet_id, report_id, sighting_id = _seed_through_the_api(client, auth)
+    near = {'user_lat': CENTER['latitude'], 'user_lon': CENTER['longitude'], 'radius_km': 10}
+    urls = {
+        '/pets/my-pets/{owner_id}': ('/pets/my-pets/u1', {}),
+        '/pets/{pet_id}': (f"/pets/{pet_id}", {}),
+        '/reports/{report_id}': (f"/reports/{report_id}", {}),
+        '/sightings/active-reports': ('/sightings/active-reports', near),
+        '/sightings/public-sightings': ('/sightings/public-sightings', near),
+        '/sightings/public-sightings/{sighting_id}': (f"/sightings/public-sightings/{sighting_id}", {}),
+        '/sightings/public-sightings/{sighting_id}/comments': (f"/sightings/public-sightings/{sighting_id}/comments", {}),
+    }
+    # Rutas GET cuya respuesta documentada es uno de los modelos de schemas.py
+    documented = {}
+    for path, operations in app.openapi()['paths'].items():
+        ref = (operations.get('get', {}).get('responses', {}).get('200', {})
+               .get('content', {}).get('application/json', {}).get('schema', {}).get('$ref', ''))
+        model = getattr(schemas, ref.rsplit('/', 1)[-1], None) if ref else None
+        if isinstance(model, type) and issubclass(model, schemas.Schema):
+            documented[path] = model
+    # Toda ruta con modelo de respuesta se comprueba aquí
+    assert set(documented) == set(urls)
+
+    for path, model in documented.items():
+        url, params = urls[path]
+        response = client.get(url, params=params, headers=auth('u1'))
+        assert response.status_code == 200, (url, response.text)
+        body = response.json()
+        parsed = model.model_validate(body)
+        assert _undeclared(parsed) == [], path
+        # Y ninguna lista vino vacía: se validó contenido real
+        assert all(value for value in body.values() if isinstance(value, list)), (path, body)
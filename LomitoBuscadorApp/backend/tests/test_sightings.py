@@ -0,0 +1,47 @@
+import datetime
+
+from app.routes.sightings import MAX_INLINE_COMMENTS
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _comment(n, **extra):
+    return {'userId': 'u9', 'userName': 'Vecino', 'comment': f"comentario {n}",
+            'timestamp': START + datetime.timedelta(minutes=n), **extra}
+
+
+def test_comment_moves_legacy_comments_and_keeps_the_inline_cap(fake_db, client, auth):
+    inline = [_comment(n, commentId=f"c{n}") for n in range(MAX_INLINE_COMMENTS)] + [_comment(99)]
+    sighting_ref = fake_db.collection('publicSightings').document('s1')
+    sighting_ref.set({'status': 'active', 'comments': inline, 'commentsCount': MAX_INLINE_COMMENTS})
+
+    response = client.post('/sightings/public-sightings/s1/comment', params={'comment': 'Lo vi ayer'},
+                           headers=auth('u1'))
+    assert response.status_code == 200
+    new_id = response.json()['commentId']
+
+    sighting = sighting_ref.get().to_dict()
+    # El comentario antiguo (sin commentId) y el nuevo se cuentan y van a la subcolección
+    assert sighting['commentsCount'] == MAX_INLINE_COMMENTS + 2
+    assert len(sighting['comments']) == MAX_INLINE_COMMENTS
+    assert sighting['comments'][-1]['commentId'] == new_id and sighting['comments'][0]['commentId'] == 'c1'
+    stored = {doc.id: doc.to_dict() for doc in sighting_ref.collection('comments').get()}
+    assert len(stored) == 2 and stored[new_id]['userId'] == 'u1'
+    assert {c['comment'] for c in stored.values()} == {'Lo vi ayer', 'comentario 99'}
+    assert all(doc_id == c['commentId'] for doc_id, c in stored.items())
+
+
+def test_comment_on_a_missing_sighting_writes_nothing(fake_db, client, auth):
+    response = client.post('/sightings/public-sightings/nope/comment', params={'comment': 'Hola'}, headers=auth('u1'))
+    assert response.status_code == 404
+    assert fake_db.collection('publicSightings').document('nope').collection('comments').get() == []
+
+
+def test_comments_page_newest_first(fake_db, client):
+    comments_ref = fake_db.collection('publicSightings').document('s1').collection('comments')
+    for n in range(5):
+        comments_ref.document(f"c{n}").set(_comment(n, commentId=f"c{n}"))
+    first = client.get('/sightings/public-sightings/s1/comments', params={'limit': 3}).json()
+    second = client.get('/sightings/public-sightings/s1/comments',
+                        params={'limit': 3, 'cursor': first['nextCursor']}).json()
+    assert [c['commentId'] for c in first['comments'] + second['comments']] == ['c4', 'c3', 'c2', 'c1', 'c0']
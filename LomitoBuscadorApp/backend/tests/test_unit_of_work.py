@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.services.unit_of_work import run_transaction
+
+
+def test_run_transaction_retries_when_a_read_document_changes(fake_db):
+    ref = fake_db.collection('counters').document('c1')
+    ref.set({'value': 0})
+    attempts = []
+
+    def work(uow):
+        doc, = uow.get(ref)
+        attempts.append(doc.get('value'))
+        if len(attempts) == 1:
+            # Otra petición escribe entre la lectura y el commit
+            ref.update({'value': 10})
+        uow.update(ref, {'value': doc.get('value') + 1})
+        return doc.get('value') + 1
+
+    assert asyncio.run(run_transaction(work)) == 11
+    assert attempts == [0, 10]
+    assert ref.get().to_dict() == {'value': 11}
+
+
+def test_run_transaction_writes_nothing_when_work_raises(fake_db):
+    ref = fake_db.collection('counters').document('c1')
+
+    def work(uow):
+        uow.set(ref, {'value': 1})
+        raise RuntimeError("falla a mitad")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_transaction(work))
+    assert not ref.get().exists
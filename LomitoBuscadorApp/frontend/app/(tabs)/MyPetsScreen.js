@@ -110,8 +110,14 @@ const MyPetsScreen = () => {
     setLoading(true);
     try {
       const ownerId = 'CURRENT_USER_ID';
-      const response = await api.get(`/pets/my-pets/${ownerId}`);
-      const fetchedPets = response.data?.pets || [];
+      // The backend pages the list; follow nextCursor until every pet is loaded
+      const fetchedPets = [];
+      let cursor = null;
+      do {
+        const response = await api.get(`/pets/my-pets/${ownerId}`, { params: cursor ? { cursor } : {} });
+        fetchedPets.push(...(response.data?.pets || []));
+        cursor = response.data?.nextCursor;
+      } while (cursor);
       setPets(fetchedPets);
       setSelectedPetIndex(0);
     } catch (error) {
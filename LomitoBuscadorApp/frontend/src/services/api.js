@@ -1,4 +1,5 @@
 import axios from 'axios';
+import auth from '@react-native-firebase/auth';
 
 const API_URL = HERE_YOUR_API_URL; // Reemplaza con tu URL de API I used NGRok tunnel
 
@@ -15,7 +16,12 @@ const api = axios.create({
 // Interceptor for handling request logic
 api.interceptors.request.use(
   async (config) => {
-
+    // The backend identifies the user by the Firebase ID token (getIdToken refreshes it when it expires)
+    const user = auth().currentUser;
+    if (user) {
+      const token = await user.getIdToken();
+      config.headers.Authorization = `Bearer ${token}`;
+    }
     return config;  },
   (error) => {
     return Promise.reject(error);